@@ -35,6 +35,9 @@ class BaseOptions():
 		parser.add_argument("--nonumba",
 							help="If used, do not let numba compile supported functions (def.: False). Numba makes functions run faster, but their first call takes longer to evaluate.",
 		                    action="store_true")
+		parser.add_argument("--cache",
+							help="If used, parsed raw gaze data are saved to binary files in a hidden folder next to the recordings and loaded from there on later runs (def.: False).",
+		                    action="store_true")
 		# parser.add_argument("--ignore_prompt",
 		# 					help="If true, all question prompting will be silenced and default choices applied.",
 		#                     action="store_true")
@@ -56,6 +59,9 @@ class BaseOptions():
 		parser.add_argument("-rs", "--resample", help="Resampling rate in Hertz (def.: 0, no resampling).",
 							default=0,
 							type=int)
+		parser.add_argument("--resample-method", help="Resampling interpolant: \"cubic\" (cubic spline, spherical cubic spline for head rotations) or \"linear\" (linear, spherical linear for head rotations) (def.: cubic).",
+							default="cubic", choices=["cubic", "linear"],
+							type=str)
 		parser.add_argument("--headwindow", help="Temporal window size in msec uesd to compute head rotation trajectory (def.: 100 msec).",
 							default=100.,
 							type=float)
@@ -75,7 +81,7 @@ class BaseOptions():
 							# default=["threshold=120"],
 							nargs="*")
 		parseGp.add_argument('--IHMM',
-							help="Identify fixation with an HMM-based algorithm. Specify the number of hidden state this way: `--IHMM nStates=2` (def. and min. state = 2)",
+							help="Identify fixation with an HMM-based algorithm. Specify the number of hidden state this way: `--IHMM nStates=2` (def. and min. state = 2). Start from or save fitted parameters with `model=path.npz` and `save=path.npz`, decode only with `train=0`.",
 							# default=["nStates=2"],
 							nargs="*")
 		parseGp.add_argument('--ICT',
@@ -83,7 +89,7 @@ class BaseOptions():
 							# default=["eps=.005", "minpts=5"],
 							nargs="*")
 		parseGp.add_argument('--IDT',
-							help="Identify fixation with a dispersion-based algorithm (not implemented)",
+							help="Identify fixation with a dispersion-based algorithm. Specify the dispersion threshold (deg) and minimum fixation duration (ms) this way: `--IDT threshold=2 minFixationTime=80` (def.: threshold = 2, minFixationTime = 80)",
 							# default=[""],
 							nargs="*")
 
@@ -21,6 +21,7 @@ opts = args.opts
 
 from .utils.misc import *
 from .utils.readOutFile import getBinFilename
+from .utils.fixationList import FixationList
 
 from . import helper
 
@@ -38,7 +39,9 @@ assertC(os.path.isfile(file2), "Path #2 to gaze data is not a file.")
 dim = [1000, 2000] # Y, X map dimensions
 
 def getData(path, opts):
-	gtype = helper.inferGazeType(path)
+	# Header is parsed once, loaders reuse the schema
+	schema = helper.probeSchema(path)
+	gtype = schema.gazeType
 	if gtype is None:
 		printError("Could not identify file as a raw gaze or fixation list file. File: {}".format(path))
 		return None
@@ -53,15 +56,24 @@ def getData(path, opts):
 			tracking=opts.tracking,
 			# Resampling at a different sample rate?
 			resample=opts.resample,
+			resample_method=opts.resample_method,
 			# Filtering algo and parameters if any is selected
 			filter=helper.filterSettings(opts),
 			# Fixation identifier algo and its parameters
-			parser=helper.parsingSettings(opts))
+			parser=helper.parsingSettings(opts),
+			# Load parsed data from a binary cache if available
+			caching=opts.cache,
+			schema=schema)
 	# Load as raw gaze data
 	elif gtype == "fixlist":
-		fix_list = helper.loadFixlist(path)
+		fix_list = helper.loadFixlist(path, schema=schema)
 
-	return fix_list
+	# None: no fixation was identified, -1: fixation list without longitude/latitude
+	if not isinstance(fix_list, np.ndarray) or len(fix_list.shape) != 2 or fix_list.shape[1] != 29:
+		printError("Could not extract a fixation list. File: {}".format(path))
+		return fix_list
+
+	return FixationList.fromArray(fix_list)
 
 os.makedirs(opts.out, exist_ok=True)
 save_file = "{0}{1}comparisons.csv".format(opts.out, os.sep)
@@ -76,6 +88,8 @@ with open(save_file, "a+") as out_result:
 	# fixation list
 	fix_list1 = getData(file1, opts)
 	fix_list2 = getData(file2, opts)
+	assertC(isinstance(fix_list1, FixationList), "No fixation list from path #1.")
+	assertC(isinstance(fix_list2, FixationList), "No fixation list from path #2.")
 
 	name1 = getFileName(file1)
 	name2 = getFileName(file2)
@@ -87,15 +101,15 @@ with open(save_file, "a+") as out_result:
 		from .comparison.saliencyMetrics import metrics
 		metrics.pop("InfoGain") # A baseline needs to be manually added
 
-		salmap1 = helper.getSaliencyMap(fix_list1[:, [2,3,4, 0,1]], dim, name1,
+		salmap1 = helper.getSaliencyMap(fix_list1, dim, name1,
 			path_save=opts.out)
-		salmap2 = helper.getSaliencyMap(fix_list2[:, [2,3,4, 0,1]], dim, name2,
+		salmap2 = helper.getSaliencyMap(fix_list2, dim, name2,
 			path_save=opts.out)
 
 		from .comparison.saliencyCompare import compareSaliency
 
-		fixmap1 = helper.getFixationMap(fix_list1[:, :2], dim)
-		fixmap2 = helper.getFixationMap(fix_list2[:, :2], dim)
+		fixmap1 = helper.getFixationMap(fix_list1, dim)
+		fixmap2 = helper.getFixationMap(fix_list2, dim)
 
 		printNeutral("Computing saliency similarity metrics", verbose=1)
 		results = dict(results, **compareSaliency(salmap1, salmap2, fixmap1, fixmap2,
@@ -105,11 +119,8 @@ with open(save_file, "a+") as out_result:
 	if opts.scanp:
 		from .comparison.scanpathCompare import transformScanpath, measureNames, compareScanpath
 
-		scanp1 = fix_list1[:, [9, 0,1, 12]] # fix_idx, long, lat (gaze), timestamp
-		scanp2 = fix_list2[:, [9, 0,1, 12]]
-
-		scanp1[:, 1:3] *= [np.pi*2, np.pi]
-		scanp2[:, 1:3] *= [np.pi*2, np.pi]
+		scanp1 = fix_list1.scanpath() # fix_idx, long, lat (gaze, rad), timestamp
+		scanp2 = fix_list2.scanpath()
 
 		SC1 = transformScanpath(scanp1, [0, scanp1.shape[0]], 0)
 		SC2 = transformScanpath(scanp2, [0, scanp2.shape[0]], 0)
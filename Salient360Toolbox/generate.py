@@ -34,7 +34,9 @@ for ipath, path in enumerate(opts.i):
 
 	savename = opts.filenames[ipath]
 
-	gtype = helper.inferGazeType(path)
+	# Header is parsed once, loaders reuse the schema
+	schema = helper.probeSchema(path)
+	gtype = schema.gazeType
 	if gtype is None:
 		misc.printError("Could not identify file as a raw gaze or fixation list file. File: {}".format(savename))
 		continue
@@ -62,13 +64,17 @@ for ipath, path in enumerate(opts.i):
 			tracking=opts.tracking,
 			# Resampling at a different sample rate?
 			resample=opts.resample,
+			resample_method=opts.resample_method,
 			# Filtering algo and parameters if any is selected
 			filter=helper.filterSettings(opts),
 			# Fixation identifier algo and its parameters
-			parser=helper.parsingSettings(opts))
+			parser=helper.parsingSettings(opts),
+			# Load parsed data from a binary cache if available
+			caching=opts.cache,
+			schema=schema)
 	# Load as raw gaze data
 	elif gtype == "fixlist":
-		fix_list = helper.loadFixlist(path)
+		fix_list = helper.loadFixlist(path, schema=schema)
 
 	if opts.proc_raw:
 		if gaze_data is not None:
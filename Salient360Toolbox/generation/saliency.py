@@ -10,6 +10,7 @@
 
 import numpy as np
 import sys
+import os
 
 from ..utils.misc import *
 import numba
@@ -86,6 +87,286 @@ def saliencyOp_(saliencymap, fix, pvi, gauss_sigma):
 	# The ellipsis has no effect on a 2D array, but will hit all "frames" when creating a "saliency video" (3D array where first dim is a set of saliency maps)
 	saliencymap[..., Y, X] += getGaussian_(pvi[Y, X, :], fix[:3], gauss_sigma)
 
+@numba.njit(parallel=True)
+def accumulate_(saliencymap, fix_list, frames, pvi, gauss_sigma, nBands):
+	"""
+	Draw the Gaussians of fixations (x,y,z, long,lat) on frames [frames[i, 0], frames[i, 1]) of saliencymap (nFrames, H, W).
+	Same values as calling saliencyOp_ for each fixation. Rows are split in bands processed in parallel, each band goes through all fixations in order:
+	threads never write to the same pixels and every pixel sums Gaussians in the same order as saliencyOp_.
+	"""
+	H, W = saliencymap.shape[1], saliencymap.shape[2]
+	nFix = fix_list.shape[0]
+
+	# Gaussian support windows (see getGaussianSupport)
+	Sy = int(H * np.sin(gauss_sigma*2.5))
+	rectX = np.empty(nFix, dtype=np.int64)
+	rectY = np.empty(nFix, dtype=np.int64)
+	Sx = np.empty(nFix, dtype=np.int64)
+	for i in range(nFix):
+		rectX[i] = int(fix_list[i, 3] * W)
+		rectY[i] = int(fix_list[i, 4] * H)
+		Sx[i] = min(W, int(W * ((1+np.tan(np.abs(fix_list[i, 4] * np.pi - np.pi/2))) * (gauss_sigma*1.5))))
+
+	bandSize = (H + nBands - 1) // nBands
+	for b in numba.prange(nBands):
+		r0, r1 = b*bandSize, min(H, (b+1)*bandSize)
+		for i in range(nFix):
+			if frames[i, 1] <= frames[i, 0]: continue
+			for y in range(rectY[i] - Sy//2, rectY[i] + Sy//2):
+				# Wrap around points that would hit outside the map
+				yy = y - H if y > H-1 else (y + H if y < 0 else y)
+				if yy < r0 or yy >= r1: continue
+				for x in range(rectX[i] - Sx[i]//2, rectX[i] + Sx[i]//2):
+					xx = x - W if x > W-1 else (x + W if x < 0 else x)
+					# See getGaussian_
+					c = np.sqrt((pvi[yy, xx, 0] - fix_list[i, 0])**2 + (pvi[yy, xx, 1] - fix_list[i, 1])**2 + (pvi[yy, xx, 2] - fix_list[i, 2])**2)
+					value = np.exp(-((c**2) / (2 * gauss_sigma**2)))
+					for f in range(frames[i, 0], frames[i, 1]):
+						saliencymap[f, yy, xx] += value
+
+# Map dtypes the compiled kernels can add to. Others (e.g., float16 of the GUI's "16 bits" option) are drawn in float32 by _accumulateScratch
+_COMPILED_DTYPES = (np.float32, np.float64)
+
+def _accumulateScratch(saliencymap, fix_list, frames, pvi, gauss_sigma, draw, callback=None):
+	# Draw frames by blocks in a float32 scratch map (draw: _drawActive or _drawDiff) added to saliencymap, reporting progress between blocks. Returns False if stopped by callback
+	nFrames, H, W = saliencymap.shape
+	blockSize = max(1, 2**26 // (H * W * 4))
+	blocks = ((fStart, np.zeros([min(blockSize, nFrames-fStart), H, W], dtype=np.float32)) for fStart in range(0, nFrames, blockSize))
+	for fStart, block in draw(blocks, fix_list, frames, pvi, gauss_sigma):
+		fEnd = fStart + block.shape[0]
+		saliencymap[fStart: fEnd] += block.astype(saliencymap.dtype)
+
+		if callback is not None:
+			continue_ = callback(fEnd/nFrames)
+			if not continue_: return False
+	return True
+
+def _accumulate(saliencymap, fix_list, frames, pvi, gauss_sigma, callback=None, progressStep=1, message=None):
+	# Compiled accumulation (accumulate_) of blocks of progressStep fixations, reporting progress between blocks. Returns False if stopped by callback
+	if saliencymap.dtype not in _COMPILED_DTYPES:
+		return _accumulateScratch(saliencymap, fix_list, frames, pvi, gauss_sigma, _drawActive, callback)
+
+	nBands = min(saliencymap.shape[1], 8*numba.get_num_threads())
+	fix_list = np.ascontiguousarray(fix_list[:, :5], dtype=float)
+	for iStart in range(0, fix_list.shape[0], progressStep):
+		iEnd = min(iStart+progressStep, fix_list.shape[0])
+		accumulate_(saliencymap, fix_list[iStart: iEnd], frames[iStart: iEnd], pvi, gauss_sigma, nBands)
+
+		if callback is not None:
+			continue_ = callback(iEnd/fix_list.shape[0])
+			if not continue_: return False
+
+		if message is not None: message(iEnd)
+	return True
+
+@numba.njit
+def drawDiff_(running, count, rowCount, fix, pvi, gauss_sigma, r0, r1, sign):
+	# Add (sign=1) or remove (sign=-1) the Gaussian of fix (x,y,z, long,lat) to rows [r0, r1) of the map, stored from row 0 of running, count and rowCount (see accumulate_)
+	H, W = pvi.shape[0], pvi.shape[1]
+	Sy = int(H * np.sin(gauss_sigma*2.5))
+	rectX, rectY = int(fix[3] * W), int(fix[4] * H)
+	Sx = min(W, int(W * ((1+np.tan(np.abs(fix[4] * np.pi - np.pi/2))) * (gauss_sigma*1.5))))
+
+	for y in range(rectY - Sy//2, rectY + Sy//2):
+		yy = y - H if y > H-1 else (y + H if y < 0 else y)
+		if yy < r0 or yy >= r1: continue
+		rowCount[yy-r0] += sign
+		for x in range(rectX - Sx//2, rectX + Sx//2):
+			xx = x - W if x > W-1 else (x + W if x < 0 else x)
+			count[yy-r0, xx] += sign
+			if count[yy-r0, xx] == 0:
+				# No Gaussian left on this pixel: drop the round-off of additions and removals
+				running[yy-r0, xx] = 0
+				continue
+			c = np.sqrt((pvi[yy, xx, 0] - fix[0])**2 + (pvi[yy, xx, 1] - fix[1])**2 + (pvi[yy, xx, 2] - fix[2])**2)
+			running[yy-r0, xx] += sign * np.exp(-((c**2) / (2 * gauss_sigma**2)))
+
+@numba.njit(parallel=True)
+def accumulateDiff_(saliencymap, frame0, running, count, rowCount, fix_list, starts, startFrames, ends, endFrames, pvi, gauss_sigma, nBands):
+	"""
+	Draw frames [frame0, frame0+saliencymap.shape[0]) of a saliency video with a difference array of Gaussians:
+	the Gaussian of fixation starts[k] (ends[k]) is added to (removed from) running at frame startFrames[k] (endFrames[k]), every frame then adds running.
+	starts and ends are sorted by frame and restricted to these frames. running (H, W), count (Gaussians per pixel) and rowCount (per row) carry the state from one call to the next.
+	Rows are split in bands processed in parallel as in accumulate_, rows without Gaussians are skipped.
+	"""
+	nFrames, H, W = saliencymap.shape
+	bandSize = (H + nBands - 1) // nBands
+	for b in numba.prange(nBands):
+		r0, r1 = b*bandSize, min(H, (b+1)*bandSize)
+		if r0 >= r1: continue
+		band, bandCount, bandRowCount = running[r0:r1], count[r0:r1], rowCount[r0:r1]
+		s, e = 0, 0
+		for f in range(nFrames):
+			while e < ends.shape[0] and endFrames[e] <= frame0+f:
+				drawDiff_(band, bandCount, bandRowCount, fix_list[ends[e]], pvi, gauss_sigma, r0, r1, -1)
+				e += 1
+			while s < starts.shape[0] and startFrames[s] <= frame0+f:
+				drawDiff_(band, bandCount, bandRowCount, fix_list[starts[s]], pvi, gauss_sigma, r0, r1, 1)
+				s += 1
+			for y in range(r1-r0):
+				if bandRowCount[y] == 0: continue
+				for x in range(W):
+					# Gaussians are positive, negative values are round-off
+					if band[y, x] > 0: saliencymap[f, r0+y, x] += band[y, x]
+
+def _drawDiff(blocks, fix_list, frames, pvi, gauss_sigma):
+	# Draw blocks (first frame, array of consecutive frames) given in temporal order with accumulateDiff_, yields each block once drawn
+	nBands = min(pvi.shape[0], 8*numba.get_num_threads())
+	fix_list = np.ascontiguousarray(fix_list[:, :5], dtype=float)
+
+	# Fixations drawn on at least one frame, sorted by start and by end frame
+	idx = np.where(frames[:, 1] > frames[:, 0])[0]
+	starts = idx[np.argsort(frames[idx, 0], kind="stable")]
+	ends = idx[np.argsort(frames[idx, 1], kind="stable")]
+	startFrames, endFrames = frames[starts, 0], frames[ends, 1]
+
+	running = np.zeros(pvi.shape[:2])
+	count = np.zeros(pvi.shape[:2], dtype=np.int32)
+	rowCount = np.zeros(pvi.shape[0], dtype=np.int64)
+	for fStart, block in blocks:
+		fEnd = fStart + block.shape[0]
+		s0, s1 = np.searchsorted(startFrames, [fStart, fEnd])
+		e0, e1 = np.searchsorted(endFrames, [fStart, fEnd])
+		accumulateDiff_(block, fStart, running, count, rowCount, fix_list,
+			starts[s0: s1], startFrames[s0: s1], ends[e0: e1], endFrames[e0: e1], pvi, gauss_sigma, nBands)
+		yield fStart, block
+
+def _accumulateDiff(saliencymap, fix_list, frames, pvi, gauss_sigma, callback=None, progressStep=1, message=None):
+	# Difference array accumulation (accumulateDiff_) of blocks of progressStep frames, reporting progress between blocks. Returns False if stopped by callback
+	if saliencymap.dtype not in _COMPILED_DTYPES:
+		return _accumulateScratch(saliencymap, fix_list, frames, pvi, gauss_sigma, _drawDiff, callback)
+
+	nFrames = saliencymap.shape[0]
+	blocks = ((fStart, saliencymap[fStart: fStart+progressStep]) for fStart in range(0, nFrames, progressStep))
+	for fStart, block in _drawDiff(blocks, fix_list, frames, pvi, gauss_sigma):
+		fEnd = fStart + block.shape[0]
+		if callback is not None:
+			continue_ = callback(fEnd/nFrames)
+			if not continue_: return False
+
+		if message is not None: message(fEnd)
+	return True
+
+def _drawActive(blocks, fix_list, frames, pvi, gauss_sigma):
+	# Draw blocks (first frame, array of consecutive frames) given in temporal order with accumulate_, yields each block once drawn
+	# Only fixations covering a block are drawn on it, in the order of fix_list: same values as _accumulate
+	nBands = min(pvi.shape[0], 8*numba.get_num_threads())
+	fix_list = np.ascontiguousarray(fix_list[:, :5], dtype=float)
+
+	# Fixations sorted by start frame
+	order = np.argsort(frames[:, 0], kind="stable")
+	startFrames = frames[order, 0]
+	active = np.empty(0, dtype=np.int64)
+	nStarted = 0
+	for fStart, block in blocks:
+		fEnd = fStart + block.shape[0]
+		# Add fixations starting before the end of the block, remove those that ended
+		started = np.searchsorted(startFrames, fEnd)
+		active = np.sort(np.concatenate([active, order[nStarted: started]]))
+		nStarted = started
+		active = active[frames[active, 1] > fStart]
+
+		accumulate_(block, fix_list[active], np.clip(frames[active] - fStart, 0, block.shape[0]), pvi, gauss_sigma, nBands)
+		yield fStart, block
+
+def _getFrames(fix_list, time_cut, length):
+	# Frames [Scut, Ecut) of each fixation (slicing semantics of saliencymap[Scut:Ecut])
+	return np.array([slice(time_cut[int(fix[5])]-1, min(time_cut[int(fix[6])], length)).indices(length)[:2] for fix in fix_list],
+		dtype=np.int64).reshape([-1, 2])
+
+def addWrapped_(saliencymap, kernel, y0, x0):
+	"""
+	Add kernel to the last two dimensions of saliencymap with its top-left corner at (y0, x0), wrapping around the map's borders
+	"""
+	H, W = saliencymap.shape[-2:]
+	# Split rows and columns in at most two contiguous ranges each
+	rows = [(y % H, y % H + n, iy) for y, n, iy in _splitRange(y0, kernel.shape[0], H)]
+	cols = [(x % W, x % W + n, ix) for x, n, ix in _splitRange(x0, kernel.shape[1], W)]
+	for ys, ye, iy in rows:
+		for xs, xe, ix in cols:
+			saliencymap[..., ys:ye, xs:xe] += kernel[iy: iy+ye-ys, ix: ix+xe-xs]
+
+def _splitRange(start, n, size):
+	# Ranges (start, length, offset in kernel) of [start, start+n) that do not cross a multiple of size
+	ranges = []
+	offset = 0
+	while offset < n:
+		length = min(n - offset, size - (start+offset) % size)
+		ranges.append((start+offset, length, offset))
+		offset += length
+	return ranges
+
+class KernelCache():
+	"""
+	LRU cache of Gaussian footprints drawn by saliencyOp_, keyed by (map height, width, sigma, latitude row).
+	A footprint only depends on its latitude row: it is computed once for a fixation at the centre of a pixel of that row and shifted in longitude for every fixation of the row.
+	Fixations are thus moved to the centre of their pixel, the map differs from saliencyOp_'s by less than a pixel's displacement of each Gaussian.
+	Least recently used footprints are evicted when they take more than maxBytes.
+	"""
+	def __init__(self, maxBytes=2**28):
+		from collections import OrderedDict
+
+		self.maxBytes = maxBytes
+		self.nbytes = 0
+		self.kernels = OrderedDict()
+
+	def clear(self):
+		self.kernels.clear()
+		self.nbytes = 0
+
+	def get(self, dim, gauss_sigma, row):
+		"""
+		Footprint of a fixation on latitude `row` of a map of dimension `dim` (sigma in rad).
+		Returns the footprint and its top-left corner relative to the fixation's pixel.
+		"""
+		key = (int(dim[0]), int(dim[1]), float(gauss_sigma), int(row))
+		if key in self.kernels:
+			self.kernels.move_to_end(key)
+			return self.kernels[key]
+
+		height, width = key[:2]
+		# Fixation at the centre of a pixel away from the longitudinal wrap
+		col = width//2
+		pos = np.array([(col+.5) / width, (row+.5) / height])
+		Y, X = getGaussianSupport(np.array(dim), pos, gauss_sigma)
+
+		# Unit vector of (long, lat) (see processing.extract.getFixationFeatures)
+		lon, lat = (pos[0] + .25) * 2*np.pi, (.5 - pos[1]) * np.pi
+		fix = np.array([np.cos(lat) * np.sin(lon), np.cos(lat) * np.cos(lon), np.sin(lat)])
+
+		# Grid points of the support window only (see getSphereGridPoints3D_)
+		Ex = (np.pi*2) - X / (width-1) * (np.pi*2)
+		Ey = (np.where(Y < 0, Y+height, Y) / (height-1)) * np.pi
+		Ey, Ex = np.meshgrid(Ey, Ex, indexing="ij")
+		pvi = np.empty([*Ey.shape, 3])
+		pvi[..., 0] = np.sin(Ey) * np.cos(Ex)
+		pvi[..., 1] = np.sin(Ey) * np.sin(Ex)
+		pvi[..., 2] = np.cos(Ey)
+
+		kernel = getGaussian_(pvi, fix, gauss_sigma)
+		entry = (kernel, int(Y[0]) - row if Y.shape[0] > 0 else 0, int(X[0]) - col if X.shape[0] > 0 else 0)
+
+		self.kernels[key] = entry
+		self.nbytes += kernel.nbytes
+		while self.nbytes > self.maxBytes and len(self.kernels) > 1:
+			_, (old, _, _) = self.kernels.popitem(last=False)
+			self.nbytes -= old.nbytes
+
+		return entry
+
+	def saliencyOp(self, saliencymap, fix, gauss_sigma):
+		"""
+		Same as saliencyOp_ with a cached footprint (fix: x, y, z, long, lat)
+		"""
+		dim = saliencymap.shape[-2:]
+		row, col = int(fix[4] * dim[0]), int(fix[3] * dim[1])
+
+		kernel, dy, dx = self.get(dim, gauss_sigma, row)
+		addWrapped_(saliencymap, kernel, row+dy, col+dx)
+
+# Shared by getSaliency and getSaliencyDyn when cache=True
+kernelCache = KernelCache()
+
 def getSphereGridPoints3D_(height, width):
 	"""
 	Return an array containing 3D unit vectors at the location of each pixel in the saliency map to output
@@ -104,28 +385,139 @@ def getSphereGridPoints3D_(height, width):
 
 	return pvi
 
-def getSaliency(saliencymap, fix_list, gauss_sigma=2, callback=None, **kwargs):
+class SphereGridCache():
+	"""
+	Process-wide LRU cache of sphere grid points (see getSphereGridPoints3D_) keyed by resolution, stored as float32 by default.
+	Least recently used grids are evicted when they take more than maxBytes.
+	With shared=True, grids are stored in named shared memory blocks: worker processes calling get(..., shared=True) attach to a grid created by their parent instead of building it.
+	Create shared grids before starting workers, blocks are unlinked by the process that created them on eviction, clear() or exit (not by forked workers inheriting the cache).
+	"""
+	def __init__(self, maxBytes=2**30):
+		from collections import OrderedDict
+		import atexit
+
+		self.maxBytes = maxBytes
+		self.nbytes = 0
+		# key: (grid, shared memory block or None, PID of the process that created the block or None)
+		self.grids = OrderedDict()
+		atexit.register(self.clear)
+
+	@staticmethod
+	def sharedName(height, width, dtype):
+		return "salient360_grid_{}x{}_{}".format(height, width, np.dtype(dtype).name)
+
+	def get(self, height, width, dtype=np.float32, shared=False):
+		"""
+		Grid of unit vectors of shape (height, width, 3)
+		"""
+		key = (int(height), int(width), np.dtype(dtype).name, bool(shared))
+		if key in self.grids:
+			self.grids.move_to_end(key)
+			return self.grids[key][0]
+
+		block, creator = None, None
+		if shared:
+			grid, block, created = self._getShared(height, width, dtype)
+			if created: creator = os.getpid()
+		else:
+			grid = np.empty([height, width, 3], dtype=dtype)
+			self._fill(grid)
+
+		self.grids[key] = (grid, block, creator)
+		self.nbytes += grid.nbytes
+		while self.nbytes > self.maxBytes and len(self.grids) > 1:
+			self._evict(*self.grids.popitem(last=False))
+
+		return grid
+
+	@staticmethod
+	def _fill(grid):
+		# Same points as getSphereGridPoints3D_, component by component to bound temporary memory
+		height, width = grid.shape[:2]
+		Ex = (np.pi*2) - np.arange(width) / (width-1) * (np.pi*2)
+		Ey = (np.arange(height) / (height-1)) * np.pi
+
+		grid[:, :, 0] = np.sin(Ey)[:, None] * np.cos(Ex)[None, :]
+		grid[:, :, 1] = np.sin(Ey)[:, None] * np.sin(Ex)[None, :]
+		grid[:, :, 2] = np.cos(Ey)[:, None]
+
+	def _getShared(self, height, width, dtype):
+		from multiprocessing import shared_memory
+		import weakref
+
+		name = self.sharedName(height, width, dtype)
+		nbytes = height * width * 3 * np.dtype(dtype).itemsize
+		try:
+			block = shared_memory.SharedMemory(name=name, create=True, size=nbytes)
+			created = True
+		except FileExistsError:
+			created = False
+			# Only the creating process unlinks the block
+			try:
+				block = shared_memory.SharedMemory(name=name, track=False)
+			except TypeError:
+				# Python < 3.13, the block is already tracked if workers share their parent's resource tracker
+				block = shared_memory.SharedMemory(name=name)
+
+		grid = np.ndarray([height, width, 3], dtype=dtype, buffer=block.buf)
+		# The array does not keep the block mapped: close it only when the grid and its views are released
+		weakref.finalize(grid, block.close)
+		if created:
+			self._fill(grid)
+		return grid, block, created
+
+	def _evict(self, key, entry):
+		grid, block, creator = entry
+		self.nbytes -= grid.nbytes
+		# Shared blocks are closed once their grid is released (see _getShared)
+		# Forked workers inherit entries of their parent: only the creating process unlinks the block
+		if creator is not None and creator == os.getpid(): block.unlink()
+
+	def clear(self):
+		while len(self.grids) > 0:
+			self._evict(*self.grids.popitem(last=False))
+
+# Used by getSaliency and getSaliencyDyn
+sphereGridCache = SphereGridCache()
+
+def _getKernelCache(cache):
+	# cache: None/False (exact Gaussians), True (shared kernelCache) or a KernelCache
+	if cache is True: return kernelCache
+	return cache if cache else None
+
+def getSaliency(saliencymap, fix_list, gauss_sigma=2, callback=None, cache=None, **kwargs):
 	# Pass fix_list of a frame or whole stimulus
 	# toImage and toFrames call this function
 	# Returns a matrix (W, H) or (W, H, nFrames)
 	#	Send returned data to
 	#		toImage, toFrames, toBin, toBinFrames
+	# cache: draw cached Gaussian footprints (see KernelCache), True for the shared cache
 
 	printNeutral("Computing saliency data", verbose=1)
 
 	SalMapRes = saliencymap.shape
 
-	pvi = getSphereGridPoints3D_(SalMapRes[0], SalMapRes[1])
+	cache = _getKernelCache(cache)
+	pvi = sphereGridCache.get(SalMapRes[0], SalMapRes[1]) if cache is None else None
 
 	gauss_sigma = np.deg2rad(gauss_sigma)
 
 	progressStep = max(1, fix_list.shape[0]//25) # 50 steps max to show progression
+
+	if cache is None:
+		# Compiled and parallel (see accumulate_)
+		frames = np.tile([[0, 1]], [fix_list.shape[0], 1])
+		_accumulate(saliencymap[None], fix_list, frames, pvi, gauss_sigma, callback, progressStep,
+			lambda iEnd: printNorm("{:>6.2%}%".format(iEnd/fix_list.shape[0]), clear=True, end="", verbose=0))
+		clearline()
+		return
+
 	for iFix in range(fix_list.shape[0]):
 
 		# Non-optimized method
 		# saliencymap += np.exp(-( ((pvi[:, :, :] - fix_list[iFix][:3])**2) / (2*gaussSigma**2)).sum(axis=2)); continue
 
-		saliencyOp_(saliencymap, fix_list[iFix, :5], pvi, gauss_sigma)
+		cache.saliencyOp(saliencymap, fix_list[iFix, :5], gauss_sigma)
 
 		if callback is not None and iFix % progressStep == 0:
 			continue_ = callback((iFix+1)/fix_list.shape[0])
@@ -134,16 +526,104 @@ def getSaliency(saliencymap, fix_list, gauss_sigma=2, callback=None, **kwargs):
 		printNorm("{:>6.2%}%".format((iFix+1)/fix_list.shape[0]), clear=True, end="", verbose=0)
 	clearline()
 
-def getSaliencyDyn(saliencymap, fix_list, gauss_sigma=2, time_cut=None, callback=None):
+def getSaliencyHistogram(saliencymap, fix_list, gauss_sigma=2, callback=None, **kwargs):
+	"""
+	Same as getSaliency, with a cost depending on the map's size rather than the number of points (e.g., raw gaze samples), but for points near the poles.
+	Points (x,y,z, long,lat) are binned on the pixel grid of getSphereGridPoints3D_, the histogram is then blurred with:
+		- row by row horizontal kernels with longitude wrap-around, widened by 1/cos(latitude),
+		- a vertical kernel along meridians.
+	Both kernels are truncated to the support window of getGaussianSupport. Their product is the Gaussian of the chord distance drawn by saliencyOp_ (exp(-d²/2σ²)), with cos(latitude) of the target row replaced by that of the point's row.
+	Near the poles this separable blur is wrong: cos(latitude) varies quickly and points across a pole are not reached by the vertical pass.
+	With a 250x500 map, σ=4 and 20000 points, rows 0-1 and 247-249 came out at about half of getSaliency's values (correlation 0.72 with beta(2,2) latitudes, 0.976 uniform).
+	Rows within Sy (support height of getGaussianSupport) of either pole are thus drawn exactly from the points whose support reaches them:
+	the cost grows with the number of points near the poles, up to that of getSaliency for points spread uniformly over a coarse map or a large σ.
+	Error bound versus getSaliency on other rows, per point (Gaussians have a peak value of 1):
+		- binning moves a point by at most δ, half the diagonal of a pixel (rad), changing its Gaussian by at most δ/(σ·sqrt(e)) ≈ 0.61·δ/σ,
+		- the horizontal kernel differs by at most |cos(lat_target)/cos(lat_point) - 1|/e, 0 on the point's row and growing towards the poles.
+	A pixel's error is at most the sum of these bounds over points whose support window covers it.
+	"""
+	printNeutral("Computing saliency data (histogram)", verbose=1)
+
+	H, W = saliencymap.shape[-2:]
+	gauss_sigma = np.deg2rad(gauss_sigma)
+
+	# Nearest grid point (see getSphereGridPoints3D_): row = lat * (H-1), column = long * (W-1)
+	rows = np.rint(np.clip(fix_list[:, 4], 0, 1) * (H-1)).astype(int)
+	cols = np.rint(np.mod(fix_list[:, 3], 1) * (W-1)).astype(int) % W
+	hist = np.bincount(rows * W + cols, minlength=H*W).reshape([H, W]).astype(float)
+
+	if callback is not None and not callback(.3): return None
+
+	# Horizontal pass on rows with points: circular convolution (FFT) with one kernel per row
+	occupied = np.where(hist.any(axis=1))[0]
+	# cos(latitude) of grid rows
+	cosLat = np.sin(occupied / (H-1) * np.pi)
+	# Support of getGaussianSupport: columns [-Sx//2, Sx//2) around the point
+	Sx = np.minimum(W, (W * ((1 + np.tan(np.abs(occupied / (H-1) * np.pi - np.pi/2))) * (gauss_sigma*1.5))).astype(int))
+	offsets = np.arange(W)
+	offsets = np.where(offsets < W - offsets, offsets, offsets - W)
+	inSupport = (offsets[None, :] >= -(Sx[:, None]//2)) & (offsets[None, :] < Sx[:, None]//2)
+	# Chord distance along the parallel: 2-2cos(dlong) scaled by cos²(latitude)
+	chord = 2 - 2*np.cos(offsets * (2*np.pi / (W-1)))
+	kernels = np.exp(-(cosLat[:, None]**2 * chord[None, :]) / (2 * gauss_sigma**2)) * inSupport
+
+	blurred = np.zeros([H, W])
+	blurred[occupied] = np.fft.irfft(np.fft.rfft(hist[occupied], axis=1) * np.fft.rfft(kernels, axis=1), n=W, axis=1)
+
+	if callback is not None and not callback(.6): return None
+
+	# Vertical pass: rows [-Sy//2, Sy//2) around the point, not continued across the poles
+	Sy = int(H * np.sin(gauss_sigma*2.5))
+	out = np.zeros([H, W])
+	for k in range(-(Sy//2), Sy//2):
+		weight = np.exp(-(2 - 2*np.cos(k * np.pi / (H-1))) / (2 * gauss_sigma**2))
+		if k >= 0:
+			out[k:] += weight * blurred[:H-k]
+		else:
+			out[:k] += weight * blurred[-k:]
+
+	# FFT round-off
+	np.maximum(out, 0, out=out)
+
+	# Rows within Sy of a pole are drawn exactly (accumulate_) from the points whose support window reaches them
+	band = min(Sy, (H+1)//2)
+	pointRows = (np.clip(fix_list[:, 4], 0, 1) * H).astype(int)
+	near = (pointRows < band + Sy//2 + 1) | (pointRows >= H - band - Sy//2 - 1)
+	if band > 0 and near.any():
+		exact = np.zeros([1, H, W])
+		_accumulate(exact, fix_list[near], np.tile([[0, 1]], [near.sum(), 1]), sphereGridCache.get(H, W), gauss_sigma)
+		out[:band] = exact[0, :band]
+		out[H-band:] = exact[0, H-band:]
+
+	saliencymap += out.astype(saliencymap.dtype)
+
+	if callback is not None: callback(1.)
+
+def getSaliencyDyn(saliencymap, fix_list, gauss_sigma=2, time_cut=None, callback=None, cache=None, difference=False):
+	# difference: draw frames from a difference array of Gaussians (see accumulateDiff_), each Gaussian is computed when its fixation starts and ends instead of on every frame it covers.
+	#	Faster for long fixations, values differ from the default by float32 round-off
 
 	length = saliencymap.shape[0]
 	SalMapRes = saliencymap.shape[1:]
 
-	pvi = getSphereGridPoints3D_(SalMapRes[0], SalMapRes[1])
+	cache = _getKernelCache(cache)
+	pvi = sphereGridCache.get(SalMapRes[0], SalMapRes[1]) if cache is None else None
 
 	gauss_sigma = np.deg2rad(gauss_sigma)
 
 	progressStep = max(1, fix_list.shape[0]//50) # 50 steps max to show progression
+
+	if cache is None:
+		frames = _getFrames(fix_list, time_cut, length)
+		if difference:
+			_accumulateDiff(saliencymap, fix_list, frames, pvi, gauss_sigma, callback, max(1, length//50),
+				lambda fEnd: printNorm("frame:", fEnd, end="", clear=True, verbose=0))
+		else:
+			_accumulate(saliencymap, fix_list, frames, pvi, gauss_sigma, callback, progressStep,
+				lambda iEnd: printNorm("iFix:", iEnd, end="", clear=True, verbose=0))
+		clearline()
+		return
+
 	for iFix in range(fix_list.shape[0]):
 
 		# Start cut
@@ -151,7 +631,7 @@ def getSaliencyDyn(saliencymap, fix_list, gauss_sigma=2, time_cut=None, callback
 		# End cut
 		Ecut = min(time_cut[int(fix_list[iFix, 6])], length)
 
-		saliencyOp_(saliencymap[Scut:Ecut, :, :], fix_list[iFix, :5], pvi, gauss_sigma)
+		cache.saliencyOp(saliencymap[Scut:Ecut, :, :], fix_list[iFix, :5], gauss_sigma)
 
 		if callback is not None and iFix % progressStep == 0:
 			continue_ = callback((iFix+1)/fix_list.shape[0])
@@ -160,6 +640,30 @@ def getSaliencyDyn(saliencymap, fix_list, gauss_sigma=2, time_cut=None, callback
 		printNorm("iFix:", iFix+1, end="", clear=True, verbose=0)
 	clearline()
 
+def iterSaliencyDyn(fix_list, dim, gauss_sigma=2, time_cut=None, difference=False, blockSize=None, dtype=np.float32):
+	"""
+	Saliency video of getSaliencyDyn (dim: frames, height, width) generated in temporal order by blocks of blockSize frames, without allocating the whole video.
+	Yields the first frame of each block and the block (blockSize, height, width), only the block under construction is kept in memory.
+	By default blocks take up to 64MB. Same values as getSaliencyDyn with the same difference argument.
+	Write blocks to a binary file with saveBinFrames.
+	"""
+	length, height, width = [int(d) for d in dim]
+	if blockSize is None:
+		blockSize = max(1, 2**26 // (height * width * np.dtype(dtype).itemsize))
+
+	pvi = sphereGridCache.get(height, width)
+	gauss_sigma = np.deg2rad(gauss_sigma)
+	frames = _getFrames(fix_list, time_cut, length)
+
+	draw = _drawDiff if difference else _drawActive
+	# Blocks of other dtypes are drawn in float32 (see _accumulateScratch)
+	drawType = dtype if np.dtype(dtype) in _COMPILED_DTYPES else np.float32
+	blocks = ((fStart, np.zeros([min(blockSize, length-fStart), height, width], dtype=drawType)) for fStart in range(0, length, blockSize))
+	for fStart, block in draw(blocks, fix_list, frames, pvi, gauss_sigma):
+		printNorm("frame:", fStart+block.shape[0], end="", clear=True, verbose=0)
+		yield fStart, block.astype(dtype, copy=False)
+	clearline()
+
 def toImage(sal_map, cmap=None, reverse=False):
 	"""
 	DOC
@@ -207,6 +711,37 @@ def saveBin(mat, path_file, type_="salmap", force=False, callback=None):
 
 	return final_path
 
+def saveBinFrames(blocks, path_file, shape, type_="salmap", force=False, callback=None):
+	"""
+	Write blocks of frames (first frame, frames) given in temporal order (see iterSaliencyDyn) to a binary file named as by saveBin, without holding the whole video in memory.
+	The file is written under a temporary name and renamed once complete. Returns the path to the file, None if stopped by callback.
+	"""
+	dtype = np.dtype(np.float32)
+	final_path = path_file+"_{}_{}b_{}.bin".format(
+					"x".join([str(dim) for dim in shape[::-1]]),
+					dtype.alignment*8, type_)
+
+	if not force and os.path.exists(final_path):
+		return final_path
+
+	with open(final_path+".part", "wb") as f:
+		for fStart, block in blocks:
+			assertC(fStart*np.prod(shape[1:])*dtype.itemsize == f.tell(), "function \"saveBinFrames\" expects consecutive blocks of frames. Got frame {}.".format(fStart), printIfFail=True)
+			block.astype(dtype, copy=False).tofile(f)
+
+			if callback is not None:
+				continue_ = callback((fStart+block.shape[0])/shape[0])
+				if not continue_: break
+		else:
+			continue_ = True
+
+	if not continue_:
+		os.remove(final_path+".part")
+		return None
+	os.replace(final_path+".part", final_path)
+
+	return final_path
+
 def saveImages(mat, path_folder, extension="png", blend=None, force=False, ignore_prompt=False):
 	assertC(len(mat.shape) == 3, "function \"saveImages\" expects a 3D tensor (n_frames, px_height, px_width). Got {}.".format(mat.shape), printIfFail=True)
 
@@ -49,6 +49,9 @@ def toFile(fix_list, output_name, mode="w", saveArr=None, header=None, fmt=None)
 		27: relative angle between two consecutive saccades: Eye (rad.)
 		28: relative angle between two consecutive saccades: Head (rad.)
 	"""
+	from ..utils.fixationList import FixationList
+	if isinstance(fix_list, FixationList): fix_list = fix_list.toArray()
+
 	if saveArr is None: saveArr = [9, 0, 1, 12]
 	if header is None: header = scanpath_header.split(",")
 	if fmt is None: fmt = scanpath_fmt.split(",")
@@ -9,14 +9,10 @@
 import numpy as np
 
 from .utils.misc import *
+from .utils.gazeSchema import probeSchema, GazeSchema
 
 def getCleanHeaderList(path, delimiter=","):
-	import re
-	with open(path, "r") as file:
-		header = file.readline().lower()
-		header = re.sub("[^a-zA-Z{}]".format(delimiter), "", header) 
-		header = np.array([name.strip() for name in header.split(delimiter)])
-	return header
+	return np.array(probeSchema(path, delimiter=delimiter).cleanHeader)
 
 def getColumnIndex(header, targets):
 	if type(targets) not in [list, str]:
@@ -31,100 +27,30 @@ def getColumnIndex(header, targets):
 	return idx[0] if len(idx) > 0 else None
 
 def FindRawFeaturesByHeader(filepath, returnValid=False):
-	header = getCleanHeaderList(filepath)
+	# filepath can also be a GazeSchema returned by probeSchema
+	schema = probeSchema(filepath)
 
-	indices = {}
-
-	indices["ts"] = getColumnIndex(header, ["oculots", "oculotimestamp", "ocutimestamp", "etts", "timestamp", "ts"])
-
-	indices["xRayL"] = getColumnIndex(header, ["leftgazex", "leftgazedirx", "lgazex", "xlgaze", "lefteyedirectionx", "leftgazedirectionx"])
-	indices["yRayL"] = getColumnIndex(header, ["leftgazey", "leftgazediry", "lgazey", "ylgaze", "lefteyedirectiony", "leftgazedirectiony"])
-	indices["zRayL"] = getColumnIndex(header, ["leftgazez", "leftgazedirz", "lgazez", "zlgaze", "lefteyedirectionz", "leftgazedirectionz"])
-
-	indices["xRayR"] = getColumnIndex(header, ["rightgazex", "rightgazedirx", "rgazex", "xrgaze", "righteyedirectionx", "rightgazedirectionx"])
-	indices["yRayR"] = getColumnIndex(header, ["rightgazey", "rightgazediry", "rgazey", "yrgaze", "righteyedirectiony", "rightgazedirectiony"])
-	indices["zRayR"] = getColumnIndex(header, ["rightgazez", "rightgazedirz", "rgazez", "zrgaze", "righteyedirectionz", "rightgazedirectionz"])
-
-	indices["xRayB"] = getColumnIndex(header, ["bingazex", "bingazedirx", "meangazedirx", "lgazex", "xlgaze", "meangazedirectionx", "meangazedirectionx"])
-	indices["yRayB"] = getColumnIndex(header, ["bingazey", "bingazediry", "meangazediry", "lgazey", "ylgaze", "meangazedirectiony", "meangazedirectiony"])
-	indices["zRayB"] = getColumnIndex(header, ["bingazez", "bingazedirz", "meangazedirz", "lgazez", "zlgaze", "meangazedirectionz", "meangazedirectionz"])
-
-	indices["xCam"] = getColumnIndex(header, ["xcam", "camx", "headx", "xhead", "camerarotationx", "cameraquaternionx"])
-	indices["yCam"] = getColumnIndex(header, ["ycam", "camy", "heady", "yhead", "camerarotationy", "cameraquaterniony"])
-	indices["zCam"] = getColumnIndex(header, ["zcam", "camz", "headz", "zhead", "camerarotationz", "cameraquaternionz"])
-	indices["wCam"] = getColumnIndex(header, ["wcam", "camw", "headw", "whead", "camerarotationw", "cameraquaternionw"])
-
-	indices["piCam"] = getColumnIndex(header, ["pitch", "campitch", "pitchcam", "pitchead", "headpitch"])
-	indices["yaCam"] = getColumnIndex(header, ["yaw", "camyaw", "yawcam", "yawhead", "headyaw"])
-	indices["roCam"] = getColumnIndex(header, ["roll", "camroll", "rollcam", "rollhead", "headroll"])
-
-	indices["valR"] = getColumnIndex(header, ["valr", "rval"])
-	indices["valL"] = getColumnIndex(header, ["vall", "lval"])
+	indices = dict(schema.raw)
 
 	if returnValid:
 		# test if there is enough data to continue
+		valid = {"eye": dict(schema.rawValid["eye"]),
+				 "head": dict(schema.rawValid["head"])}
 
-		# Do we have gaze-dir-relative-to-head data?
-		dirDataR = (indices["xRayR"] is not None,
-				indices["yRayR"] is not None,
-				indices["zRayR"] is not None)
-		dirDataL = (indices["xRayL"] is not None,
-				indices["yRayL"] is not None,
-				indices["zRayL"] is not None)
-		dirDataB = (indices["xRayB"] is not None,
-				indices["yRayB"] is not None,
-				indices["zRayB"] is not None)
-
-		# Do we have head rotations as quaternions?
-		CamQuat = (indices["xCam"] is not None,
-				indices["yCam"] is not None,
-				indices["zCam"] is not None,
-				indices["wCam"] is not None)
-
-		# Do we have head rotations as Euler angles?
-		CamEuler = (indices["piCam"] is not None,
-				indices["yaCam"] is not None,
-				indices["roCam"] is not None)
-
-		valid =  {"eye": {"L": np.all(dirDataL),
-						  "R": np.all(dirDataR),
-						  "B": (np.all(dirDataL) and np.all(dirDataR)) or np.all(dirDataB),
-						  },
-				  "head": {"Q": np.all(CamQuat),
-				  		   "E": np.all(CamEuler)
-				  		  }
-				  }
-		
 		return indices, valid
 
 	return indices
 
 def FindFixlistFeaturesByHeader(filepath, returnValid=False):
-	header = getCleanHeaderList(filepath)
-
-	indices = {}
+	# filepath can also be a GazeSchema returned by probeSchema
+	schema = probeSchema(filepath)
 
 	# target data column positions in text file
-	indices["lon"] = getColumnIndex(header, ["lon", "longitude", "longaze", "longgaze"])
-	indices["lat"] = getColumnIndex(header, ["lat", "latitude", "latgaze"])
-
-	indices["x"] = getColumnIndex(header, ["x", "xsph", "xgaze"])
-	indices["y"] = getColumnIndex(header, ["y", "ysph", "ygaze"])
-	indices["z"] = getColumnIndex(header, ["z", "zsph", "zgaze"])
-
-	indices["ts"] = getColumnIndex(header, ["time", "starttimestamp", "timestamp", "timestart"])
-	indices["dur"] = getColumnIndex(header, ["dur", "duration"])
-	indices["idx"] = getColumnIndex(header, ["idx", "index", "i"])
+	indices = dict(schema.fixlist)
 
 	if returnValid:
 		# test if there is enough data to continue
-
-		# Do we have long/lat data?
-		valid = not (indices["lon"] is None and indices["lat"] is None)
-		# Do we have a 3D direction vector?
-		valid |= not (indices["x"] is None and indices["y"] is None and indices["z"] is None)
-	
-		return indices, valid
+		return indices, schema.fixlistValid
 
 	return indices
 
@@ -170,12 +96,19 @@ def parsingSettings(opts):
 	for pars_opt in pars_opts:
 		pars_opt = pars_opt.split("=")
 		if len(pars_opt) == 2:
-			parserParam[pars_opt[0]] = float(pars_opt[1])
+			# Non numerical parameters are kept as strings (e.g., path to a saved model)
+			try: parserParam[pars_opt[0]] = float(pars_opt[1])
+			except ValueError: parserParam[pars_opt[0]] = pars_opt[1]
 
 	return {"name": parserName, "params": parserParam}
 
-def loadRawData(path, eye="R", return_fixlist=True, **kwargs):
-	idx, valid = FindRawFeaturesByHeader(path, returnValid=True)
+def loadRawData(path, eye="R", return_fixlist=True, blocksize=2**16,
+	# Keep parsed columns in a binary cache next to the recording (see utils.rawCache)
+	caching=False,
+	# GazeSchema of the file if it was already probed (see utils.gazeSchema.probeSchema)
+	schema=None,
+	**kwargs):
+	idx, valid = FindRawFeaturesByHeader(path if schema is None else schema, returnValid=True)
 
 	idx_load = []
 	# 0: timestamp
@@ -213,27 +146,25 @@ def loadRawData(path, eye="R", return_fixlist=True, **kwargs):
 		1,2,3,4: camera rotation as quaternion (or Euler) (W,X,Y,Z)
 		5,6,7: gaze direction vector relative to camera rotation (X,Y,Z)
 	"""
-	with open(path, "r") as f:
-		l = f.readline().strip()
-		l = l.split(",")
-		printNeutral("Loading the following columns from raw data files:\n{}".format([l[i] for i in idx_load]), header="Func loadRawData")
-
-	raw_data = np.loadtxt(path,
-		# Columns are separated by a comma
-		delimiter=",",
-		# Extract columns identified previously
-		usecols=idx_load,
-		# We suppose that the first row is the header, we skip it
-		skiprows=1)
-		#.astype(np.float32) # Will cut timestamp precision and produce duplicate samples
+	from .utils.readRawFile import RawDataReader
+
+	# Only converts the selected columns, block by block
+	raw_data = RawDataReader(path, usecols=idx_load, blocksize=blocksize)
+
+	printNeutral("Loading the following columns from raw data files:\n{}".format([raw_data.header[i] for i in idx_load]), header="Func loadRawData")
+
+	if caching:
+		from .utils.rawCache import loadCached
+		# Memory-mapped on cache hit, parsed and saved otherwise
+		raw_data = loadCached(path, idx_load, eye, raw_data.read)
 
 	if return_fixlist:
-		return getFixationList(raw_data, eye=eye, **kwargs)
+		return getFixationList(raw_data, eye=eye, blocksize=blocksize, **kwargs)
 		
-	return raw_data
+	return raw_data if caching else raw_data.read()
 
-def loadFixlist(path):
-	idx = FindFixlistFeaturesByHeader(path)
+def loadFixlist(path, schema=None):
+	idx = FindFixlistFeaturesByHeader(path if schema is None else schema)
 
 	if None in [idx["lon"], idx["lat"]]:
 		return -1
@@ -309,6 +240,13 @@ def getFixationList(raw_data,
 	return_keep=False,
 	# Return velocity signal
 	return_velocity=False,
+	# Process data window by window with bounded memory (see processing.streaming)
+	#	Otherwise raw_data given as blocks of rows (e.g., utils.readRawFile.RawDataReader) is loaded whole in memory
+	streaming=False,
+	# Number of raw data rows per window when streaming
+	blocksize=2**16,
+	# Run the common path (I-VT, no resampling, filtering or outlier removal) in a single compiled pass (see processing.fused)
+	fused=False,
 	**kwargs):
 
 	from . import processing
@@ -321,8 +259,8 @@ def getFixationList(raw_data,
 	if parser is None:
 		parser = {"name": "I-VT", "params": {"threshold": 120}}
 
-	if type(raw_data) != np.ndarray:
-		printError("Argument \"raw_data\" must be of type str or numpy.ndarray. Got \"{}\"".format(type(raw_data)), verbose=0)
+	if np.ndim(tempWindowSize) > 0:
+		printError("Argument \"tempWindowSize\" must be a single window size. Use sweepHeadWindow to evaluate several window sizes.", header="getFixationList", verbose=0)
 
 		ret = [None, None]
 		if return_label: ret.append(None)
@@ -330,6 +268,53 @@ def getFixationList(raw_data,
 		if return_velocity: ret.append(None)
 		return ret
 
+	if streaming:
+		fix_list = [fixations for fixations in iterFixationList(raw_data, tempWindowSize=tempWindowSize, tracking=tracking,
+			eye=eye, resample=resample, filter=filter, parser=parser, Euler2Quat=Euler2Quat, data_range=data_range,
+			callback=callback, remove_outliers=return_keep, blocksize=blocksize, **kwargs)]
+		fix_list = np.concatenate(fix_list) if len(fix_list) > 0 else np.empty([0, 29])
+
+		# Gaze samples are not kept in memory in streaming mode
+		ret = [None, fix_list]
+		if return_label: ret.append(None)
+		if return_keep: ret.append(None)
+		if return_velocity: ret.append(None)
+		return ret
+
+	if not isinstance(raw_data, np.ndarray) and hasattr(raw_data, "__iter__"):
+		# Blocks of rows (e.g., utils.readRawFile.RawDataReader)
+		#	Preprocessing, resampling, filtering and parsing work on the whole recording: blocks are stacked in memory here.
+		#	Use streaming=True to process blocks without loading the whole recording
+		from .utils.readRawFile import stackBlocks
+		raw_data = stackBlocks(raw_data)
+
+	if not isinstance(raw_data, np.ndarray):
+		printError("Argument \"raw_data\" must be of type numpy.ndarray or an iterable of row blocks. Got \"{}\"".format(type(raw_data)), verbose=0)
+
+		ret = [None, None]
+		if return_label: ret.append(None)
+		if return_keep: ret.append(None)
+		if return_velocity: ret.append(None)
+		return ret
+
+	if fused:
+		if tracking != "HE" or parser["name"] != "I-VT" or filter["name"] != "None" or return_keep\
+			or (type(resample) in [int, float] and resample > 0):
+			printWarning("Fused mode only supports head+eye data (tracking=\"HE\") parsed with I-VT, without resampling, filtering or outlier removal. Running the staged pipeline.", header="getFixationList")
+		else:
+			from .processing.fused import getFixationList as getFixationListFused
+
+			params = parser.get("params", {})
+			fix_list = getFixationListFused(raw_data, data_range=data_range, eye=eye,
+				threshold=params.get("threshold", 100), minFixationTime=params.get("minFixationTime", 80),
+				Euler2Quat=Euler2Quat, callback=callback)
+
+			# Gaze samples, labels and velocity are never materialised in fused mode
+			ret = [None, fix_list]
+			if return_label: ret.append(None)
+			if return_velocity: ret.append(None)
+			return ret
+
 	if Euler2Quat:
 		callback(0, "Converting Euler angles to Quaternions.")
 		printNeutral("Converting Euler angles to Quaternion. Assuming data comes from unity!")
@@ -383,12 +368,7 @@ def getFixationList(raw_data,
 			velocity = velocity[keep]
 
 		# Smooth velocity
-		if filter["name"][0].lower() == "g":
-			from scipy.ndimage.filters import gaussian_filter1d
-			velocity = gaussian_filter1d(velocity, filter["params"]["sigma"])
-		elif filter["name"][0].lower() == "s":
-			from scipy.signal import savgol_filter
-			velocity = savgol_filter(velocity, int(filter["params"]["win"]), int(filter["params"]["poly"]))
+		velocity = processing.identify.commons.filterVelocity(velocity, filter)
 
 		# Label each gaze points as fixation or saccade (or blink)
 		if parser["name"] == "I-VT":
@@ -397,14 +377,19 @@ def getFixationList(raw_data,
 		elif parser["name"] == "I-HMM":
 			label_list = parsers[parser["name"]](velocity,
 				**parser["params"], callback=callback)
-		elif parser["name"] == "I-CT":
+		elif parser["name"] in ["I-CT", "I-DT"]:
 			label_list = parsers[parser["name"]](gaze_data[:, [0,1,2, 9]],
 				**parser["params"], callback=callback)
+		elif parser["name"] == "None":
+			# Preprocessing and velocity only
+			label_list = None
 
 	# Get scanpath information as a list of saccade/fixation features
 	#	Velocity is necessary for saccade peak velocity feature
-	fix_list = processing.extract.getGazeFeatures(gaze_data, label_list,
-		velocity=velocity)
+	fix_list = None
+	if label_list is not None:
+		fix_list = processing.extract.getGazeFeatures(gaze_data, label_list,
+			velocity=velocity)
 
 	ret = [gaze_data, fix_list]
 	if return_label: ret.append(label_list)
@@ -412,6 +397,141 @@ def getFixationList(raw_data,
 	if return_velocity: ret.append(velocity)
 	return ret
 
+def sweepFixationList(raw_data,
+	# Velocity thresholds (deg/sec)
+	thresholds=np.arange(20, 220, 20),
+	# Minimum fixation durations (ms)
+	minFixationTimes=[80],
+	# Velocity filters (see getFixationList)
+	filters=[None],
+	# Return fixation markers of each parameter combination
+	return_labels=False,
+	**kwargs):
+	"""
+	I-VT parameter sweep: raw data is preprocessed and velocity computed once, then every combination of filter x threshold x minimum fixation duration is evaluated (thresholds in parallel).
+	Other keyword arguments are passed to getFixationList (tracking must be "HE"). Velocity is filtered by each entry of `filters` only: a `filter` argument is ignored.
+	Returns a dict with the number of fixations ("counts") and their mean duration ("durations", ms) of shape [nFilters, nThresholds, nMinFixationTimes], "labels" of shape [nFilters, nThresholds, nMinFixationTimes, nSamples] if return_labels, and the preprocessed "gaze_data".
+	"""
+	from .processing.identify.commons import filterVelocity
+	from .processing.identify import I_VT
+
+	for key in ["filter", "parser", "return_label", "return_keep", "return_velocity", "streaming", "fused"]:
+		if key in kwargs:
+			printWarning("Argument \"{}\" is not supported by parameter sweeps, it is ignored.".format(key), header="sweepFixationList", verbose=0)
+			kwargs.pop(key)
+
+	gaze_data, _, velocity = getFixationList(raw_data, parser={"name": "None"}, return_velocity=True, **kwargs)
+	if velocity is None:
+		printError("Parameter sweeps require head+eye data (tracking=\"HE\").", header="sweepFixationList", verbose=0)
+		return None
+
+	result = {"thresholds": np.array(thresholds), "minFixationTimes": np.array(minFixationTimes), "filters": filters,
+		"counts": [], "durations": [], "gaze_data": gaze_data}
+	if return_labels: result["labels"] = []
+
+	for filter in filters:
+		filtered = filterVelocity(velocity, filter if filter is not None else {"name": "None"})
+		out = I_VT.sweep(gaze_data[:, 9], filtered, thresholds, minFixationTimes, return_labels=return_labels)
+		result["counts"].append(out[0])
+		result["durations"].append(out[1])
+		if return_labels: result["labels"].append(out[2])
+
+	for key in ["counts", "durations", "labels"]:
+		if key in result: result[key] = np.array(result[key])
+
+	return result
+
+def sweepHeadWindow(raw_data,
+	# Temporal window sizes (ms) of the head rotation trajectory (see --headwindow)
+	tempWindowSizes=[50, 100, 200],
+	**kwargs):
+	"""
+	Head trajectory sweep (tracking="H"): raw data is preprocessed once and samples are labelled for all window sizes in a single call to preprocess.downsample2Centroid.
+	Other keyword arguments are passed to getFixationList.
+	Returns a dict with the window sizes ("tempWindowSizes"), one fixation list per window size ("fix_lists") and the preprocessed "gaze_data" (head positions as gaze).
+	"""
+	from .processing.preprocess import downsample2Centroid
+	from .processing.extract import getGazeFeatures
+
+	for key in ["tracking", "tempWindowSize", "parser", "return_label", "return_keep", "return_velocity", "streaming", "fused"]:
+		if key in kwargs:
+			printWarning("Argument \"{}\" is not supported by head window sweeps, it is ignored.".format(key), header="sweepHeadWindow", verbose=0)
+			kwargs.pop(key)
+
+	tempWindowSizes = np.atleast_1d(tempWindowSizes)
+	gaze_data, _ = getFixationList(raw_data, tracking="H", tempWindowSize=tempWindowSizes[0], parser={"name": "None"}, **kwargs)
+	if gaze_data is None:
+		return None
+
+	labels = downsample2Centroid(gaze_data, tempWindowSizes)
+
+	return {"tempWindowSizes": tempWindowSizes, "gaze_data": gaze_data,
+		"fix_lists": [getGazeFeatures(gaze_data, label_list) for label_list in labels]}
+
+def _pooledVelocity(args):
+	# Worker: preprocessed gaze data and velocity signal of a recording
+	path, kwargs = args
+	gaze_data, _, velocity = loadRawData(path, parser={"name": "None"}, return_velocity=True, **kwargs)
+	return gaze_data, velocity
+
+def getFixationListsHMM(paths,
+	# Number of hidden states
+	nStates=2,
+	# Max number of velocity samples pooled to train the model
+	maxSamples=2**20,
+	# GaussianHMM or path to saved parameters (see processing.identify.gaussianHMM), used as starting point of the training
+	model=None,
+	# If False, `model` is used as is to decode data
+	train=True,
+	# Path where to save the fitted parameters
+	save=None,
+	# Number of processes (def.: all cores)
+	n_jobs=-1,
+	**kwargs):
+	"""
+	Identify fixations in several raw gaze recordings with a single HMM (I-HMM).
+	One model is trained on velocity samples pooled from all recordings, so that hidden states have the same definition for every participant of a study.
+	Preprocessing and decoding are run in parallel processes. Other keyword arguments are passed to loadRawData.
+	Returns a list of [gaze_data, fix_list] (one per recording) and the model (None, None if tracking is not "HE").
+	"""
+	from concurrent.futures import ProcessPoolExecutor
+	from multiprocessing import cpu_count
+	from .processing import extract
+	from .processing.identify import I_HMM
+
+	if kwargs.get("tracking", "HE") != "HE":
+		printError("I-HMM requires head+eye data (tracking=\"HE\").", header="getFixationListsHMM", verbose=0)
+		return None, None
+
+	if n_jobs == -1: n_jobs = cpu_count()
+	n_jobs = max(1, min(int(n_jobs), len(paths)))
+
+	printNeutral("Preprocessing {} recordings.".format(len(paths)), verbose=1)
+	with ProcessPoolExecutor(n_jobs) as pool:
+		data = list(pool.map(_pooledVelocity, [(path, kwargs) for path in paths]))
+	velocities = [velocity for _, velocity in data]
+
+	if train or model is None:
+		printNeutral("Training HMM on velocity samples pooled from all recordings.", verbose=1)
+		model = I_HMM.fitPooled(velocities, nStates=nStates, maxSamples=maxSamples, model=model, save=save)
+	elif not isinstance(model, I_HMM.GaussianHMM):
+		model = I_HMM.GaussianHMM.load(model)
+
+	labels = I_HMM.decodePooled(velocities, model, n_jobs=n_jobs)
+
+	return [[gaze_data, extract.getGazeFeatures(gaze_data, label_list, velocity=velocity)]
+		for (gaze_data, velocity), label_list in zip(data, labels)], model
+
+def iterFixationList(raw_data, **kwargs):
+	"""
+	Generator version of getFixationList: raw data is processed window by window and blocks of fixations are yielded as soon as they are identified.
+	`raw_data` is a numpy array or a re-iterable source of row blocks (e.g., utils.readRawFile.RawDataReader).
+	Only supports head+eye data parsed with I-VT, without resampling (see processing.streaming.iterFixations).
+	"""
+	from .processing.streaming import iterFixations
+
+	return iterFixations(raw_data, **kwargs)
+
 def getSaliencyMap(fix_list, dim,
 	# Name of binary saliency file saved for caching purposes
 	name="tmp",
@@ -426,13 +546,25 @@ def getSaliencyMap(fix_list, dim,
 	# If a binary file with the same name already exists, will generate it again
 	force_generate=False,
 	# Should we cache to file or generate saliency everytime?
-	caching=False):
+	caching=False,
+	# "exact": one Gaussian per fixation, "cached": cached Gaussian footprints (see generation.saliency.KernelCache),
+	#	"histogram": binned points blurred with separable kernels, for large numbers of points such as raw gaze (see generation.saliency.getSaliencyHistogram),
+	#	"difference": saliency videos drawn from a difference array of Gaussians, for long fixations (see generation.saliency.getSaliencyDyn)
+	engine="exact",
+	# Saliency videos (time_cut) are written to path_save (a new temporary folder if None) frame block by frame block instead of being computed in memory (see generation.saliency.iterSaliencyDyn)
+	#	Returns the path to the binary file, or a read-only memmap of it with force_return_data
+	stream=False):
 	"""
 	DOC
 	"""
 	# If path to a file (salmap) is provided we return its content or a pointer to it
 	import numpy as np
 	import os
+	from .utils.fixationList import FixationList
+
+	if isinstance(fix_list, FixationList):
+		# x, y, z, long, lat (no copy)
+		fix_list = fix_list.sphere
 
 	if not force_generate and path_save is not None:
 		from .utils.readOutFile import getBinFilename
@@ -448,15 +580,39 @@ def getSaliencyMap(fix_list, dim,
 
 	dim = np.array(dim, dtype=int)
 
+	if stream and time_cut is not None:
+		from .generation.saliency import iterSaliencyDyn, saveBinFrames
+
+		if engine not in ["exact", "difference"]:
+			printWarning("Streamed saliency videos support the \"exact\" and \"difference\" engines. Using the exact engine.", header="getSaliencyMap")
+
+		if path_save is None:
+			import tempfile
+			path_save = tempfile.mkdtemp(prefix="salient360_")
+			printWarning("No path_save given to stream the saliency video, writing it to [\"{}\"].".format(path_save), header="getSaliencyMap")
+
+		frames = iterSaliencyDyn(fix_list, dim, gauss_sigma=gauss_sigma, time_cut=time_cut, difference=engine == "difference")
+		path_file = saveBinFrames(frames, path_save+os.sep+name, dim, force=True)
+
+		if force_return_data:
+			return np.memmap(path_file, dtype=np.float32, mode="r", shape=tuple(dim))
+		return path_file
+
 	# Otherwise, we create a new array and compute saliency map(s)
 	sal_map = np.zeros(dim, dtype=np.float32) # Y, X
 
-	if time_cut is None:
+	if engine == "histogram" and time_cut is not None:
+		printWarning("The histogram engine does not support saliency videos (time_cut). Using the exact engine.", header="getSaliencyMap")
+		engine = "exact"
+
+	if engine == "histogram":
+		from .generation.saliency import getSaliencyHistogram as getSaliency
+	elif time_cut is None:
 		from .generation.saliency import getSaliency
 	else:
 		from .generation.saliency import getSaliencyDyn as getSaliency
 
-	getSaliency(sal_map, fix_list, gauss_sigma=gauss_sigma, time_cut=time_cut)
+	getSaliency(sal_map, fix_list, gauss_sigma=gauss_sigma, time_cut=time_cut, cache=engine == "cached", difference=engine == "difference")
 
 	if time_cut is not None or (path_save is not None and caching):
 		from .generation.saliency import saveBin
@@ -470,5 +626,9 @@ def getSaliencyMap(fix_list, dim,
 
 def getFixationMap(fix_list, dim):
 	from .generation.scanpath import toFixationMap
+	from .utils.fixationList import FixationList
+
+	if isinstance(fix_list, FixationList):
+		fix_list = fix_list["lonlat"]
 
 	return toFixationMap(fix_list, dim)
@@ -9,4 +9,5 @@
 from . import identify
 from . import preprocess
 from .preprocess import preprocess as preproc
+from . import resample
 from . import extract
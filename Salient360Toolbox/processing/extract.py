@@ -11,6 +11,463 @@ from ..utils.misc import *
 from ..utils.distances import *
 from ..utils.conversion import *
 
+import numba
+
+def getFixationFeatures(gaze_point, velocity, acceleration, startMarker, endMarker, fixationPt, index, offset=0):
+	"""
+	Compute features of the fixation made of samples gaze_point[startMarker: endMarker] (columns 0 to 17 of the fixation list).
+	`fixationPt` is filled in place. `index` is the fixation's index in the scanpath and `offset` the index of gaze_point's first sample in the recording.
+	Returns the fixation's mean eye and camera positions (unit vectors).
+	"""
+
+	# Fixation position (unit vector)
+	fixationPt[2:5] = gaze_point[startMarker: endMarker, :3].mean(axis=0)
+	fixationPt[2:5] /= vec_magnitude(fixationPt[2:5])
+
+	# Gaze position on sphere (long, lat)
+	fixationPt[:2] = UnitVector2EquirectArrCheck(fixationPt[2:5])
+	# longitude
+	fixationPt[0] = fixationPt[0] / (2*np.pi) - .25
+	# latitude
+	fixationPt[1] = 1 - (fixationPt[1] / np.pi + .5)
+
+	# Mean eye pos on sphere(unit vector)
+	eyeAvgPos = gaze_point[startMarker: endMarker, 3:6].mean(axis=0)
+	eyeAvgPos /= vec_magnitude(eyeAvgPos)
+
+	# Eye position on sphere (long, lat)
+	fixationPt[5:7] = UnitVector2EquirectArrCheck(eyeAvgPos)
+	# longitude
+	fixationPt[5] = fixationPt[5] / (2*np.pi) - .25
+	# latitude
+	fixationPt[6] = 1 - (fixationPt[6] / np.pi + .5)
+
+	# Mean cam pos on sphere(unit vector)
+	camAvgPos = gaze_point[startMarker: endMarker, 6:9].mean(axis=0)
+	camAvgPos /= vec_magnitude(camAvgPos)
+
+	# Camera position on sphere (long, lat)
+	fixationPt[7:9] = UnitVector2EquirectArrCheck(camAvgPos)
+	# longitude
+	fixationPt[7] = fixationPt[7] / (2*np.pi) - .25
+	# latitude
+	fixationPt[8] = 1 - (fixationPt[8] / np.pi + .5)
+
+	# Fixation index
+	fixationPt[9] = index
+
+	# Fixation sample idx start
+	fixationPt[10] = startMarker + offset
+	# Fixation sample idx end
+	fixationPt[11] = endMarker-1 + offset
+
+	# Start timestamp
+	fixationPt[12] = gaze_point[startMarker, 9]
+	# End timestamp
+	fixationPt[13] = gaze_point[endMarker, 9]
+
+	# Fixation duration
+	fixationPt[14] = gaze_point[endMarker, 9] - gaze_point[startMarker, 9]
+
+	# Mean fixation dispersion (rad)
+	fixationPt[15] = mean_dist_angle_topoint(gaze_point[startMarker: endMarker, :3], fixationPt[2:5])
+
+	# Peak fixation velocity (rad/sec)
+	fixationPt[16] = np.max(velocity[startMarker: endMarker])
+	# Peak fixation acceleration (rad/sec)
+	fixationPt[17] = np.max(acceleration[startMarker: endMarker])
+
+	# Expects output data to be
+	#	longitudes: [0, 2*np.pi]
+	#	latitudes: [0, np.pi]
+	#		Origin: top-left
+	for icol in [0, 1, 5, 6, 7, 8]:
+		if fixationPt[icol] < 0: fixationPt[icol] += 1
+
+	return eyeAvgPos, camAvgPos
+
+def getSaccFeatures(vecs1, vecs2, equirect1, equirect2):
+	"""
+	Return saccade amplitude, horizontal and relative angles of saccades going from vecs1/equirect1 to vecs2/equirect2
+	"""
+	feat = np.empty([vecs1.shape[0], 3])
+
+	unnorm = np.array([[2*np.pi, np.pi]])
+
+	merc1 = Equirect2Mercator(equirect1 * unnorm)
+	merc2 = Equirect2Mercator(equirect2 * unnorm)
+
+	saccs = merc2 - merc1
+
+	rec = np.array( ((2*np.pi, 0)) )
+
+	# looping saccades - assumption: the shortest saccade vector is the right one
+	# 	looping R
+	loopR = np.where(saccs[:-1,0] > np.pi/2)[0]
+	saccs[loopR,:] = merc2[loopR+1,:] - (rec + merc1[loopR,:])
+	# 	looping L
+	loopL = np.where(saccs[:-1,0] < -np.pi/2)[0]
+	saccs[loopL,:] = (rec + merc2[loopL+1, :]) - merc1[loopL, :]
+
+	# Saccade amplitude
+	feat[:, 0] = dist_angle_arrays_unsigned(vecs1, vecs2)
+	# Saccade horizontal angle
+	feat[:, 1] = dist_angle_topoint_signed(saccs, [1, 0])
+	# Saccade relative angle
+	# 	Use the fact that a relative angle is equal to
+	#		the difference of two absolute angles
+	# feat[1:, 2] = feat[1:, 1] - feat[:-1, 1]
+	# 	Calculate relative angle directly
+	feat[1:, 2] = dist_angle_topoint_signed(saccs[1:], saccs[:-1])
+	feat[0, 2] = np.nan
+
+	return feat
+
+def setSaccFeatures(fixationPts, eyeAvgPos, camAvgPos):
+	"""
+	Fill saccade features (columns 20 to 28) of fixationPts[1:] in place
+	"""
+	# saccade features: Gaze (rad.)
+	fixationPts[1:, [20, 23, 26]] = getSaccFeatures(fixationPts[:-1, 2:5],fixationPts[1:, 2:5],
+													fixationPts[:-1, :2],fixationPts[1:, :2])
+	# saccade features: Eye (rad.)
+	fixationPts[1:, [21, 24, 27]] = getSaccFeatures(eyeAvgPos[:-1, :], eyeAvgPos[1:, :],
+													fixationPts[:-1, 5:7],fixationPts[1:, 5:7])
+	# saccade features: Head (rad.)
+	fixationPts[1:, [22, 25, 28]] = getSaccFeatures(camAvgPos[:-1, :], camAvgPos[1:, :],
+													fixationPts[:-1, 7:9],fixationPts[1:, 7:9])
+
+# Columns of a fixation record output by _extractFeatures
+#	0: start sample, 1: end marker (excluded), 2: first row of the fixation's samples in the sample buffer,
+#	3-11: sums of gaze, eye and head vectors, 12,13: start and end timestamps,
+#	14,15: peak fixation velocity and acceleration, 16,17: peak saccade velocity and acceleration
+_NREC = 18
+
+# State of _extractFeatures carried from one block to the next
+#	istate: 0: in a fixation, 1: start sample of the open fixation, 2: a fixation was kept, 3: number of kept fixation samples,
+#		4: number of rows used in the sample buffer, 5: first row of the open fixation in the sample buffer
+#	fstate: 0: start timestamp of the open fixation, 1: timestamp of the sample preceding it, 2,3: its peak velocity and acceleration,
+#		4,5: peak saccade velocity and acceleration since the last kept fixation, 6,7: their values when the open fixation started,
+#		8,9: velocity and acceleration of the previous sample, 10: timestamp of the previous sample
+
+@numba.njit
+def _foldMax(peak, value):
+	# Running max with nan propagation (same as np.max)
+	if np.isnan(peak) or np.isnan(value): return np.nan
+	return max(peak, value)
+
+@numba.njit
+def _extractFeatures(gaze, velocity, markers, last, offset, istate, fstate, sums, buffer, records, minFixationTime):
+	# Fixation records (see _NREC) of labelled samples, one sample at a time with running sums and peaks (same values as getGazeFeatures)
+	# Samples up to the one before last are processed: the acceleration of a sample needs the next one. If `last`, the last sample ends the recording.
+	# Samples of fixations are copied to buffer for their dispersion. Returns the buffer and records (grown if needed) and the number of records
+	N = gaze.shape[0]
+	n = N if last else N-1
+	nRec = 0
+
+	for i in range(n):
+		cur = gaze[i]
+		label = markers[i]
+		iG = offset + i
+
+		# A fixation ended on the previous sample
+		if istate[0] == 1 and not label:
+			istate[0] = 0
+			s = istate[1]
+			# Remove short fixations (see identify.I_VT.parse)
+			if s < 2 or (fstate[10] - fstate[1]) >= minFixationTime:
+				if nRec == records.shape[0]:
+					grown = np.empty((2*records.shape[0], records.shape[1]))
+					grown[:nRec] = records[:nRec]
+					records = grown
+				rec = records[nRec]
+				rec[0], rec[1], rec[2] = s, iG, istate[5]
+				rec[3:12] = sums
+				rec[12], rec[13] = fstate[0], cur[9]
+				rec[14] = fstate[2] if iG > s else np.nan
+				rec[15] = fstate[3] if iG > s else np.nan
+				rec[16] = fstate[6] if istate[2] == 1 else np.nan
+				rec[17] = fstate[7] if istate[2] == 1 else np.nan
+				nRec += 1
+				istate[2] = 1
+				istate[3] += iG-s
+				# Next saccade starts on the last fixation sample
+				fstate[4] = _foldMax(-np.inf, fstate[8])
+				fstate[5] = _foldMax(-np.inf, fstate[9])
+			else:
+				# Samples of removed fixations are dropped from the buffer
+				istate[4] = istate[5]
+
+		if label and istate[0] == 0:
+			istate[0] = 1
+			istate[1] = iG
+			istate[5] = istate[4]
+			fstate[0] = cur[9]
+			fstate[1] = fstate[10] if iG > 0 else 0.
+			sums[:] = 0.
+			fstate[2], fstate[3] = -np.inf, -np.inf
+			fstate[6], fstate[7] = fstate[4], fstate[5]
+
+		if i < N-1:
+			v = velocity[i]
+			acc = (velocity[i+1] - v) / (gaze[i+1, 9] - cur[9])
+			fstate[8], fstate[9] = v, acc
+			fstate[4] = _foldMax(fstate[4], v)
+			fstate[5] = _foldMax(fstate[5], acc)
+			if istate[0] == 1:
+				# Sequential row sums (same order as ndarray.mean(axis=0))
+				for c in range(9):
+					sums[c] += cur[c]
+				fstate[2] = _foldMax(fstate[2], v)
+				fstate[3] = _foldMax(fstate[3], acc)
+
+				if istate[4] == buffer.shape[0]:
+					grown = np.empty((2*buffer.shape[0], 3))
+					grown[:istate[4]] = buffer[:istate[4]]
+					buffer = grown
+				buffer[istate[4], 0], buffer[istate[4], 1], buffer[istate[4], 2] = cur[0], cur[1], cur[2]
+				istate[4] += 1
+
+		fstate[10] = cur[9]
+
+	if last and istate[0] == 1:
+		# Fixation ending on the last sample: its last sample is excluded (see getGazeFeatures)
+		istate[0] = 0
+		s = istate[1]
+		iG = offset + N-1
+		if s < 2 or (gaze[N-1, 9] - fstate[1]) >= minFixationTime:
+			if nRec == records.shape[0]:
+				grown = np.empty((2*records.shape[0], records.shape[1]))
+				grown[:nRec] = records[:nRec]
+				records = grown
+			rec = records[nRec]
+			rec[0], rec[1], rec[2] = s, iG, istate[5]
+			rec[3:12] = sums
+			rec[12], rec[13] = fstate[0], gaze[N-1, 9]
+			rec[14] = fstate[2] if iG > s else np.nan
+			rec[15] = fstate[3] if iG > s else np.nan
+			rec[16] = fstate[6] if istate[2] == 1 else np.nan
+			rec[17] = fstate[7] if istate[2] == 1 else np.nan
+			nRec += 1
+			istate[2] = 1
+			istate[3] += iG-s+1
+
+	return buffer, records, nRec
+
+class FeatureExtractor():
+	"""
+	Incremental version of getGazeFeatures: labelled samples are appended block by block and fixations are output once their features are final.
+	Fixations shorter than minFixationTime (ms) are removed as in identify.I_VT.parse, None keeps all fixations.
+	Samples are processed one at a time with running sums and peaks of the open fixation and saccade, and one sample of look-ahead.
+	Only the direction vectors of the open fixation's samples are kept, to compute its dispersion once it ends: cost is constant per sample.
+	Usage:
+		extractor = FeatureExtractor()
+		for gaze_point, fixationMarkers, velocity in blocks:
+			fixations = extractor.push(gaze_point, velocity, fixationMarkers)
+		fixations = extractor.push(empty blocks, last=True)
+	Concatenated outputs are identical to getGazeFeatures run on concatenated inputs.
+	"""
+	def __init__(self, minFixationTime=None):
+		self.minFixationTime = -np.inf if minFixationTime is None else float(minFixationTime)
+
+		self.istate = np.zeros(6, dtype=np.int64)
+		self.fstate = np.zeros(11)
+		self.fstate[4:8] = -np.inf
+		self.sums = np.zeros(9)
+		self.buffer = np.empty([256, 3])
+		self.records = np.empty([16, _NREC])
+		# Last sample, processed once the next one is known
+		self.pending = None
+		# Global index of the next sample to process
+		self.offset = 0
+
+		self.nFix = 0
+		# Fixations waiting for the next one to compute saccade features, and two previous fixations for context
+		self.rows = []
+		self.context = []
+		self.released = False
+
+	def push(self, gaze, velocity, markers, last=False):
+		"""
+		Append labelled samples (gaze data, velocity, fixation markers). `last`: no sample will follow.
+		Returns fixations (array of shape [n, 29]) whose features are final.
+		"""
+		if velocity is None: velocity = np.zeros([gaze.shape[0]])
+		markers = np.asarray(markers) != 0
+
+		if self.pending is not None:
+			gaze = np.concatenate([self.pending[0], gaze])
+			velocity = np.concatenate([self.pending[1], velocity])
+			markers = np.concatenate([self.pending[2], markers])
+			self.pending = None
+
+		N = gaze.shape[0]
+		if N == 0 or (N == 1 and not last):
+			if N == 1: self.pending = (gaze, velocity, markers)
+			return self.release(last)
+
+		self.buffer, self.records, nRec = _extractFeatures(np.ascontiguousarray(gaze, dtype=float), np.ascontiguousarray(velocity, dtype=float),
+			markers, last, self.offset, self.istate, self.fstate, self.sums, self.buffer, self.records, self.minFixationTime)
+
+		if last:
+			self.offset += N
+		else:
+			self.offset += N-1
+			self.pending = (gaze[-1:], velocity[-1:], markers[-1:])
+
+		if nRec > 0:
+			self.addRecords(self.records[:nRec])
+
+			# Keep the samples of the open fixation only (it started within this block)
+			if self.istate[0] == 1:
+				nOpen = self.istate[4] - self.istate[5]
+				self.buffer[:nOpen] = self.buffer[self.istate[5]: self.istate[4]]
+				self.istate[4], self.istate[5] = nOpen, 0
+			else:
+				self.istate[4], self.istate[5] = 0, 0
+
+		return self.release(last)
+
+	def addRecords(self, records):
+		# Fixation features from records (same steps as getGazeFeatures)
+		startMarkers = records[:, 0].astype(np.int64)
+		endMarkers = records[:, 1].astype(np.int64)
+		counts = endMarkers - startMarkers
+
+		fixationPts = np.empty([records.shape[0], 29])
+		fixationPts[:] = np.nan
+
+		with np.errstate(invalid="ignore"):
+			means = records[:, 3:12] / counts[:, None]
+		fixationPts[:, 2:5] = _normalise(means[:, :3])
+		eyeAvgPos = _normalise(means[:, 3:6])
+		camAvgPos = _normalise(means[:, 6:9])
+
+		fixationPts[:, :2] = _equirect(fixationPts[:, 2:5])
+		fixationPts[:, 5:7] = _equirect(eyeAvgPos)
+		fixationPts[:, 7:9] = _equirect(camAvgPos)
+
+		fixationPts[:, 9] = self.nFix + np.arange(fixationPts.shape[0])
+		fixationPts[:, 10] = startMarkers
+		fixationPts[:, 11] = endMarkers-1
+		fixationPts[:, 12:14] = records[:, 12:14]
+		fixationPts[:, 14] = records[:, 13] - records[:, 12]
+
+		# Mean fixation dispersion (rad) from the buffered samples
+		rows = np.arange(counts.sum()) + np.repeat(records[:, 2].astype(np.int64) - (np.cumsum(counts) - counts), counts)
+		dist = dist_angle_arrays_unsigned(self.buffer[rows], np.repeat(fixationPts[:, 2:5], counts, axis=0))
+		_segmentPairwiseMeans(dist, counts, fixationPts[:, 15])
+
+		fixationPts[:, 16:20] = records[:, 14:18]
+
+		self.nFix += fixationPts.shape[0]
+		for i in range(fixationPts.shape[0]):
+			self.rows.append((fixationPts[i], eyeAvgPos[i], camAvgPos[i]))
+
+	def release(self, last=False):
+		"""
+		Return fixations whose saccade features are complete
+		"""
+		# extract.getGazeFeatures returns no fixation if fewer than 5 fixation samples or 2 saccade samples were found
+		if not self.released:
+			nFixSamples = self.istate[3]
+			# Processed samples but those of the open fixation, which may still be removed
+			nSamples = self.offset - (self.offset - self.istate[1] if self.istate[0] == 1 else 0)
+			self.released = nFixSamples >= 5 and (nSamples - nFixSamples) >= 2
+			if not self.released:
+				if last:
+					printWarning("Zero saccades were identified. Your parsing algorithm's parameters may be wrong.",
+						header="[FeatureExtractor]")
+				return np.empty([0, 29])
+
+		nOut = len(self.rows) if last else len(self.rows)-1
+		if nOut <= 0:
+			return np.empty([0, 29])
+
+		out = []
+		for i in range(nOut):
+			block = self.context + self.rows[:2]
+			if len(block) > 1:
+				fixationPts = np.array([row[0] for row in block])
+				eyeAvgPos = np.array([row[1] for row in block])
+				camAvgPos = np.array([row[2] for row in block])
+				setSaccFeatures(fixationPts, eyeAvgPos, camAvgPos)
+				self.rows[0][0][20:] = fixationPts[len(self.context), 20:]
+
+			out.append(self.rows[0][0])
+			self.context = (self.context + [self.rows.pop(0)])[-2:]
+
+		return np.array(out)
+
+@numba.njit
+def _segmentMeans(data, startMarkers, endMarkers, sums):
+	# Column sums of rows data[startMarkers[k]: endMarkers[k]], added row by row (same order as ndarray.mean(axis=0))
+	for k in range(startMarkers.shape[0]):
+		for c in range(data.shape[1]):
+			sums[k, c] = 0.
+		for i in range(startMarkers[k], endMarkers[k]):
+			for c in range(data.shape[1]):
+				sums[k, c] += data[i, c]
+
+@numba.njit
+def _pairwiseSum(a, lo, n):
+	# Same summation order as numpy's sum of a 1D contiguous array (pairwise, blocks of 8)
+	if n < 8:
+		res = 0.
+		for i in range(lo, lo+n):
+			res += a[i]
+		return res
+	elif n <= 128:
+		r = a[lo: lo+8].copy()
+		i = 8
+		while i < n - (n % 8):
+			for j in range(8):
+				r[j] += a[lo+i+j]
+			i += 8
+		res = ((r[0] + r[1]) + (r[2] + r[3])) + ((r[4] + r[5]) + (r[6] + r[7]))
+		while i < n:
+			res += a[lo+i]
+			i += 1
+		return res
+	n2 = n // 2
+	n2 -= n2 % 8
+	return _pairwiseSum(a, lo, n2) + _pairwiseSum(a, lo+n2, n-n2)
+
+@numba.njit
+def _segmentMax(a, startMarkers, endMarkers, out):
+	# Max of a[startMarkers[k]: endMarkers[k]], nan if a nan is found (same as np.max) or if the segment is empty
+	for k in range(startMarkers.shape[0]):
+		out[k] = np.nan
+		if endMarkers[k] <= startMarkers[k]: continue
+		out[k] = -np.inf
+		for i in range(startMarkers[k], endMarkers[k]):
+			if np.isnan(a[i]):
+				out[k] = np.nan
+				break
+			if a[i] > out[k]: out[k] = a[i]
+
+@numba.njit
+def _segmentPairwiseMeans(a, counts, out):
+	# Means of consecutive segments of a of lengths counts (same as np.mean)
+	lo = 0
+	for k in range(counts.shape[0]):
+		out[k] = _pairwiseSum(a, lo, counts[k]) / counts[k] if counts[k] > 0 else np.nan
+		lo += counts[k]
+
+def _normalise(vecs):
+	# Same as dividing each vector by np.linalg.norm (dot product of each vector with itself)
+	return vecs / np.sqrt(np.matmul(vecs[:, None, :], vecs[:, :, None])[:, 0, 0])[:, None]
+
+def _equirect(vecs):
+	# Unit vectors to normalised equirectangular positions (see getFixationFeatures)
+	out = UnitVector2Equirect(vecs)
+	# longitude
+	out[:, 0] = out[:, 0] / (2*np.pi) - .25
+	# latitude
+	out[:, 1] = 1 - (out[:, 1] / np.pi + .5)
+	out[out < 0] += 1
+	return out
+
 def getGazeFeatures(gaze_point, fixationMarkers, velocity=None):
 	# Aggregate fixation samples into fixation points and compute fixation/saccade features
 
@@ -33,158 +490,64 @@ def getGazeFeatures(gaze_point, fixationMarkers, velocity=None):
 	# Ends on a fixation
 	if fixationMarkers[-1] == True: starts = np.append(starts, fixationMarkers.shape[0]-1)
 
-	fixationPts = np.empty([starts.shape[0]//2, 29])
-	fixationPts[:] = np.nan
-
-	# Compute fixational features
-
-	eyeAvgPos = np.empty([fixationPts.shape[0], 3])
-	camAvgPos = np.empty([fixationPts.shape[0], 3])
-
-	for i in range(0, len(starts), 2):
-
-		startMarker = starts[i]+1
-		endMarker = min(starts[i+1]+1, fixationMarkers.shape[0]-1)
-
-		fixationPt = fixationPts[i//2, :] # view (not a copy)
-
-		# Fixation position (unit vector)
-		fixationPt[2:5] = gaze_point[startMarker: endMarker, :3].mean(axis=0)
-		fixationPt[2:5] /= vec_magnitude(fixationPt[2:5])
-
-		# Gaze position on sphere (long, lat)
-		fixationPt[:2] = UnitVector2EquirectArrCheck(fixationPt[2:5])
-		# longitude
-		fixationPt[0] = fixationPt[0] / (2*np.pi) - .25
-		# latitude
-		fixationPt[1] = 1 - (fixationPt[1] / np.pi + .5)
-
-		# print(gaze_point[startMarker: endMarker, :3])
-		# print(fixationPt[:2])
+	# Fixation samples: [startMarker, endMarker)
+	startMarkers = starts[::2]+1
+	endMarkers = np.minimum(starts[1::2]+1, fixationMarkers.shape[0]-1)
+	counts = endMarkers - startMarkers
 
-		# Mean eye pos on sphere(unit vector)
-		eyeAvgPos[i//2] = gaze_point[startMarker: endMarker, 3:6].mean(axis=0)
-		eyeAvgPos[i//2] /= vec_magnitude(eyeAvgPos[i//2])
-
-		# Eye position on sphere (long, lat)
-		fixationPt[5:7] = UnitVector2EquirectArrCheck(eyeAvgPos[i//2])
-		# longitude
-		fixationPt[5] = fixationPt[5] / (2*np.pi) - .25
-		# latitude
-		fixationPt[6] = 1 - (fixationPt[6] / np.pi + .5)
-
-		# print(gaze_point[startMarker: endMarker, 3:6])
-		# print(fixationPt[5:7])
-		# print("="*20)
-
-		# Mean cam pos on sphere(unit vector)
-		camAvgPos[i//2] = gaze_point[startMarker: endMarker, 6:9].mean(axis=0)
-		camAvgPos[i//2] /= vec_magnitude(camAvgPos[i//2])
-
-		# Camera position on sphere (long, lat)
-		fixationPt[7:9] = UnitVector2EquirectArrCheck(camAvgPos[i//2])
-		# longitude
-		fixationPt[7] = fixationPt[7] / (2*np.pi) - .25
-		# latitude
-		fixationPt[8] = 1 - (fixationPt[8] / np.pi + .5)
-
-		# Fixation index
-		fixationPt[9] = i//2
-
-		# Fixation sample idx start
-		fixationPt[10] = startMarker
-		# Fixation sample idx end
-		fixationPt[11] = endMarker-1
-
-		# Start timestamp
-		fixationPt[12] = gaze_point[startMarker, 9]
-		# End timestamp
-		fixationPt[13] = gaze_point[endMarker, 9]
-
-		# Fixation duration
-		fixationPt[14] = gaze_point[endMarker, 9] - gaze_point[startMarker, 9]
-
-		# Mean fixation dispersion (rad)
-		fixationPt[15] = mean_dist_angle_topoint(gaze_point[startMarker: endMarker, :3], fixationPt[2:5])
-
-		# Peak fixation velocity (rad/sec)
-		fixationPt[16] = np.max(velocity[startMarker: endMarker])
-		# Peak fixation acceleration (rad/sec)
-		fixationPt[17] = np.max(acceleration[startMarker: endMarker])
+	fixationPts = np.empty([startMarkers.shape[0], 29])
+	fixationPts[:] = np.nan
 
-	# Expects output data to be
-	#	longitudes: [0, 2*np.pi]
-	#	latitudes: [0, np.pi]
-	#		Origin: top-left
-	fixationPts[:, 0][fixationPts[:, 0] < 0] += 1
-	fixationPts[:, 1][fixationPts[:, 1] < 0] += 1
-	fixationPts[:, 5][fixationPts[:, 5] < 0] += 1
-	fixationPts[:, 6][fixationPts[:, 6] < 0] += 1
-	fixationPts[:, 7][fixationPts[:, 7] < 0] += 1
-	fixationPts[:, 8][fixationPts[:, 8] < 0] += 1
-
-	# Compute saccadic features
-	def getSaccFeatures(vecs1, vecs2, equirect1, equirect2):
-		# Return  saccade amplitude, horizontal and relative angles
-		feat = np.empty([vecs1.shape[0], 3])
-
-		unnorm = np.array([[2*np.pi, np.pi]])
-
-		merc1 = Equirect2Mercator(equirect1 * unnorm)
-		merc2 = Equirect2Mercator(equirect2 * unnorm)
-
-		saccs = merc2 - merc1
-
-		rec = np.array( ((2*np.pi, 0)) )
-
-		# looping saccades - assumption: the shortest saccade vector is the right one
-		# 	looping R
-		loopR = np.where(saccs[:-1,0] > np.pi/2)[0]
-		saccs[loopR,:] = merc2[loopR+1,:] - (rec + merc1[loopR,:])
-		# 	looping L
-		loopL = np.where(saccs[:-1,0] < -np.pi/2)[0]
-		saccs[loopL,:] = (rec + merc2[loopL+1, :]) - merc1[loopL, :]
-
-		# Saccade amplitude
-		feat[:, 0] = dist_angle_arrays_unsigned(vecs1, vecs2)
-		# Saccade horizontal angle
-		feat[:, 1] = dist_angle_topoint_signed(saccs, [1, 0])
-		# Saccade relative angle
-		# 	Use the fact that a relative angle is equal to
-		#		the difference of two absolute angles
-		# feat[1:, 2] = feat[1:, 1] - feat[:-1, 1]
-		# 	Calculate relative angle directly
-		feat[1:, 2] = dist_angle_topoint_signed(saccs[1:], saccs[:-1])
-		feat[0, 2] = np.nan
-
-		return feat
+	# Compute fixational features as reductions over fixation segments (same results as getFixationFeatures)
+
+	# Mean gaze, eye and camera positions (unit vectors)
+	sums = np.empty([startMarkers.shape[0], 9])
+	_segmentMeans(gaze_point[:, :9], startMarkers, endMarkers, sums)
+	with np.errstate(invalid="ignore"):
+		means = sums / counts[:, None]
+	fixationPts[:, 2:5] = _normalise(means[:, :3])
+	eyeAvgPos = _normalise(means[:, 3:6])
+	camAvgPos = _normalise(means[:, 6:9])
+
+	# Gaze, eye and camera positions on sphere (long, lat)
+	fixationPts[:, :2] = _equirect(fixationPts[:, 2:5])
+	fixationPts[:, 5:7] = _equirect(eyeAvgPos)
+	fixationPts[:, 7:9] = _equirect(camAvgPos)
+
+	# Fixation index
+	fixationPts[:, 9] = np.arange(fixationPts.shape[0])
+	# Fixation sample idx start and end
+	fixationPts[:, 10] = startMarkers
+	fixationPts[:, 11] = endMarkers-1
+	# Start and end timestamps
+	fixationPts[:, 12] = gaze_point[startMarkers, 9]
+	fixationPts[:, 13] = gaze_point[endMarkers, 9]
+	# Fixation duration
+	fixationPts[:, 14] = gaze_point[endMarkers, 9] - gaze_point[startMarkers, 9]
+
+	# Mean fixation dispersion (rad): angles between all fixation samples and their fixation's position
+	samples = np.arange(counts.sum()) + np.repeat(startMarkers - (np.cumsum(counts) - counts), counts)
+	dist = dist_angle_arrays_unsigned(gaze_point[samples, :3], np.repeat(fixationPts[:, 2:5], counts, axis=0))
+	_segmentPairwiseMeans(dist, counts, fixationPts[:, 15])
+
+	# Peak fixation velocity (rad/sec) and acceleration
+	peak = np.empty(fixationPts.shape[0])
+	_segmentMax(velocity, startMarkers, endMarkers, peak)
+	fixationPts[:, 16] = peak
+	_segmentMax(acceleration, startMarkers, endMarkers, peak)
+	fixationPts[:, 17] = peak
 
 	if fixationPts.shape[0] > 1:
-		# print("_-"*25)
-		# print(fixationPts[0, 2:5],fixationPts[1, 2:5],
-		# 	  fixationPts[0, :2],fixationPts[1, :2])
-		# print(eyeAvgPos[0, :], eyeAvgPos[1, :],
-		# 	  fixationPts[0, 5:7],fixationPts[1, 5:7])
-		# print('int')
-		# print(getSaccFeatures(fixationPts[:-1, 2:5],fixationPts[1:, 2:5], fixationPts[:-1, :2],fixationPts[1:, :2])[2])
-		# print(getSaccFeatures(eyeAvgPos[:-1, :], eyeAvgPos[1:, :],
-		# 												fixationPts[:-1, 5:7],fixationPts[1:, 5:7])[2])
-		# exit()
-		# saccade features: Gaze (rad.)
-		fixationPts[1:, [20, 23, 26]] = getSaccFeatures(fixationPts[:-1, 2:5],fixationPts[1:, 2:5],
-														fixationPts[:-1, :2],fixationPts[1:, :2])
-		# saccade features: Eye (rad.)
-		fixationPts[1:, [21, 24, 27]] = getSaccFeatures(eyeAvgPos[:-1, :], eyeAvgPos[1:, :],
-														fixationPts[:-1, 5:7],fixationPts[1:, 5:7])
-		# saccade features: Head (rad.)
-		fixationPts[1:, [22, 25, 28]] = getSaccFeatures(camAvgPos[:-1, :], camAvgPos[1:, :],
-														fixationPts[:-1, 7:9],fixationPts[1:, 7:9])
-
-		# Peak vel & acc are based on samples rather than data computed in the previous loop
-		for ifix in range(1, fixationPts.shape[0]):
-			# Peak sacc vel
-			fixationPts[ifix, 18] = np.max(velocity[int(fixationPts[ifix-1, 11]): int(fixationPts[ifix, 10])])
-			# Peak sacc accel
-			fixationPts[ifix, 19] = np.max(acceleration[int(fixationPts[ifix-1, 11]): int(fixationPts[ifix, 10])])
+		setSaccFeatures(fixationPts, eyeAvgPos, camAvgPos)
+
+		# Peak vel & acc are based on samples rather than data computed above
+		saccStarts, saccEnds = endMarkers[:-1]-1, startMarkers[1:]
+		peak = np.empty(saccStarts.shape[0])
+		# Peak sacc vel
+		_segmentMax(velocity, saccStarts, saccEnds, peak)
+		fixationPts[1:, 18] = peak
+		# Peak sacc accel
+		_segmentMax(acceleration, saccStarts, saccEnds, peak)
+		fixationPts[1:, 19] = peak
 
 	return fixationPts
@@ -0,0 +1,384 @@
+#! /usr/bin/env python3
+# ---------------------------------
+# Author: Erwan DAVID
+# Year: 2020
+# Lab: SGL, Goethe University, Frankfurt
+# Comment: Fused raw data to fixation list pipeline
+# ---------------------------------
+
+"""
+Compiled single pass version of the common path of helper.getFixationList: head+eye data, I-VT, no resampling, no velocity filtering and no outlier removal.
+Raw rows are converted to gaze samples (Euler angles to quaternions, rotation of eye directions, see preprocess), velocity, labels (identify.I_VT.parse) and fixation features (extract.getGazeFeatures) on the fly.
+Only a few samples of look-ahead are kept, extra memory is proportional to the number of fixations: the (N, 11) gaze matrix, velocity and label arrays are never allocated.
+A second pass over fixation samples computes dispersions, which need the fixation's final position.
+"""
+
+import numpy as np
+import numba
+
+from ..utils.misc import *
+from . import preprocess
+from .extract import setSaccFeatures, _normalise, _equirect, _pairwiseSum
+
+# Ring buffer of look-ahead samples (power of 2)
+RING = 8
+
+# Columns of a fixation record output by _fusedIVT
+#	0: start sample, 1: end marker (excluded), 2: raw row of the start sample,
+#	3-11: sums of gaze, eye and head vectors, 12,13: start and end timestamps,
+#	14,15: peak fixation velocity and acceleration, 16,17: peak saccade velocity and acceleration
+NREC = 18
+
+@numba.njit
+def _scan(raw, start, end, euler):
+	# Sum and count of timestamp differences (timestamp unit, see preprocess.getTimestampScale), are Euler angles in degrees?
+	sumDiff = 0.
+	countDiff = 0
+	for row in range(start+1, end):
+		diff = raw[row, 0] - raw[row-1, 0]
+		if not np.isnan(diff):
+			sumDiff += diff
+			countDiff += 1
+
+	degrees = False
+	if euler:
+		for row in range(raw.shape[0]):
+			for c in range(1, 4):
+				if np.abs(raw[row, c]) > (2*np.pi):
+					degrees = True
+	return sumDiff, countDiff, degrees
+
+@numba.njit
+def _rotate(w, x, y, z, vx, vy, vz, out, o):
+	# Same as preprocess.rotateVectors_
+	n = w**2 + x**2 + y**2 + z**2
+	out[o] = (1.0 - 2*(y**2 + z**2)/n)*vx + (2*(x*y - z*w)/n)*vy + (2*(x*z + y*w)/n)*vz
+	out[o+1] = (2*(x*y + z*w)/n)*vx + (1.0 - 2*(x**2 + z**2)/n)*vy + (2*(y*z - x*w)/n)*vz
+	out[o+2] = (2*(x*z - y*w)/n)*vx + (2*(y*z + x*w)/n)*vy + (1.0 - 2*(x**2 + y**2)/n)*vz
+
+@numba.njit
+def _sample(raw, row, t0, scale, euler, degrees, binocular, validity, out):
+	# Gaze sample of a raw data row (layout of preprocess.prepareGaze, without sample index). Returns False if the sample is invalid (see preprocess.getValidity)
+	if euler:
+		X, Y, Z = raw[row, 1], raw[row, 2], raw[row, 3]
+		if degrees:
+			X, Y, Z = np.deg2rad(X), np.deg2rad(Y), np.deg2rad(Z)
+		c1, c2, c3 = np.cos(X/2), np.cos(Y/2), np.cos(Z/2)
+		s1, s2, s3 = np.sin(X/2), np.sin(Y/2), np.sin(Z/2)
+		# See preprocess.EulerToQuat_
+		w = c1 * c2 * c3 + s1 * s2 * s3
+		x = s1 * c2 * c3 + c1 * s2 * s3
+		y = c1 * s2 * c3 - s1 * c2 * s3
+		z = c1 * c2 * s3 - s1 * s2 * c3
+	else:
+		w, x, y, z = raw[row, 1], raw[row, 2], raw[row, 3], raw[row, 4]
+
+	ex, ey, ez = raw[row, 5], raw[row, 6], raw[row, 7]
+	if binocular:
+		# See preprocess.averageEyes
+		ex, ey, ez = (ex + raw[row, 8])/2, (ey + raw[row, 9])/2, (ez + raw[row, 10])/2
+		norm = np.sqrt(ex*ex + ey*ey + ez*ez)
+		ex, ey, ez = ex/norm, ey/norm, ez/norm
+
+	if validity:
+		if np.isnan(w) or np.isnan(x) or np.isnan(y) or np.isnan(z) or np.isnan(ex) or np.isnan(ey) or np.isnan(ez):
+			return False
+		for c in range(8 if not binocular else 11, raw.shape[1]):
+			if np.isnan(raw[row, c]): return False
+		if binocular:
+			for c in range(8, 11):
+				if np.isnan(raw[row, c]): return False
+		eyeSum = ex + ey + ez
+		if eyeSum == -3 or eyeSum == 0:
+			return False
+
+	if w**2 + x**2 + y**2 + z**2 == 0:
+		raise ZeroDivisionError("Quaternion with zero norm")
+
+	# Head direction: forward vector rotated by the head rotation, then by quaternion(1, 1, 0, 0) (see preprocess.getDataOnSphere)
+	_rotate(w, x, y, z, 0., 0., 1., out, 6)
+	out[6], out[7], out[8] = out[6], -out[8], out[7]
+	# Gaze direction
+	_rotate(w, x, y, z, ex, ey, ez, out, 0)
+	out[0], out[1], out[2] = out[0], -out[2], out[1]
+	if euler:
+		# Reverse because of Unity Euler angle system
+		out[2] = -out[2]
+
+	# Renormalise (see preprocess.prepareGaze)
+	norm = np.sqrt(out[0]*out[0] + out[1]*out[1] + out[2]*out[2])
+	out[0], out[1], out[2] = out[0]/norm, out[1]/norm, out[2]/norm
+	norm = np.sqrt(out[0]*out[0] + out[1]*out[1] + out[2]*out[2])
+	out[3], out[4], out[5] = ex/norm, ez/norm, ey/norm
+	out[6], out[7], out[8] = out[6]/norm, out[7]/norm, out[8]/norm
+
+	out[9] = raw[row, 0] - t0
+	if scale != 1:
+		out[9] /= scale
+
+	return True
+
+@numba.njit
+def _dot(a, b):
+	# Same summation order as np.einsum in identify.commons.getVelocity (strided rows)
+	return (a[0]*b[0] + a[1]*b[1]) + a[2]*b[2]
+
+@numba.njit
+def _dotContiguous(a, b):
+	# Same summation order as np.einsum in extract.getGazeFeatures (contiguous rows)
+	return (a[0]*b[0] + a[2]*b[2]) + a[1]*b[1]
+
+@numba.njit
+def _count(raw, start, end, t0, scale, euler, degrees, binocular, validity):
+	# Number of valid samples
+	out = np.empty(10)
+	N = 0
+	for row in range(start, end):
+		if _sample(raw, row, t0, scale, euler, degrees, binocular, validity, out):
+			N += 1
+	return N
+
+@numba.njit
+def _grow(records, n):
+	# Make room for one more record
+	if n < records.shape[0]: return records
+	grown = np.empty((2*records.shape[0], records.shape[1]))
+	grown[:n] = records[:n]
+	return grown
+
+@numba.njit
+def _fold(peak, nan, value):
+	# Running max with nan propagation (same as np.max)
+	if np.isnan(value): return peak, True
+	return max(peak, value), nan
+
+@numba.njit
+def _fusedIVT(raw, start, end, N, t0, scale, euler, degrees, binocular, validity, threshold, minFixationTime):
+	# Single pass: gaze samples, velocity, I-VT labels (identify.I_VT.parse) and fixation records (extract.getGazeFeatures)
+	# Returns fixation records (see NREC) and the number of fixation samples
+	samples = np.empty((RING, 10))
+	rows = np.empty(RING, dtype=np.int64)
+	velocity = np.empty(RING)
+	computed = 0
+	row = start
+	firstVelocity = np.nan
+
+	records = np.empty((64, NREC))
+	nRec = 0
+	nFixSamples = 0
+
+	# Fixation being built
+	inFix = False
+	s = 0
+	sStart = 0
+	sums = np.zeros(9)
+	fixV, fixVNan, fixA, fixANan = -np.inf, False, -np.inf, False
+	sStartTs = 0.
+	prevTs = 0.
+	# Saccade since the last kept fixation, and its value when the current fixation started
+	anyFix = False
+	saccV, saccVNan, saccA, saccANan = -np.inf, False, -np.inf, False
+	snapV, snapVNan, snapA, snapANan = -np.inf, False, -np.inf, False
+
+	prevLabel = False
+	label1 = False
+	label = False
+	lastV, lastA = 0., 0.
+
+	for i in range(N):
+		# Compute samples up to i+3 (labels need two samples of look-ahead, velocity one more)
+		target = min(i+3, N-1)
+		while computed <= target:
+			while not _sample(raw, row, t0, scale, euler, degrees, binocular, validity, samples[computed % RING]):
+				row += 1
+			rows[computed % RING] = row
+			row += 1
+			if computed >= 1:
+				a, b = samples[computed % RING], samples[(computed-1) % RING]
+				velocity[(computed-1) % RING] = np.arccos(_dot(a, b)) / (a[9] - b[9])
+				if computed == 1: firstVelocity = velocity[0]
+			if computed == N-1:
+				# Last sample takes the first velocity value (see identify.commons.getVelocity)
+				velocity[computed % RING] = firstVelocity
+			computed += 1
+
+		# Labels (see identify.commons.fix_gen): first and last labels take the value of their neighbour
+		if i == 0:
+			rm0, rm1, rm2 = velocity[0] <= threshold, velocity[1] <= threshold, velocity[2 % RING] <= threshold
+			label1 = rm0 if (rm1 != rm0 and rm1 != rm2) else rm1
+			label = label1
+		elif i == 1:
+			label = label1
+		elif i < N-1:
+			rm, rp = velocity[i % RING] <= threshold, velocity[(i+1) % RING] <= threshold
+			label = prevLabel if (rm != prevLabel and rm != rp) else rm
+		else:
+			label = prevLabel
+
+		cur = samples[i % RING]
+
+		# A fixation ended on the previous sample
+		if inFix and not label:
+			inFix = False
+			e = i-1
+			# Remove short fixations (see identify.I_VT.parse)
+			if s < 2 or (samples[e % RING, 9] - prevTs) >= minFixationTime:
+				records = _grow(records, nRec)
+				rec = records[nRec]
+				rec[0], rec[1], rec[2] = s, e+1, sStart
+				rec[3:12] = sums
+				rec[12], rec[13] = sStartTs, cur[9]
+				rec[14] = np.nan if fixVNan or e < s else fixV
+				rec[15] = np.nan if fixANan or e < s else fixA
+				rec[16] = np.nan if (snapVNan or not anyFix) else snapV
+				rec[17] = np.nan if (snapANan or not anyFix) else snapA
+				nRec += 1
+				nFixSamples += e-s+1
+				anyFix = True
+				# Next saccade starts on the last fixation sample
+				saccV, saccVNan = _fold(-np.inf, False, lastV)
+				saccA, saccANan = _fold(-np.inf, False, lastA)
+
+		if label and not inFix:
+			inFix = True
+			s = i
+			sStart = rows[i % RING]
+			sStartTs = cur[9]
+			prevTs = samples[(i-1) % RING, 9] if i > 0 else 0.
+			sums[:] = 0.
+			fixV, fixVNan, fixA, fixANan = -np.inf, False, -np.inf, False
+			snapV, snapVNan, snapA, snapANan = saccV, saccVNan, saccA, saccANan
+
+		if i < N-1:
+			v = velocity[i % RING]
+			acc = (velocity[(i+1) % RING] - v) / (samples[(i+1) % RING, 9] - cur[9])
+			lastV, lastA = v, acc
+			saccV, saccVNan = _fold(saccV, saccVNan, v)
+			saccA, saccANan = _fold(saccA, saccANan, acc)
+			if inFix:
+				# Sequential row sums (same order as ndarray.mean(axis=0))
+				for c in range(9):
+					sums[c] += cur[c]
+				fixV, fixVNan = _fold(fixV, fixVNan, v)
+				fixA, fixANan = _fold(fixA, fixANan, acc)
+
+		prevLabel = label
+
+	if inFix:
+		# Fixation ending on the last sample: its last sample is excluded (see extract.getGazeFeatures)
+		e = N-1
+		if s < 2 or (samples[e % RING, 9] - prevTs) >= minFixationTime:
+			records = _grow(records, nRec)
+			rec = records[nRec]
+			rec[0], rec[1], rec[2] = s, N-1, sStart
+			rec[3:12] = sums
+			rec[12], rec[13] = sStartTs, samples[e % RING, 9]
+			rec[14] = np.nan if fixVNan or s >= N-1 else fixV
+			rec[15] = np.nan if fixANan or s >= N-1 else fixA
+			rec[16] = np.nan if (snapVNan or not anyFix) else snapV
+			rec[17] = np.nan if (snapANan or not anyFix) else snapA
+			nRec += 1
+			nFixSamples += e-s+1
+
+	return records[:nRec], nFixSamples
+
+@numba.njit
+def _dispersions(raw, records, positions, t0, scale, euler, degrees, binocular, validity, out):
+	# Second pass over fixation samples: mean angle between samples and their fixation's position (same as extract.getGazeFeatures)
+	maxCount = 0
+	for k in range(records.shape[0]):
+		maxCount = max(maxCount, int(records[k, 1] - records[k, 0]))
+	dist = np.empty(maxCount)
+	sample = np.empty(10)
+
+	for k in range(records.shape[0]):
+		count = int(records[k, 1] - records[k, 0])
+		if count <= 0:
+			out[k] = np.nan
+			continue
+		row = int(records[k, 2])
+		for j in range(count):
+			while not _sample(raw, row, t0, scale, euler, degrees, binocular, validity, sample):
+				row += 1
+			row += 1
+			dist[j] = np.arccos(_dotContiguous(sample, positions[k]))
+		out[k] = _pairwiseSum(dist, 0, count) / count
+
+def getFixationList(raw_data, data_range=None, eye=None, threshold=120, minFixationTime=80, Euler2Quat=False,
+	callback=lambda *a: None):
+	"""
+	Fixation list (see extract.getGazeFeatures) of raw head+eye data identified with I-VT (`threshold` in deg/sec, `minFixationTime` in ms), in one compiled pass.
+	Same results as helper.getFixationList(raw_data, parser={"name": "I-VT", ...}) without resampling, filtering or outlier removal. raw_data is not modified.
+	"""
+	if data_range is None:
+		data_range = [0, np.inf]
+	data_range = list(data_range)
+	if data_range[0] < 0 or data_range[0] > (raw_data.shape[0]-1):
+		data_range[0] = 0
+	if data_range[1] < 0 or data_range[1] > (raw_data.shape[0]):
+		data_range[1] = raw_data.shape[0]
+	start, end = int(data_range[0]), int(data_range[1])
+
+	raw = np.ascontiguousarray(raw_data, dtype=float)
+	binocular = eye == "B"
+	validity = eye != "H"
+	euler = bool(Euler2Quat)
+
+	callback(0, "Scanning recording.")
+	sumDiff, countDiff, degrees = _scan(raw, start, end, euler)
+	rem = preprocess.getTimestampScale(sumDiff / countDiff if countDiff > 0 else np.nan)
+	if rem != 0:
+		printWarning("Timestamps were divided by 1e{} to be in milliseconds".format(rem), header="preprocess", verbose=0)
+	scale = float(10**rem)
+	t0 = raw[start, 0]
+
+	args = (t0, scale, euler, degrees, binocular, validity)
+	N = _count(raw, start, end, *args)
+
+	callback(0, "Identifying fixations.")
+	records = np.empty([0, NREC])
+	nFixSamples = 0
+	if N >= 3:
+		records, nFixSamples = _fusedIVT(raw, start, end, N, *args,
+			np.deg2rad(threshold)/1000, float(minFixationTime))
+
+	# Case where no saccades were identified
+	if nFixSamples < 5 or nFixSamples > (N-2):
+		printWarning("Zero saccades were identified. Your parsing algorithm's parameters may be wrong.",
+			header="[getGazeFeatures]")
+		return np.empty([0, 29])
+
+	startMarkers = records[:, 0]
+	endMarkers = records[:, 1]
+	counts = endMarkers - startMarkers
+
+	fixationPts = np.empty([records.shape[0], 29])
+	fixationPts[:] = np.nan
+
+	# Same steps as extract.getGazeFeatures from the accumulated sums
+	with np.errstate(invalid="ignore"):
+		means = records[:, 3:12] / counts[:, None]
+	fixationPts[:, 2:5] = _normalise(means[:, :3])
+	eyeAvgPos = _normalise(means[:, 3:6])
+	camAvgPos = _normalise(means[:, 6:9])
+
+	fixationPts[:, :2] = _equirect(fixationPts[:, 2:5])
+	fixationPts[:, 5:7] = _equirect(eyeAvgPos)
+	fixationPts[:, 7:9] = _equirect(camAvgPos)
+
+	fixationPts[:, 9] = np.arange(fixationPts.shape[0])
+	fixationPts[:, 10] = startMarkers
+	fixationPts[:, 11] = endMarkers-1
+	fixationPts[:, 12:14] = records[:, 12:14]
+	fixationPts[:, 14] = records[:, 13] - records[:, 12]
+
+	callback(.9, "Computing fixation dispersions.")
+	_dispersions(raw, records, np.ascontiguousarray(fixationPts[:, 2:5]), *args, fixationPts[:, 15])
+
+	fixationPts[:, 16:18] = records[:, 14:16]
+
+	if fixationPts.shape[0] > 1:
+		setSaccFeatures(fixationPts, eyeAvgPos, camAvgPos)
+		fixationPts[1:, 18:20] = records[1:, 16:18]
+
+	return fixationPts
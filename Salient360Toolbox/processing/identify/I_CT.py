@@ -7,6 +7,8 @@
 # ---------------------------------
 
 import numpy as np
+import numba
+
 from .commons import *
 
 def custom_distance(sample1, sample2):
@@ -18,14 +20,72 @@ def custom_distance(sample1, sample2):
 
 	return dist_pos
 
+@numba.njit(parallel=True)
+def _neighborCounts(data, eps, window, counts):
+	# Number of neighbors of each sample among following samples
+	N = data.shape[0]
+	for i in numba.prange(N):
+		count = 0
+		j = i+1
+		while j < N and abs(data[j, 3] - data[i, 3]) <= window:
+			dist = np.abs(np.arccos(data[i, 0]*data[j, 0] + data[i, 1]*data[j, 1] + data[i, 2]*data[j, 2]))
+			# Null distances are not stored in a sparse matrix (not neighbors), nor are nan distances
+			if dist > 0 and dist <= eps:
+				count += 1
+			j += 1
+		counts[i] = count
+
+@numba.njit(parallel=True)
+def _neighborFill(data, eps, window, offsets, rows, cols, dists):
+	N = data.shape[0]
+	for i in numba.prange(N):
+		k = offsets[i]
+		j = i+1
+		while j < N and abs(data[j, 3] - data[i, 3]) <= window:
+			dist = np.abs(np.arccos(data[i, 0]*data[j, 0] + data[i, 1]*data[j, 1] + data[i, 2]*data[j, 2]))
+			if dist > 0 and dist <= eps:
+				rows[k] = i
+				cols[k] = j
+				dists[k] = dist
+				k += 1
+			j += 1
+
+def neighborGraph(data, eps, window=10):
+	"""
+	Sparse graph of samples closer than `eps` (orthodromic distance, rad) and at most `window` msec apart.
+	data: unit vectors followed by a timestamp (X, Y, Z, timestamp)
+	Same neighborhood as custom_distance: samples farther apart in time are not neighbors.
+	Candidates are found with a sliding window over time-sorted samples, rows are processed in parallel.
+	"""
+	from scipy.sparse import csr_matrix
+
+	N = data.shape[0]
+	order = np.argsort(data[:, 3], kind="stable")
+	sortedData = np.ascontiguousarray(data[order], dtype=float)
+
+	counts = np.empty(N, dtype=np.int64)
+	_neighborCounts(sortedData, eps, window, counts)
+
+	offsets = np.zeros(N+1, dtype=np.int64)
+	np.cumsum(counts, out=offsets[1:])
+
+	rows = np.empty(offsets[-1], dtype=np.int64)
+	cols = np.empty(offsets[-1], dtype=np.int64)
+	dists = np.empty(offsets[-1])
+	_neighborFill(sortedData, eps, window, offsets, rows, cols, dists)
+
+	# Back to original sample order, symmetric
+	rows, cols = order[rows], order[cols]
+	return csr_matrix((np.concatenate([dists, dists]), (np.concatenate([rows, cols]), np.concatenate([cols, rows]))),
+		shape=(N, N))
+
 def parse(data, eps=.005, minpts=3,
 	callback=None, **kwargs):
 
-	from scipy.spatial.distance import pdist, squareform
-	from scipy.sparse import csr_matrix
 	from sklearn import cluster
 
-	dist_matrix = csr_matrix(squareform(pdist(data, metric=custom_distance)))
+	# Pairs farther than eps can't be neighbors, they are not stored
+	dist_matrix = neighborGraph(data, eps)
 	if callback is not None: callback(.5)
 
 	dbscan = cluster.DBSCAN(
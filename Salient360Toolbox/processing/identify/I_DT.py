@@ -3,11 +3,107 @@
 # Author: Erwan DAVID
 # Year: 2019
 # Lab: IPI, LS2N, Nantes, France
-# Comment: 
+# Comment:
 # ---------------------------------
 
-def parse(data, **params):
+import numpy as np
+import numba
+
+from .commons import *
+
+@numba.njit
+def _extent(data, deqMin, deqMax, heads, j):
+	# Squared diagonal of the window's bounding box, with sample j added if j >= 0
+	diag = 0.
+	for c in range(3):
+		lo = data[deqMin[c, heads[c]], c]
+		hi = data[deqMax[c, heads[3+c]], c]
+		if j >= 0:
+			lo = min(lo, data[j, c])
+			hi = max(hi, data[j, c])
+		diag += (hi-lo)**2
+	return diag
+
+@numba.njit
+def _push(data, deqMin, deqMax, heads, tails, j):
+	# Add sample j to the window: drop deque tail samples that can no longer be the min (max) of a coordinate
+	for c in range(3):
+		while tails[c] > heads[c] and data[deqMin[c, tails[c]-1], c] >= data[j, c]:
+			tails[c] -= 1
+		deqMin[c, tails[c]] = j
+		tails[c] += 1
+		while tails[3+c] > heads[3+c] and data[deqMax[c, tails[3+c]-1], c] <= data[j, c]:
+			tails[3+c] -= 1
+		deqMax[c, tails[3+c]] = j
+		tails[3+c] += 1
+
+@numba.njit
+def _dispersionWindows(data, maxDiag, minDuration, labels):
+	"""
+	Two-pointer I-DT pass. The window [i, j) is described by the bounding box of its unit vectors,
+	min and max of each coordinate are maintained with monotonic deques (indices of increasing/decreasing values).
+	Every sample enters and leaves the deques once: linear time.
+	"""
+	N = data.shape[0]
+	# Rows 0-2: min deques (increasing values), rows 3-5 (in heads/tails): max deques (decreasing values)
+	deqMin = np.empty((3, N), dtype=np.int64)
+	deqMax = np.empty((3, N), dtype=np.int64)
+	heads = np.zeros(6, dtype=np.int64)
+	tails = np.zeros(6, dtype=np.int64)
+
+	i = 0
+	j = 0
+	while i < N:
+		# Grow window until it spans minDuration
+		while j < N and (j == i or data[j-1, 3] - data[i, 3] < minDuration):
+			if not np.isfinite(data[j, 0] + data[j, 1] + data[j, 2]):
+				# Windows can't span missing samples
+				heads[:] = 0; tails[:] = 0
+				i = j = j+1
+				continue
+			_push(data, deqMin, deqMax, heads, tails, j)
+			j += 1
+
+		if j == i or data[j-1, 3] - data[i, 3] < minDuration:
+			break
+
+		if _extent(data, deqMin, deqMax, heads, -1) <= maxDiag:
+			# Expand window while dispersion stays below threshold
+			while j < N and np.isfinite(data[j, 0] + data[j, 1] + data[j, 2]) and\
+				_extent(data, deqMin, deqMax, heads, j) <= maxDiag:
+				_push(data, deqMin, deqMax, heads, tails, j)
+				j += 1
+
+			labels[i:j] = True
+			# Next window starts after the fixation
+			heads[:] = 0; tails[:] = 0
+			i = j
+		else:
+			# Slide window start
+			for c in range(3):
+				if deqMin[c, heads[c]] == i: heads[c] += 1
+				if deqMax[c, heads[3+c]] == i: heads[3+c] += 1
+			i += 1
+
+def parse(data, threshold=2., minFixationTime=80,
+	callback=None, **kwargs):
 	"""
-	Left as an exercise to the reader :)
+	Parse gaze data on sphere and output a saccade/fixation label list with a dispersion-based algorithm (Salvucci & Goldberg, 2000).
+	A window of samples lasting at least minFixationTime (ms) is a fixation if its dispersion is lower than threshold (deg), it is then expanded while dispersion stays below threshold.
+	Dispersion is the angle subtended by the diagonal of the bounding box of the window's unit vectors (upper bound of the largest angle between two samples).
+	data: unit vectors followed by a timestamp (X, Y, Z, timestamp)
+	Returns a boolean array where True = fixations, False = saccades
 	"""
-	return NotImplemented
+
+	# Chord length corresponding to the threshold angle
+	maxDiag = (2*np.sin(np.deg2rad(threshold)/2))**2
+
+	fixationMarkers = np.zeros(data.shape[0], dtype=bool)
+	_dispersionWindows(np.ascontiguousarray(data, dtype=float), maxDiag, float(minFixationTime), fixationMarkers)
+	if callback is not None: callback(.8)
+
+	fix_gen(fixationMarkers)
+
+	if callback is not None: callback(.99)
+
+	return fixationMarkers
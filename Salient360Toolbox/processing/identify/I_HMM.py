@@ -4,25 +4,31 @@
 # Year: 2019
 # Lab: IPI, LS2N, Nantes, France
 # Comment: 
-# -----saccadeVelThreshsaccadeVelThresh----------------------------
+# ---------------------------------
 
 import numpy as np
-import pomegranate as HMM
 
 from .commons import *
+from .gaussianHMM import GaussianHMM
 
 def parse(data,
 		  nStates=2,
 		  n_jobs=-1,
-		  callback=None):
+		  callback=None,
+		  model=None,
+		  train=True,
+		  save=None,
+		  maxIter=100,
+		  **kwargs):
 	"""
 	Train a HMM on a sequence of gaze features. If data are a velocity signal, the model will ideally separate high (saccades) from low velocities (fixations).
 	*data*: data must be of shape [N, M], where N is the number of samples and M the number of features
 	*nStates*: number of hidden state in the model
-	*saccadeVelThresh*: 
-	*n_jobs*: number of cpu cores to use for training HMM (def.: all)
-
-	^*The probability distributions available are listed on the promegranate repo.: github.com/jmschrei/pomegranate/tree/master/pomegranate/distributions
+	*n_jobs*: unused, kept for compatibility
+	*model*: GaussianHMM or path to parameters saved with GaussianHMM.save, used as starting point of the training (warm start)
+	*train*: if False, *model* is used as is to decode data
+	*save*: path where to save the fitted parameters
+	*maxIter*: max number of Baum-Welch iterations
 
 	Returns an integer array containig state indices for the current sequence data.
 	"""
@@ -34,24 +40,24 @@ def parse(data,
 	assert len(data.shape) in [1, 2], "Parameter \"data\" must be 2D numpy array. Got {}.".format(data.shape)
 	if len(data.shape) == 1: data = data[:, None]
 
-	if n_jobs == -1:
-		from multiprocessing import cpu_count
-		n_jobs = cpu_count()
-	elif type(n_jobs) is not int:
-		n_jobs = 1
+	if model is None:
+		hmm = GaussianHMM(nStates)
+	elif isinstance(model, GaussianHMM):
+		hmm = model
+	else:
+		hmm = GaussianHMM.load(model)
 
-	hmm = HMM.HiddenMarkovModel.from_samples(HMM.NormalDistribution,
-		n_components=nStates, X=data,  n_jobs=n_jobs)
+	if train or not hmm.initialised:
+		hmm.fit(data, maxIter=maxIter)
+		if save is not None:
+			hmm.save(save)
 	if callback is not None: callback(.8)
+
 	# Get state prediction with Viterbi's algorithm
-	_, states = hmm.viterbi(data)
-	states = np.array([int(state[0]) for state in states[1:]], dtype=int)
+	states = hmm.viterbi(data)
 	# Infer state order from emission probabilities mean
 	#	Lowest gaussian mean models fixation
-	means = np.array([state.distribution.parameters[0] for state in hmm.states if state.name.split("-")[-1] not in ["start", "end"]])
-
-	order = np.argsort(means, axis=0)
-	states = (states==order[0]).astype(np.int)
+	states = (states==hmm.order()[0]).astype(int)
 
 	# fix_sacc(states, 10)
 	# fix_fix(states, 10)
@@ -59,3 +65,68 @@ def parse(data,
 	fix_gen(states)
 
 	return states
+
+def poolSamples(velocities, maxSamples=2**20, segment=2**11, seed=0):
+	"""
+	Pool velocity samples from several recordings.
+	If there are more than `maxSamples` samples, contiguous segments of `segment` samples are drawn at random (temporal dynamics are preserved within segments).
+	Returns the pooled samples and the length of each sequence.
+	"""
+	velocities = [np.asarray(velocity) for velocity in velocities]
+	total = sum(velocity.shape[0] for velocity in velocities)
+
+	if total <= maxSamples:
+		return np.concatenate(velocities), [velocity.shape[0] for velocity in velocities]
+
+	segments = [(irec, iStart) for irec, velocity in enumerate(velocities)
+		for iStart in range(0, velocity.shape[0], segment)]
+	rng = np.random.RandomState(seed)
+	chosen = rng.choice(len(segments), size=max(1, maxSamples//segment), replace=False)
+
+	pooled = [velocities[irec][iStart: iStart+segment] for irec, iStart in sorted(segments[i] for i in chosen)]
+	return np.concatenate(pooled), [seq.shape[0] for seq in pooled]
+
+def fitPooled(velocities, nStates=2, maxSamples=2**20, segment=2**11, seed=0, maxIter=100, model=None, save=None):
+	"""
+	Train one HMM on velocity samples pooled from several recordings (see poolSamples).
+	*model*: GaussianHMM or path to saved parameters used as starting point of the training
+	*save*: path where to save the fitted parameters
+	"""
+	if model is None:
+		hmm = GaussianHMM(int(nStates))
+	elif isinstance(model, GaussianHMM):
+		hmm = model
+	else:
+		hmm = GaussianHMM.load(model)
+
+	X, lengths = poolSamples(velocities, maxSamples=maxSamples, segment=segment, seed=seed)
+	hmm.fit(X, lengths=lengths, maxIter=maxIter)
+
+	if save is not None:
+		hmm.save(save)
+
+	return hmm
+
+def decodePooled(velocities, model, n_jobs=-1):
+	"""
+	Label velocity signals of several recordings with the same HMM, in parallel processes.
+	Returns a list of label arrays (see parse)
+	"""
+	from concurrent.futures import ProcessPoolExecutor
+	from multiprocessing import cpu_count
+
+	if n_jobs == -1: n_jobs = cpu_count()
+	n_jobs = max(1, min(int(n_jobs), len(velocities)))
+
+	# Compile before starting processes (forked processes inherit compiled functions)
+	parse(np.zeros(3), model=model, train=False)
+
+	if n_jobs == 1:
+		return [parse(velocity, model=model, train=False) for velocity in velocities]
+
+	with ProcessPoolExecutor(n_jobs) as pool:
+		return list(pool.map(_decode, [(velocity, model) for velocity in velocities]))
+
+def _decode(args):
+	velocity, model = args
+	return parse(velocity, model=model, train=False)
@@ -7,6 +7,7 @@
 # ---------------------------------
 
 import numpy as np
+import numba
 
 from .commons import *
 
@@ -26,39 +27,78 @@ def parse(timestamp, velocity,
 
 	fix_gen(fixationMarkers)
 
-	Nsamples = velocity.shape[0]
+	# Remove short fixations
+	#	A fixation starting at sample s (s >= 2, preceded by a saccade) and ending at sample e is removed if it lasted less than minFixationTime (from timestamp[s-1] to timestamp[e]).
+	#	Removing a fixation only turns fixation samples into saccade samples, it never changes the boundaries of other fixations: a single pass over fixation runs reaches the fixed point.
+	starts, ends, labels = getRuns(fixationMarkers)
 
-	iDisp = 1
-	startMarker = 0
+	fixations = labels & (starts >= 2)
+	starts, ends = starts[fixations], ends[fixations]
+
+	short = (timestamp[ends] - timestamp[starts-1]) < minFixationTime
+
+	# Mark samples of short fixations (difference array)
+	remove = np.zeros(fixationMarkers.shape[0]+1, dtype=int)
+	np.add.at(remove, starts[short], 1)
+	np.add.at(remove, ends[short]+1, -1)
+	fixationMarkers[np.cumsum(remove[:-1]) > 0] = False
 
-	# Remove short fixations
-	change = False
-	iDisp = 1
-	fixStart = np.zeros(1)
-	fixEnd = np.zeros(1)
-	while iDisp < (Nsamples-1):
-		# print("  \rremove sf", iDisp, end="");
-		# Point where sacc ends and fix starts
-		if not fixationMarkers[iDisp] and fixationMarkers[iDisp+1]:
-			# print("  \rremove sf", iDisp, end="");
-			startMarker = iDisp
-			fixStart[:] = timestamp[iDisp]
-
-			# Loop ahead until we find the start of a new saccade
-			while iDisp < (Nsamples-1) and fixationMarkers[iDisp+1]:
-				iDisp+=1
-
-			fixEnd[:] = timestamp[iDisp]
-
-			if fixEnd-fixStart < minFixationTime:
-				fixationMarkers[startMarker: iDisp+1] = False
-				change = True
-		else:
-			iDisp += 1
-
-		# Reset until no small fixations are found
-		if iDisp==(Nsamples-1) and change:
-			iDisp = 1
-			change = False
-	
 	return fixationMarkers
+
+@numba.njit(parallel=True)
+def _sweep(timestamp, velocity, thresholds, minFixationTimes, counts, durations, labels):
+	# Same labelling as parse for every threshold (in parallel), then short fixation removal and fixation statistics for every minimum duration
+	N = velocity.shape[0]
+	for it in numba.prange(thresholds.shape[0]):
+		fixationMarkers = velocity <= thresholds[it]
+		fix_gen(fixationMarkers)
+
+		for im in range(minFixationTimes.shape[0]):
+			count = 0
+			duration = 0.
+			nFixSamples = 0
+			s = -1
+			for i in range(N+1):
+				if i < N and fixationMarkers[i]:
+					if s < 0: s = i
+					continue
+				if s < 0: continue
+
+				e = i-1
+				if s < 2 or (timestamp[e] - timestamp[s-1]) >= minFixationTimes[im]:
+					count += 1
+					# Fixation duration (see extract.getGazeFeatures)
+					duration += timestamp[min(e+1, N-1)] - timestamp[s]
+					nFixSamples += e-s+1
+					if labels.shape[0] > 0:
+						labels[it, im, s: e+1] = True
+				s = -1
+
+			# extract.getGazeFeatures outputs no fixations in these cases
+			if nFixSamples < 5 or nFixSamples > (N-2):
+				counts[it, im] = 0
+				durations[it, im] = np.nan
+			else:
+				counts[it, im] = count
+				durations[it, im] = duration / count
+
+def sweep(timestamp, velocity, thresholds, minFixationTimes=[80], return_labels=False):
+	"""
+	Evaluate a grid of I-VT parameters on one velocity signal: velocity thresholds (deg/sec) x minimum fixation durations (ms).
+	Returns the number of fixations and their mean duration (ms) for each combination (arrays of shape [nThresholds, nMinFixationTimes]), as would be found in the fixation list output by extract.getGazeFeatures.
+	If return_labels, also returns fixation markers of each combination (boolean array of shape [nThresholds, nMinFixationTimes, nSamples], same as parse)
+	"""
+	thresholds = np.deg2rad(np.atleast_1d(np.array(thresholds, dtype=float)))/1000 # Eye threshold rad/ms
+	minFixationTimes = np.atleast_1d(np.array(minFixationTimes, dtype=float))
+
+	counts = np.zeros([thresholds.shape[0], minFixationTimes.shape[0]], dtype=np.int64)
+	durations = np.empty([thresholds.shape[0], minFixationTimes.shape[0]])
+	shape = [thresholds.shape[0], minFixationTimes.shape[0], velocity.shape[0]] if return_labels else [0, 0, 0]
+	labels = np.zeros(shape, dtype=np.bool_)
+
+	_sweep(np.ascontiguousarray(timestamp, dtype=float), np.ascontiguousarray(velocity, dtype=float),
+		thresholds, minFixationTimes, counts, durations, labels)
+
+	if return_labels:
+		return counts, durations, labels
+	return counts, durations
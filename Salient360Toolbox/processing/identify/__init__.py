@@ -19,7 +19,7 @@ try:
 	from .I_HMM import parse as IHMM_parse
 	I_algos["I-HMM"] = IHMM_parse
 except:
-	printError("Could not import HMM saccade/fixation parsing algorithm.\n\trun `pip install pomegranate`")
+	printError("Could not import HMM saccade/fixation parsing algorithm.")
 
 try:
 	from .I_CT import parse as ICT_parse
@@ -28,7 +28,6 @@ except:
 	printError("Could not import cluster based saccade/fixation parsing algorithm.\n\trun `pip install sklearn`")
 
 try:
-	# Not implemented
 	from .I_DT import parse as IDT_parse
 	I_algos["I-DT"] = IDT_parse
 except:
@@ -7,10 +7,12 @@
 # ---------------------------------
 
 import numpy as np
+import numba
 
 from ...utils.misc import *
 from ...utils.distances import *
 
+@numba.njit
 def fix_sacc(seq, resample):
 	"""Remove short saccades samples and link saccades separated by short fixations
 	"""
@@ -20,7 +22,7 @@ def fix_sacc(seq, resample):
 
 	i = 0
 	sacc = False
-	stS = None
+	stS = 0
 	# pass: remove short saccade samples
 	while i < seq.shape[0]-1:
 		if seq[i] == 1:
@@ -38,7 +40,7 @@ def fix_sacc(seq, resample):
 
 	i = 0
 	sacc = False
-	stS = None
+	stS = 0
 	# pass: fill gap between close saccades
 	while i < seq.shape[0]-1:
 		if seq[i] == 1:
@@ -53,6 +55,7 @@ def fix_sacc(seq, resample):
 				sacc = False
 		i+=1
 
+@numba.njit
 def fix_fix(seq, resample):
 	"""Remove short fixations
 	"""
@@ -60,7 +63,7 @@ def fix_fix(seq, resample):
 
 	i = 0
 	fix = False
-	stS = None
+	stS = 0
 	while i < seq.shape[0]-1:
 		if seq[i] == 0:
 			if not fix:
@@ -74,8 +77,11 @@ def fix_fix(seq, resample):
 
 		i+=1
 
-def fix_gen(label_list):
+@numba.njit
+def fix_gen(label_list, edges=True):
 	# Removes unique True and False values surrounded by their complement (would usually disappear when the signal is smoothed)
+	# edges: also process first and last values (set to False when label_list is a slice of a longer sequence)
+	# Sequential: a label is compared to the already corrected previous label
 
 	for i in range(1, label_list.shape[0]-1):
 		lc = label_list[i]
@@ -85,7 +91,9 @@ def fix_gen(label_list):
 		if lc != lm and lc != lp:
 			label_list[i] = lm
 
-	for i in [0, label_list.shape[0]-1]:
+	if not edges or label_list.shape[0] == 0: return
+
+	for i in (0, label_list.shape[0]-1):
 		lc = label_list[i]
 
 		if i > 0:
@@ -99,6 +107,19 @@ def fix_gen(label_list):
 		if lc != lm and lc != lp:
 			label_list[i] = lm
 
+def getRuns(label_list):
+	"""
+	Run-length encoding of a label list.
+	Returns start indices, end indices (inclusive) and label values of runs of identical consecutive labels.
+	"""
+	if label_list.shape[0] == 0:
+		return np.empty(0, dtype=int), np.empty(0, dtype=int), label_list[:0]
+
+	ends = np.append(np.where(label_list[1:] != label_list[:-1])[0], label_list.shape[0]-1)
+	starts = np.append([0], ends[:-1]+1)
+
+	return starts, ends, label_list[starts]
+
 # Common functions
 def getVelocity(gp, return_keep=False, outlierSigma=5):
 	"""Input data: gaze data as unit vector followed by a timestamp
@@ -126,3 +147,14 @@ def getVelocity(gp, return_keep=False, outlierSigma=5):
 		return keep, velocity
 	else:
 		return None, velocity
+
+def filterVelocity(velocity, filter):
+	"""Smooth a velocity signal. filter: {"name": "gauss", "params": {"sigma": 4}} or {"name": "savgol", "params": {"win": 9, "poly": 2}}, other names: no filtering
+	"""
+	if filter["name"][0].lower() == "g":
+		from scipy.ndimage import gaussian_filter1d
+		return gaussian_filter1d(velocity, filter["params"]["sigma"])
+	elif filter["name"][0].lower() == "s":
+		from scipy.signal import savgol_filter
+		return savgol_filter(velocity, int(filter["params"]["win"]), int(filter["params"]["poly"]))
+	return velocity
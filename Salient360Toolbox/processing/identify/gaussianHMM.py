@@ -0,0 +1,291 @@
+#! /usr/bin/env python3
+# ---------------------------------
+# Author: Erwan DAVID
+# Year: 2020
+# Lab: SGL, Goethe University, Frankfurt
+# Comment: Hidden Markov Model with Gaussian emissions (diagonal covariances)
+# ---------------------------------
+
+"""
+Compiled Gaussian HMM: Baum-Welch training (scaled forward-backward) and log-space Viterbi decoding.
+Samples are rows of a [N, M] array (float32 or float64), several sequences can be concatenated and delimited with `lengths`.
+Non-finite samples (nan, inf) are treated as missing: their emission probability is the same for all states.
+"""
+
+import numpy as np
+import numba
+
+@numba.njit
+def _logEmissions(X, means, variances):
+	N, M = X.shape
+	K = means.shape[0]
+	logB = np.zeros((N, K))
+	for t in range(N):
+		missing = False
+		for m in range(M):
+			if not np.isfinite(X[t, m]):
+				missing = True
+		if missing: continue
+
+		for k in range(K):
+			logp = 0.
+			for m in range(M):
+				diff = X[t, m] - means[k, m]
+				logp -= .5 * (np.log(2*np.pi*variances[k, m]) + diff*diff/variances[k, m])
+			logB[t, k] = logp
+	return logB
+
+@numba.njit
+def _eStep(X, lengths, means, variances, transitions, startprob):
+	"""
+	Forward-backward pass over all sequences. Returns the log-likelihood and sufficient statistics.
+	"""
+	N, M = X.shape
+	K = means.shape[0]
+
+	logB = _logEmissions(X, means, variances)
+
+	loglik = 0.
+	gammaSum = np.zeros(K)
+	gammaX = np.zeros((K, M))
+	gammaX2 = np.zeros((K, M))
+	xiSum = np.zeros((K, K))
+	gamma0 = np.zeros(K)
+
+	B = np.empty((N, K))
+	alpha = np.empty((N, K))
+	beta = np.empty((N, K))
+	scale = np.empty(N)
+
+	start = 0
+	for length in lengths:
+		end = start + length
+		if length == 0: continue
+
+		# Emission probabilities scaled per sample
+		for t in range(start, end):
+			rowMax = logB[t, 0]
+			for k in range(1, K):
+				rowMax = max(rowMax, logB[t, k])
+			for k in range(K):
+				B[t, k] = np.exp(logB[t, k] - rowMax)
+			loglik += rowMax
+
+		# Forward
+		c = 0.
+		for k in range(K):
+			alpha[start, k] = startprob[k] * B[start, k]
+			c += alpha[start, k]
+		scale[start] = c
+		for k in range(K):
+			alpha[start, k] /= c
+		for t in range(start+1, end):
+			c = 0.
+			for j in range(K):
+				a = 0.
+				for i in range(K):
+					a += alpha[t-1, i] * transitions[i, j]
+				alpha[t, j] = a * B[t, j]
+				c += alpha[t, j]
+			scale[t] = c
+			for j in range(K):
+				alpha[t, j] /= c
+
+		for t in range(start, end):
+			loglik += np.log(scale[t])
+
+		# Backward
+		for k in range(K):
+			beta[end-1, k] = 1.
+		for t in range(end-2, start-1, -1):
+			for i in range(K):
+				b = 0.
+				for j in range(K):
+					b += transitions[i, j] * B[t+1, j] * beta[t+1, j]
+				beta[t, i] = b / scale[t+1]
+
+		# Statistics
+		for t in range(start, end):
+			missing = False
+			for m in range(M):
+				if not np.isfinite(X[t, m]):
+					missing = True
+			for k in range(K):
+				gamma = alpha[t, k] * beta[t, k]
+				if t == start:
+					gamma0[k] += gamma
+				if missing: continue
+				gammaSum[k] += gamma
+				for m in range(M):
+					gammaX[k, m] += gamma * X[t, m]
+					gammaX2[k, m] += gamma * X[t, m] * X[t, m]
+
+			if t < end-1:
+				for i in range(K):
+					for j in range(K):
+						xiSum[i, j] += alpha[t, i] * transitions[i, j] * B[t+1, j] * beta[t+1, j] / scale[t+1]
+
+		start = end
+
+	return loglik, gammaSum, gammaX, gammaX2, xiSum, gamma0
+
+@numba.njit
+def _viterbi(X, lengths, means, variances, transitions, startprob):
+	N = X.shape[0]
+	K = means.shape[0]
+
+	logB = _logEmissions(X, means, variances)
+	logA = np.log(transitions)
+	logPi = np.log(startprob)
+
+	states = np.empty(N, dtype=np.int64)
+	psi = np.empty((N, K), dtype=np.int32)
+	delta = np.empty(K)
+	prev = np.empty(K)
+
+	start = 0
+	for length in lengths:
+		end = start + length
+		if length == 0: continue
+
+		for k in range(K):
+			delta[k] = logPi[k] + logB[start, k]
+
+		for t in range(start+1, end):
+			for k in range(K):
+				prev[k] = delta[k]
+			for j in range(K):
+				best = 0
+				bestVal = prev[0] + logA[0, j]
+				for i in range(1, K):
+					val = prev[i] + logA[i, j]
+					if val > bestVal:
+						best = i
+						bestVal = val
+				psi[t, j] = best
+				delta[j] = bestVal + logB[t, j]
+
+		best = 0
+		for k in range(1, K):
+			if delta[k] > delta[best]:
+				best = k
+		states[end-1] = best
+		for t in range(end-1, start, -1):
+			states[t-1] = psi[t, states[t]]
+
+		start = end
+
+	return states
+
+class GaussianHMM():
+	"""
+	Hidden Markov Model with Gaussian emissions.
+	Usage:
+		hmm = GaussianHMM(nStates=2)
+		hmm.fit(velocity)
+		states = hmm.viterbi(velocity)
+		hmm.save("model.npz")
+		# Warm start
+		hmm = GaussianHMM.load("model.npz")
+	"""
+	def __init__(self, nStates=2, means=None, variances=None, transitions=None, startprob=None):
+		self.nStates = int(nStates)
+		self.means = None if means is None else np.array(means, dtype=float)
+		self.variances = None if variances is None else np.array(variances, dtype=float)
+		self.transitions = None if transitions is None else np.array(transitions, dtype=float)
+		self.startprob = None if startprob is None else np.array(startprob, dtype=float)
+		self.loglik = None
+
+	@property
+	def initialised(self):
+		return self.means is not None
+
+	@staticmethod
+	def _prepare(X, lengths=None):
+		X = np.asarray(X)
+		if X.dtype not in [np.float32, np.float64]:
+			X = X.astype(float)
+		if len(X.shape) == 1: X = X[:, None]
+		X = np.ascontiguousarray(X)
+
+		if lengths is None:
+			lengths = [X.shape[0]]
+		lengths = np.array(lengths, dtype=np.int64)
+		assert lengths.sum() == X.shape[0], "Sequence lengths must sum to the number of samples. Got {} and {}.".format(lengths.sum(), X.shape[0])
+
+		return X, lengths
+
+	def _initialise(self, X):
+		# Split samples into nStates groups of increasing values (first feature)
+		valid = np.all(np.isfinite(X), axis=1)
+		Xv = X[valid].astype(float)
+		groups = np.array_split(Xv[np.argsort(Xv[:, 0], kind="stable")], self.nStates)
+
+		self.means = np.array([group.mean(axis=0) for group in groups])
+		self.variances = np.array([group.var(axis=0) for group in groups])
+		self.variances = np.maximum(self.variances, self._minVariance(Xv))
+		self.transitions = np.full([self.nStates, self.nStates], 1/self.nStates)
+		self.startprob = np.full(self.nStates, 1/self.nStates)
+
+	@staticmethod
+	def _minVariance(X):
+		# Prevents states from collapsing on a single value
+		return np.maximum(X.var(axis=0) * 1e-6, np.finfo(float).tiny)
+
+	def fit(self, X, lengths=None, maxIter=100, tol=1e-6, callback=None):
+		"""
+		Baum-Welch training. Starts from current parameters if the model is initialised (warm start).
+		Stops when the relative log-likelihood improvement is lower than `tol`.
+		"""
+		X, lengths = self._prepare(X, lengths)
+		if not self.initialised:
+			self._initialise(X)
+
+		valid = np.all(np.isfinite(X), axis=1)
+		minVariance = self._minVariance(X[valid].astype(float))
+
+		prev = -np.inf
+		for iIter in range(int(maxIter)):
+			loglik, gammaSum, gammaX, gammaX2, xiSum, gamma0 = _eStep(X, lengths,
+				self.means, self.variances, self.transitions, self.startprob)
+
+			# M step
+			self.startprob = gamma0 / gamma0.sum()
+			rowSum = xiSum.sum(axis=1)[:, None]
+			self.transitions = np.where(rowSum > 0, xiSum / np.where(rowSum > 0, rowSum, 1), self.transitions)
+			occupied = gammaSum > 0
+			self.means[occupied] = gammaX[occupied] / gammaSum[occupied, None]
+			self.variances[occupied] = gammaX2[occupied] / gammaSum[occupied, None] - self.means[occupied]**2
+			self.variances = np.maximum(self.variances, minVariance)
+
+			if callback is not None: callback((iIter+1)/maxIter)
+
+			self.loglik = loglik
+			if loglik - prev < tol * abs(loglik):
+				break
+			prev = loglik
+
+		return self
+
+	def viterbi(self, X, lengths=None):
+		"""
+		Most likely state sequence
+		"""
+		X, lengths = self._prepare(X, lengths)
+		return _viterbi(X, lengths, self.means, self.variances, self.transitions, self.startprob)
+
+	def order(self):
+		"""
+		State indices sorted by increasing mean (first feature)
+		"""
+		return np.argsort(self.means[:, 0], kind="stable")
+
+	def save(self, path):
+		np.savez(path, means=self.means, variances=self.variances,
+			transitions=self.transitions, startprob=self.startprob)
+
+	@classmethod
+	def load(cls, path):
+		params = np.load(path)
+		return cls(params["means"].shape[0], means=params["means"], variances=params["variances"],
+			transitions=params["transitions"], startprob=params["startprob"])
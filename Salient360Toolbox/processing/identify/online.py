@@ -0,0 +1,146 @@
+#! /usr/bin/env python3
+# ---------------------------------
+# Author: Erwan DAVID
+# Year: 2020
+# Lab: SGL, Goethe University, Frankfurt
+# Comment: Online fixation identification of live sample streams
+# ---------------------------------
+
+"""
+I-VT fixation identification of samples received in small batches (e.g., from a headset feed).
+Relies on the stages of processing.streaming: state is bounded to the filter's support, one sample of look-ahead and the samples of the fixation being built.
+Fixations are emitted as soon as they are complete, with the same features as processing.extract.getGazeFeatures.
+"""
+
+import numpy as np
+
+from ...utils.misc import *
+from ...utils.distances import dist_angle_arrays_unsigned
+from .. import preprocess
+from ..streaming import FilterStage, LabelStage, FeatureStage
+
+class OnlineIVT():
+	"""
+	Usage:
+		ivt = OnlineIVT(threshold=120, filter={"name": "savgol", "params": {"win": 9, "poly": 2}})
+		for timestamp, quaternion, eye in source:
+			fixations = ivt.push(timestamp, quaternion, eye)
+		fixations = ivt.flush()
+	`timestamp`: [N], `quaternion`: head rotations [N, 4] (w, x, y, z), `eye`: eye-in-head direction vectors [N, 3].
+	Timestamps are divided by 10**timestampScale to be in milliseconds and are counted from the first sample.
+	Euler2Quat: head rotations are Unity Euler angles (pitch, yaw, roll) in `quaternion`[:, :3], converted as in helper.getFixationList.
+	`degrees`: are Euler angles in degrees? Inferred from each batch if None, set it to match offline processing (inferred from the whole recording).
+	Unlike offline processing, velocity outliers are not removed (their statistics are not known in advance).
+	"""
+	def __init__(self, threshold=120, minFixationTime=80, filter=None, timestampScale=0, Euler2Quat=False, degrees=None, callback=None):
+		if filter is None:
+			filter = {"name": "None"}
+
+		self.timestampScale = timestampScale
+		self.Euler2Quat = Euler2Quat
+		self.degrees = degrees
+		self.callback = callback
+
+		self.filterStage = FilterStage(filter)
+		self.labelStage = LabelStage(threshold)
+		self.featureStage = FeatureStage(minFixationTime)
+
+		self.t0 = None
+		self.nSamples = 0
+		# Last sample, its velocity is known once the next sample is received
+		self.carry = None
+		self.firstVelocity = None
+		self.closed = False
+
+	def prepare(self, timestamp, quaternion, eye):
+		"""
+		Gaze matrix of a batch of samples (see preprocess.prepareGaze), invalid samples are dropped
+		"""
+		data = np.empty([len(timestamp), 8])
+		data[:, 0] = timestamp
+		data[:, 1:5] = quaternion
+		data[:, 5:8] = eye
+
+		if self.Euler2Quat:
+			preprocess.convertEulerToQuat(data[:, 1:5], degrees=self.degrees)
+
+		data = data[preprocess.getValidity(data)]
+		if data.shape[0] == 0:
+			return np.empty([0, 11])
+
+		if self.t0 is None: self.t0 = data[0, 0]
+		data[:, 0] -= self.t0
+		if self.timestampScale != 0:
+			data[:, 0] /= 10**self.timestampScale
+
+		head, gaze = preprocess.getDataOnSphere(data, Euler2Quat=self.Euler2Quat)
+		gaze = preprocess.prepareGaze(data, head, gaze)
+		gaze[:, 10] += self.nSamples
+		self.nSamples += gaze.shape[0]
+
+		return gaze
+
+	def velocity(self, gaze):
+		"""
+		Velocity of buffered samples (see identify.commons.getVelocity), the last sample is kept until the next batch
+		"""
+		if self.carry is not None:
+			gaze = np.concatenate([self.carry, gaze])
+		if gaze.shape[0] < 2:
+			self.carry = gaze
+			return gaze[:0], np.empty([0])
+
+		gp = gaze[:, [0,1,2, 9]]
+		velocity = dist_angle_arrays_unsigned(gp[1:, :3], gp[:-1, :3]) / (gp[1:, 3] - gp[:-1, 3])
+
+		if self.firstVelocity is None: self.firstVelocity = velocity[0]
+
+		self.carry = gaze[-1:]
+		return gaze[:-1], velocity
+
+	def process(self, gaze, velocity, last=False):
+		gaze, velocity = self.filterStage.push(gaze, velocity, last=last)
+		gaze, velocity, markers = self.labelStage.push(gaze, velocity, last=last)
+		fixations = self.featureStage.push(gaze, velocity, markers, last=last)
+
+		if self.callback is not None and fixations.shape[0] > 0:
+			self.callback(fixations)
+
+		return fixations
+
+	def push(self, timestamp, quaternion, eye):
+		"""
+		Process a batch of samples. Returns fixations completed so far (array of shape [n, 29])
+		"""
+		if self.closed:
+			printError("Stream was flushed, create a new OnlineIVT object.", header="OnlineIVT")
+			return np.empty([0, 29])
+
+		gaze, velocity = self.velocity(self.prepare(timestamp, quaternion, eye))
+		return self.process(gaze, velocity)
+
+	def flush(self):
+		"""
+		End of stream: returns the remaining fixations
+		"""
+		if self.closed:
+			return np.empty([0, 29])
+		self.closed = True
+
+		if self.carry is None:
+			return np.empty([0, 29])
+
+		# Last sample takes the first velocity value
+		velocity = np.array([self.firstVelocity if self.firstVelocity is not None else np.nan])
+		return self.process(self.carry, velocity, last=True)
+
+def replay(raw_data, batchsize=8, eye=None):
+	"""
+	Stand-in for a live source: yield batches of (timestamp, quaternion, eye direction) from a raw gaze recording (see utils.readRawFile)
+	Head rotations are yielded as stored: Euler angles of Unity recordings need OnlineIVT(Euler2Quat=True)
+	"""
+	for iStart in range(0, raw_data.shape[0], batchsize):
+		batch = np.array(raw_data[iStart: iStart+batchsize], dtype=float)
+		if eye == "B":
+			preprocess.averageEyes(batch)
+		yield batch[:, 0], batch[:, 1:5], batch[:, 5:8]
@@ -33,17 +33,25 @@ class VPdata():
 		return VPdata([80, 90], [2160, 1200])
 		# return VPdata([95, 106], [1920, 1080]) # Oculus Dev1?
 
-@numba.njit
-def convertEulerToQuat(data):
+def convertEulerToQuat(data, degrees=None):
+	"""
+	Convert Euler angles (pitch, yaw, roll) in data[:, :3] to quaternions (W,X,Y,Z) in data[:, :4], in place.
+	`degrees`: are angles expressed in degrees? Inferred from the data if None.
+	"""
 	# In Unity Euler angles are reported in degrees by default
-	if np.any(np.abs(data[:, :3]) > (2*np.pi)):
+	if degrees is None:
+		degrees = isEulerInDegrees(data)
+	if degrees:
 		# Transform to radians
 		data[:, :4] = np.deg2rad(data[:, :4])
 
-		# TODO: error here
-		# deg2rad would copy and original data object would not be modified
-		# Where is deg2rad applied then?
+	EulerToQuat_(data)
 
+def isEulerInDegrees(data):
+	return np.any(np.abs(data[:, :3]) > (2*np.pi))
+
+@numba.njit
+def EulerToQuat_(data):
 	# from: github.com/mrdoob/three.js/blob/master/src/math/Quaternion.js
  	# pitch
 	X = data[:, 0]
@@ -66,40 +74,37 @@ def convertEulerToQuat(data):
 	data[:, 2] = c1 * s2 * c3 - s1 * c2 * s3 # Y
 	data[:, 3] = c1 * c2 * s3 - s1 * s2 * c3 # Z
 
-def interpolate_raw(gaze_data, validity, samplingRate=120):
-	from scipy import interpolate
-
-	ET  = slice(5, 8, None)
-	HMD = slice(1, 5, None)
-
-	repeatET = np.all(gaze_data[1:, ET] != gaze_data[:-1, ET], axis=1)
-	repeatET = np.append(repeatET, True)
-
-	nET = np.where(np.logical_and(validity, repeatET))[0]
-	nHMD = np.where(np.logical_and(
-						validity,
-						np.append(
-							np.all(gaze_data[1:, HMD] != gaze_data[:-1, HMD], axis=1),
-							True)
-						)
-					)[0]-1
+def interpolate_raw(gaze_data, validity, samplingRate=120, method="cubic"):
+	"""
+	Resample raw gaze data at `samplingRate` Hz (see processing.resample)
+	method: "cubic" (cubic spline and SQUAD) or "linear" (linear interpolation and SLERP)
+	"""
+	from .resample import getClock, resampleRaw
 
 	gaze_data[:, 0] = (gaze_data[:, 0] - gaze_data[0, 0])
 
 	# New data at N (=resample) samples per millisecond
-	new_data = np.zeros([int(gaze_data[-1, 0]/1e3 * samplingRate), gaze_data.shape[1]])
-	# Interpolation space
-	interpR = np.linspace(0, gaze_data[-1, 0], new_data.shape[0], endpoint=True)
-	new_data[:, 0] = interpR
-
-	# Interpolate gaze unit direction
-	new_data[:, ET] = interpolate.griddata(gaze_data[nET, 0], gaze_data[nET, ET], (interpR), method='cubic', fill_value="extrapolate")
-	# Interpolate camera rotation (quaternion)
-	new_data[:, HMD] = quat.as_float_array(quat.squad(quat.as_quat_array(gaze_data[nHMD, HMD]), gaze_data[nHMD, 0], (interpR)))
+	interpR = getClock(0, gaze_data[-1, 0], samplingRate)
 
-	new_data[:, ET] /= np.linalg.norm(new_data[:, ET], axis=1)[:, None]
+	return resampleRaw(gaze_data, validity, interpR, method=method)
 
-	return new_data
+@numba.njit
+def rotateVectors_(q, v, out):
+	"""
+	Rotate vectors v[i] (X,Y,Z) by quaternions q[i] (W,X,Y,Z), output to out[i].
+	Same as quaternion.rotate_vectors applied to each pair (quaternions need not be normalized).
+	"""
+	for i in range(q.shape[0]):
+		w, x, y, z = q[i, 0], q[i, 1], q[i, 2], q[i, 3]
+		n = w**2 + x**2 + y**2 + z**2
+		if n == 0:
+			raise ZeroDivisionError("Quaternion with zero norm")
+
+		vx, vy, vz = v[i, 0], v[i, 1], v[i, 2]
+		# Rotation matrix
+		out[i, 0] = (1.0 - 2*(y**2 + z**2)/n)*vx + (2*(x*y - z*w)/n)*vy + (2*(x*z + y*w)/n)*vz
+		out[i, 1] = (2*(x*y + z*w)/n)*vx + (1.0 - 2*(x**2 + z**2)/n)*vy + (2*(y*z - x*w)/n)*vz
+		out[i, 2] = (2*(x*z - y*w)/n)*vx + (2*(y*z + x*w)/n)*vy + (1.0 - 2*(x**2 + y**2)/n)*vz
 
 def getDataOnSphere(data, Euler2Quat=False, callback=lambda *a: None):
 
@@ -108,12 +113,14 @@ def getDataOnSphere(data, Euler2Quat=False, callback=lambda *a: None):
 	head = quat.rotate_vectors(HMD_rot, [0, 0, 1])
 	head = quat.rotate_vectors(np.quaternion(1, 1, 0, 0), head)
 
-	# This solution is faster for large datafiles, but uses a lot of memory
-	# gaze = quat.rotate_vectors(HMD_rot, data[:, 5:8])[np.eye(data.shape[0], dtype=bool)]
+	# Rotate each eye-in-head vector by its head rotation
 	gaze = np.empty([data.shape[0], 3])
-	for i in range(data.shape[0]):
-		gaze[i] = quat.rotate_vectors(HMD_rot[i], data[i, 5:8])
-		callback((i+1)/data.shape[0], "Calculating eye-in-space data")
+	# Process by steps to report progress
+	step = max(1, data.shape[0]//20)
+	for iStart in range(0, data.shape[0], step):
+		iEnd = min(iStart+step, data.shape[0])
+		rotateVectors_(data[iStart: iEnd, 1:5], data[iStart: iEnd, 5:8], gaze[iStart: iEnd])
+		callback(iEnd/data.shape[0], "Calculating eye-in-space data")
 	gaze = quat.rotate_vectors(np.quaternion(1, 1, 0, 0), gaze)
 
 	if Euler2Quat:
@@ -157,8 +164,42 @@ def prepareGaze(data, head, gaze):
 
 	return gaze_in
 
+def averageEyes(data):
+	"""
+	Average left (data[:, 8:11]) and right (data[:, 5:8]) gaze direction vectors in data[:, 5:8], in place
+	"""
+	data[:, 5:8] = (data[:, 5:8] + data[:, 8:11])/2
+	# Reproject on sphere
+	data[:, 5:8] /= np.linalg.norm(data[:, 5:8], axis=1)[:, None]
+
+def getTimestampScale(meanDiff):
+	"""
+	Return the power of ten timestamps must be divided by to be expressed in milliseconds
+	`meanDiff`: average timestamp difference between samples
+	"""
+	#	Get log10 of average timestamp differences between samples (good approximation for one over sampling rate)
+	logframerate = np.log10(meanDiff)
+	#	Round to the nearest multiple of 3 (because we transform from nanosec (SMI), microsec (Tobii) to millisec)
+	return int(3 * (logframerate//3))
+
+def getValidity(data, eye=None):
+	"""
+	Return a boolean mask of valid data samples
+	"""
+	if eye != "H":
+		# Exclude NaNs found in eye or head data
+		#	SMI reports NaN were gaze is lost
+		validity = ~np.any( np.isnan(data[:, 1:]), axis=1 )
+		#	Tobii reports all 0 or -1 when data is missing
+		validity &= ~( data[:, 5:8].sum(axis=1) == -3 )
+		validity &= ~( data[:, 5:8].sum(axis=1) == 0 )
+	else:
+		validity = np.ones([data.shape[0]], dtype=bool)
+
+	return validity
+
 def preprocess(data, data_range, resample=None, Euler2Quat=False, eye=None,
-	callback=lambda *a: None):
+	callback=lambda *a: None, resample_method="cubic"):
 	"""
 	Input: raw head and eye tracking data
 	Output: list of fixation and saccade features
@@ -172,36 +213,23 @@ def preprocess(data, data_range, resample=None, Euler2Quat=False, eye=None,
 	data = data[slice(*data_range)]
 
 	if eye == "B":
-		data[:, 5:8] = (data[:, 5:8] + data[:, 8:11])/2
-		# Reproject on sphere
-		data[:, 5:8] /= np.linalg.norm(data[:, 5:8], axis=1)[:, None]
+		averageEyes(data)
 
 	data[:, 0] = data[:, 0] - data[0, 0]
 	# We expect timestamps in milliseconds, we transform them if this is not the case
-	#	Get log10 of average timestamp differences between samples (good approximation for one over sampling rate)
-	logframerate = np.log10(np.nanmean(data[1:, 0] - data[:-1, 0]))
-	#	Round to the nearest multiple of 3 (because we transform from nanosec (SMI), microsec (Tobii) to millisec)
-	rem = int(3 * (logframerate//3))
+	rem = getTimestampScale(np.nanmean(data[1:, 0] - data[:-1, 0]))
 	if rem != 0:
 		data[:, 0] /= 10**rem
 		printWarning("Timestamps were divided by 1e{} to be in milliseconds".format(rem), header="preprocess", verbose=0)
 
 	callback(0, "Processing valid data samples.")
 
-	if eye != "H":
-		# Exclude NaNs found in eye or head data
-		#	SMI reports NaN were gaze is lost
-		validity = ~np.any( np.isnan(data[:, 1:]), axis=1 )
-		#	Tobii reports all 0 or -1 when data is missing
-		validity &= ~( data[:, 5:8].sum(axis=1) == -3 )
-		validity &= ~( data[:, 5:8].sum(axis=1) == 0 )
-	else:
-		validity = np.ones([data.shape[0]], dtype=bool)
+	validity = getValidity(data, eye=eye)
 
 	if type(resample) in [int, float] and resample > 0:
 		callback(.1, "Interpolating data to {} Hz.".format(resample))
 		data = interpolate_raw(data, validity,
-			samplingRate=resample)
+			samplingRate=resample, method=resample_method)
 	else:
 		data = data[validity]
 		
@@ -217,23 +245,27 @@ def downsample2Centroid(gp, tempWindowSize=90):
 	"""
 	Return a segmentation of data samples as a trajectory of points based on an uniform resampling of camera rotations.
 	parameter `tempWindowSize` determines the size of the windows used to downsample signal.
+	The last sample of each window is labelled 1, others 0. Timestamps (gp[:, 9]) are expected to be sorted.
+	`tempWindowSize` can be a list of window sizes, a label list is then returned for each (array of shape [len(tempWindowSize), N]).
 	"""
+	if np.ndim(tempWindowSize) > 0:
+		return np.array([downsample2Centroid(gp, size) for size in tempWindowSize])
 
-	sampleN = int(gp[-1, 9]//tempWindowSize)
+	ts = gp[:, 9]
 
-	label_list = np.zeros([gp.shape[0]])
+	sampleN = int(ts[-1]//tempWindowSize)
 
-	for iSS in range(sampleN):
+	label_list = np.zeros([gp.shape[0]])
 
-		iStart = iSS * tempWindowSize
-		iEnd = (iSS+1) * tempWindowSize
+	# Window boundaries: window iSS covers [iSS * tempWindowSize, (iSS+1) * tempWindowSize)
+	edges = np.arange(sampleN+1) * tempWindowSize
+	bounds = ts.searchsorted(edges, side="left")
 
-		data_range = np.logical_and(gp[:, 9] >= iStart, gp[:, 9] < iEnd)
-		if data_range.sum() == 0:
-			continue
-		iSs, iEs = np.array(np.where(data_range))[0][[0, -1]]
+	# Index of the first and last sample of each window
+	iSs = bounds[:-1]
+	iEs = bounds[1:]-1
 
-		label_list[iSs:iEs] = 0
-		label_list[iEs] = 1
+	# Skip empty windows
+	label_list[iEs[iEs >= iSs]] = 1
 
 	return label_list
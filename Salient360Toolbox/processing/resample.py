@@ -0,0 +1,251 @@
+#! /usr/bin/env python3
+# ---------------------------------
+# Author: Erwan DAVID
+# Year: 2020
+# Lab: SGL, Goethe University, Frankfurt
+# Comment: Resampling of gaze direction and head rotation time series
+# ---------------------------------
+
+"""
+Time series are resampled with 1D interpolants evaluated at output timestamps.
+Input samples bracketing each output timestamp are found once with a binary search (see getBrackets) and shared by all interpolants.
+	- Direction vectors: cubic spline (same as scipy.interpolate.griddata(method="cubic") in 1D) or linear interpolation.
+	- Quaternions (W,X,Y,Z): SLERP or SQUAD (same as quaternion.squad), compiled and operating on float arrays.
+Memory is linear in the number of input and output samples.
+"""
+
+import numpy as np
+import numba
+
+# Same tolerance as the quaternion module
+_EPS = 1e-14
+
+def getBrackets(t_in, t_out):
+	"""
+	Index i of the input sample such that t_in[i] <= t_out < t_in[i+1], and the normalized time tau in [0, 1) between t_in[i] and t_in[i+1].
+	Output timestamps past the last input sample extrapolate from the last interval.
+	"""
+	idx = t_in.searchsorted(t_out, side="right")-1
+
+	i = np.clip(idx, 0, max(t_in.shape[0]-2, 0))
+	dt = t_in[np.minimum(i+1, t_in.shape[0]-1)] - t_in[i]
+	with np.errstate(divide="ignore", invalid="ignore"):
+		tau = (t_out - t_in[i]) / dt
+
+	return idx, tau
+
+def interpolateVectors(t_in, values, t_out, method="cubic", brackets=None):
+	"""
+	Interpolate values (shape [N, k]) sampled at t_in (sorted) at timestamps t_out, extrapolating outside of t_in's range.
+	method: "cubic" (not-a-knot cubic spline) or "linear".
+	"""
+	if method == "cubic":
+		from scipy.interpolate import make_interp_spline
+		# Same interpolant as interp1d(kind="cubic"), used by griddata for 1D data
+		return make_interp_spline(t_in, values, k=3, axis=0)(t_out, extrapolate=True)
+	elif method == "linear":
+		idx, tau = getBrackets(t_in, t_out) if brackets is None else brackets
+		i = np.clip(idx, 0, max(t_in.shape[0]-2, 0))
+		j = np.minimum(i+1, t_in.shape[0]-1)
+		return values[i] + (values[j] - values[i]) * tau[:, None]
+	raise ValueError("Unknown interpolation method \"{}\" (\"cubic\" or \"linear\")".format(method))
+
+# Quaternion operations on (W,X,Y,Z) tuples
+
+@numba.njit
+def _qmul(a, b):
+	return (a[0]*b[0] - a[1]*b[1] - a[2]*b[2] - a[3]*b[3],
+			a[0]*b[1] + a[1]*b[0] + a[2]*b[3] - a[3]*b[2],
+			a[0]*b[2] - a[1]*b[3] + a[2]*b[0] + a[3]*b[1],
+			a[0]*b[3] + a[1]*b[2] - a[2]*b[1] + a[3]*b[0])
+
+@numba.njit
+def _qconj(a):
+	return (a[0], -a[1], -a[2], -a[3])
+
+@numba.njit
+def _qscale(a, s):
+	return (a[0]*s, a[1]*s, a[2]*s, a[3]*s)
+
+@numba.njit
+def _qadd(a, b):
+	return (a[0]+b[0], a[1]+b[1], a[2]+b[2], a[3]+b[3])
+
+@numba.njit
+def _qlog(a):
+	b = np.sqrt(a[1]**2 + a[2]**2 + a[3]**2)
+	if b <= _EPS * abs(a[0]):
+		if a[0] < 0:
+			if abs(a[0] + 1) > _EPS:
+				return (np.log(-a[0]), np.pi, 0., 0.)
+			return (0., np.pi, 0., 0.)
+		return (np.log(a[0]), 0., 0., 0.)
+	f = np.arctan2(b, a[0]) / b
+	return (np.log(a[0]**2 + b**2)/2, f*a[1], f*a[2], f*a[3])
+
+@numba.njit
+def _qexp(a):
+	vnorm = np.sqrt(a[1]**2 + a[2]**2 + a[3]**2)
+	e = np.exp(a[0])
+	if vnorm > _EPS:
+		s = e * np.sin(vnorm) / vnorm
+		return (e * np.cos(vnorm), s*a[1], s*a[2], s*a[3])
+	return (e, 0., 0., 0.)
+
+@numba.njit
+def _qinv(a):
+	n = a[0]**2 + a[1]**2 + a[2]**2 + a[3]**2
+	return (a[0]/n, -a[1]/n, -a[2]/n, -a[3]/n)
+
+@numba.njit
+def _slerp(q1, q2, tau):
+	# (q2/q1)^tau * q1, along the shortest path
+	chordal = np.sqrt((q1[0]-q2[0])**2 + (q1[1]-q2[1])**2 + (q1[2]-q2[2])**2 + (q1[3]-q2[3])**2)
+	if chordal > 1.414213562373096:
+		q2 = _qscale(q2, -1.)
+	return _qmul(_qexp(_qscale(_qlog(_qmul(q2, _qinv(q1))), tau)), q1)
+
+@numba.njit
+def _squad(tau, q1, a, b, q2):
+	return _slerp(_slerp(q1, q2, tau), _slerp(a, b, tau), 2*tau*(1-tau))
+
+@numba.njit
+def _get(q, i):
+	return (q[i, 0], q[i, 1], q[i, 2], q[i, 3])
+
+@numba.njit
+def _squadCoefficients(q, t):
+	"""
+	Control points A[i] and B[i] of the spline segment between q[i] and q[i+1] (see quaternion.squad)
+	"""
+	n = q.shape[0]
+	A = np.empty((n, 4))
+	B = np.empty((n, 4))
+	for i in range(n):
+		im1 = (i-1) % n
+		ip1 = (i+1) % n
+		ip2 = (i+2) % n
+		qim1, qi, qip1, qip2 = _get(q, im1), _get(q, i), _get(q, ip1), _get(q, ip2)
+
+		logi = _qlog(_qmul(_qconj(qi), qip1))
+		a = _qadd(_qscale(logi, -1.),
+				  _qscale(_qlog(_qmul(_qconj(qim1), qi)), (t[ip1] - t[i]) / (t[i] - t[im1])))
+		A[i] = _qmul(qi, _qexp(_qscale(a, .25)))
+
+		b = _qadd(_qscale(_qlog(_qmul(_qconj(qip1), qip2)), (t[ip1] - t[i]) / (t[ip2] - t[ip1])),
+				  _qscale(logi, -1.))
+		B[i] = _qmul(qip1, _qexp(_qscale(b, -.25)))
+
+	# Boundary conditions
+	A[0] = q[0]
+	A[n-1] = q[n-1]
+	B[n-2] = q[n-1]
+	B[n-1] = _qmul(_qmul(_get(q, n-1), _qconj(_get(q, n-2))), _get(q, n-1))
+
+	return A, B
+
+@numba.njit
+def _squadEvaluate(q, t, A, B, idx, t_out, out):
+	n = q.shape[0]
+	# Extrapolated sample past the last one
+	qLast = _qmul(_qmul(_get(q, n-1), _qconj(_get(q, n-2))), _get(q, n-1))
+	tLast = t[n-1] + (t[n-1] - t[n-2])
+
+	for k in range(idx.shape[0]):
+		i = idx[k] % n
+		if i == n-1:
+			qip1, tip1 = qLast, tLast
+		else:
+			qip1, tip1 = _get(q, i+1), t[i+1]
+		tau = (t_out[k] - t[i]) / (tip1 - t[i])
+		out[k] = _squad(tau, _get(q, i), _get(A, i), _get(B, i), qip1)
+
+@numba.njit
+def _slerpEvaluate(q, idx, tau, out):
+	n = q.shape[0]
+	for k in range(idx.shape[0]):
+		i = min(max(idx[k], 0), n-2)
+		out[k] = _slerp(_get(q, i), _get(q, i+1), tau[k])
+
+def interpolateQuaternions(t_in, q, t_out, method="squad", brackets=None):
+	"""
+	Interpolate unit quaternions q (float array of shape [N, 4], W,X,Y,Z) sampled at t_in (sorted) at timestamps t_out.
+	method: "squad" (spherical cubic spline, same as quaternion.squad) or "slerp" (spherical linear interpolation).
+	"""
+	q = np.ascontiguousarray(q, dtype=float)
+	t_in = np.ascontiguousarray(t_in, dtype=float)
+	t_out = np.ascontiguousarray(t_out, dtype=float)
+	out = np.empty([t_out.shape[0], 4])
+	if q.shape[0] == 0 or t_out.shape[0] == 0:
+		return out
+	if q.shape[0] == 1:
+		out[:] = q[0]
+		return out
+
+	idx, tau = getBrackets(t_in, t_out) if brackets is None else brackets
+
+	if method == "squad":
+		A, B = _squadCoefficients(q, t_in)
+		_squadEvaluate(q, t_in, A, B, idx, t_out, out)
+	elif method == "slerp":
+		_slerpEvaluate(q, idx, tau, out)
+	else:
+		raise ValueError("Unknown interpolation method \"{}\" (\"squad\" or \"slerp\")".format(method))
+
+	return out
+
+def getClock(t_start, t_end, samplingRate):
+	"""
+	Timestamps (msec) of samples at samplingRate (Hz) between t_start and t_end
+	"""
+	return np.linspace(t_start, t_end, int((t_end-t_start)/1e3 * samplingRate), endpoint=True)
+
+def resampleRaw(raw_data, validity, t_out, method="cubic"):
+	"""
+	Resample raw gaze data at timestamps t_out (see preprocess.interpolate_raw for the expected data layout).
+	method: "cubic" (cubic spline and SQUAD) or "linear" (linear interpolation and SLERP)
+	"""
+	ET  = slice(5, 8, None)
+	HMD = slice(1, 5, None)
+
+	# Drop repeated samples
+	repeatET = np.all(raw_data[1:, ET] != raw_data[:-1, ET], axis=1)
+	repeatET = np.append(repeatET, True)
+
+	nET = np.where(np.logical_and(validity, repeatET))[0]
+	nHMD = np.where(np.logical_and(
+						validity,
+						np.append(
+							np.all(raw_data[1:, HMD] != raw_data[:-1, HMD], axis=1),
+							True)
+						)
+					)[0]-1
+	# First sample can't be shifted back
+	nHMD = nHMD[nHMD >= 0]
+
+	new_data = np.zeros([t_out.shape[0], raw_data.shape[1]])
+	new_data[:, 0] = t_out
+
+	# Interpolate gaze unit direction
+	new_data[:, ET] = interpolateVectors(raw_data[nET, 0], raw_data[nET, ET], t_out, method=method)
+	# Interpolate camera rotation (quaternion)
+	new_data[:, HMD] = interpolateQuaternions(raw_data[nHMD, 0], raw_data[nHMD, HMD], t_out,
+		method="squad" if method == "cubic" else "slerp")
+
+	new_data[:, ET] /= np.linalg.norm(new_data[:, ET], axis=1)[:, None]
+
+	return new_data
+
+def resampleRecordings(recordings, validities, samplingRate=120, method="cubic", t_out=None):
+	"""
+	Resample several raw gaze recordings on a shared clock in one call.
+	Timestamps are expected to be in the same time base (msec). By default the clock spans the time interval covered by all recordings at samplingRate Hz.
+	Returns the clock and a list of resampled recordings (one row per clock sample).
+	"""
+	if t_out is None:
+		t_start = max(raw_data[0, 0] for raw_data in recordings)
+		t_end = min(raw_data[-1, 0] for raw_data in recordings)
+		t_out = getClock(t_start, t_end, samplingRate)
+
+	return t_out, [resampleRaw(raw_data, validity, t_out, method=method)
+		for raw_data, validity in zip(recordings, validities)]
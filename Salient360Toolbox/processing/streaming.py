@@ -0,0 +1,378 @@
+#! /usr/bin/env python3
+# ---------------------------------
+# Author: Erwan DAVID
+# Year: 2020
+# Lab: SGL, Goethe University, Frankfurt
+# Comment: Out-of-core processing of raw gaze recordings
+# ---------------------------------
+
+"""
+Process a raw gaze recording window by window, keeping memory bounded regardless of the recording's length.
+Each stage of the pipeline (preprocessing, velocity, outlier removal, filtering, I-VT labelling, feature extraction) keeps only the samples it still needs:
+	- velocity: one sample of look-ahead,
+	- filtering: a margin the size of the filter's support on both sides of the samples it outputs,
+	- labelling: one sample of look-ahead,
+	- feature extraction: samples of the fixation being built and of the saccade preceding it.
+Fixations are emitted as soon as they are complete, with the same features as processing.extract.getGazeFeatures.
+
+Recording-wide values (timestamp unit, Euler angle unit, velocity outlier statistics) are computed in preliminary passes over the data, the source must therefore be re-iterable (numpy array or utils.readRawFile.RawDataReader).
+"""
+
+import numpy as np
+
+from ..utils.misc import *
+from ..utils.distances import dist_angle_arrays_unsigned
+from . import preprocess
+from .extract import FeatureExtractor
+from .identify.commons import fix_gen
+
+def iterBlocks(raw_data, blocksize=2**16):
+	"""
+	Iterate over blocks of rows of a raw data array or block iterable. Blocks are copies, the source is never modified.
+	"""
+	if isinstance(raw_data, np.ndarray):
+		for iStart in range(0, raw_data.shape[0], blocksize):
+			yield np.array(raw_data[iStart: iStart+blocksize], dtype=float)
+	else:
+		for block in raw_data:
+			yield np.array(block, dtype=float)
+
+def scanRecording(raw_data, data_range, Euler2Quat=False, blocksize=2**16):
+	"""
+	First pass over the data: number of samples, selected range, first timestamp, timestamp unit and Euler angle unit.
+	"""
+	nrows = 0
+	degrees = False
+	for block in iterBlocks(raw_data, blocksize):
+		nrows += block.shape[0]
+		if Euler2Quat and not degrees:
+			degrees = preprocess.isEulerInDegrees(block[:, 1:5])
+
+	data_range = list(data_range)
+	if data_range[0] < 0 or data_range[0] > (nrows-1):
+		data_range[0] = 0
+	if data_range[1] < 0 or data_range[1] > nrows:
+		data_range[1] = nrows
+	data_range = [int(data_range[0]), int(data_range[1])]
+
+	t0 = None
+	last = np.empty(0)
+	sumDiff = 0.
+	countDiff = 0
+	for block in iterRange(raw_data, data_range, blocksize):
+		if t0 is None: t0 = block[0, 0]
+		ts = np.append(last, block[:, 0] - t0)
+		diff = ts[1:] - ts[:-1]
+		valid = ~np.isnan(diff)
+		sumDiff += diff[valid].sum()
+		countDiff += valid.sum()
+		last = ts[-1:]
+
+	rem = preprocess.getTimestampScale(sumDiff / countDiff if countDiff > 0 else np.nan)
+
+	return {"nrows": nrows, "data_range": data_range, "degrees": degrees, "t0": t0, "rem": rem}
+
+def iterRange(raw_data, data_range, blocksize=2**16):
+	"""
+	Iterate over blocks of rows within data_range = [start, end)
+	"""
+	iRow = 0
+	for block in iterBlocks(raw_data, blocksize):
+		iStart = max(data_range[0] - iRow, 0)
+		iEnd = min(data_range[1] - iRow, block.shape[0])
+		iRow += block.shape[0]
+		if iEnd > iStart:
+			yield block[iStart: iEnd]
+		if iRow >= data_range[1]:
+			break
+
+def iterGazeBlocks(raw_data, scan, eye=None, Euler2Quat=False, blocksize=2**16):
+	"""
+	Second pass: preprocess blocks of raw data into gaze matrices (see preprocess.prepareGaze)
+	"""
+	nvalid = 0
+	for block in iterRange(raw_data, scan["data_range"], blocksize):
+		if Euler2Quat:
+			preprocess.convertEulerToQuat(block[:, 1:5], degrees=scan["degrees"])
+
+		if eye == "B":
+			preprocess.averageEyes(block)
+
+		block[:, 0] = block[:, 0] - scan["t0"]
+		if scan["rem"] != 0:
+			block[:, 0] /= 10**scan["rem"]
+
+		block = block[preprocess.getValidity(block, eye=eye)]
+		if block.shape[0] == 0: continue
+
+		head, gaze = preprocess.getDataOnSphere(block, Euler2Quat=Euler2Quat)
+		gaze = preprocess.prepareGaze(block, head, gaze)
+		# Sample index in the whole recording
+		gaze[:, 10] += nvalid
+		nvalid += gaze.shape[0]
+
+		yield gaze
+
+def iterVelocity(gazeBlocks):
+	"""
+	Yield (gaze, velocity) blocks. Same as identify.commons.getVelocity, with one sample of look-ahead.
+	"""
+	carry = None
+	firstVelocity = None
+	for gaze in gazeBlocks:
+		if carry is not None:
+			gaze = np.concatenate([carry, gaze])
+		if gaze.shape[0] < 2:
+			carry = gaze
+			continue
+
+		# Same memory layout as getVelocity's input (einsum results depend on it)
+		gp = gaze[:, [0,1,2, 9]]
+		diffT = gp[1:, 3] - gp[:-1, 3]
+		distance = dist_angle_arrays_unsigned(gp[1:, :3], gp[:-1, :3])
+		velocity = distance/diffT
+
+		if firstVelocity is None: firstVelocity = velocity[0]
+
+		carry = gaze[-1:]
+		yield gaze[:-1], velocity
+
+	if carry is not None:
+		# Last sample takes the first velocity value
+		yield carry, np.array([firstVelocity if firstVelocity is not None else np.nan])
+
+def velocityStats(velocityBlocks):
+	"""
+	Mean and standard deviation of a velocity signal, ignoring nans (combined block by block)
+	"""
+	n = 0
+	mean = 0.
+	M2 = 0.
+	for _, velocity in velocityBlocks:
+		velocity = velocity[~np.isnan(velocity)]
+		if velocity.shape[0] == 0: continue
+		nB = velocity.shape[0]
+		meanB = velocity.mean()
+		M2B = ((velocity - meanB)**2).sum()
+
+		delta = meanB - mean
+		N = n + nB
+		mean = mean + delta * nB / N
+		M2 = M2 + M2B + delta**2 * n * nB / N
+		n = N
+
+	if n == 0: return np.nan, np.nan
+	return mean, np.sqrt(M2 / n)
+
+class FilterStage():
+	"""
+	Filter a velocity signal block by block. Output samples are identical to filtering the whole signal because they are only computed once `margin` samples are available on both sides.
+	"""
+	def __init__(self, filter):
+		self.filter = filter
+		self.name = filter["name"][0].lower()
+		if self.name == "g":
+			# Support of scipy's gaussian_filter1d (truncate=4)
+			self.margin = int(4. * float(filter["params"]["sigma"]) + .5)
+		elif self.name == "s":
+			self.margin = int(filter["params"]["win"])//2
+		else:
+			self.margin = 0
+
+		self.gaze = None
+		self.velocity = None
+		# Number of samples at the start of the buffers already output
+		self.done = 0
+		self.first = True
+
+	def apply(self, velocity, first=True, last=True):
+		"""
+		Filter buffered samples. `first`/`last`: does the buffer start/end with the first/last sample of the signal?
+		"""
+		if self.name == "g":
+			from scipy.ndimage import gaussian_filter1d
+			return gaussian_filter1d(velocity, self.filter["params"]["sigma"])
+		elif self.name == "s":
+			from scipy.signal import savgol_filter
+			win, poly = int(self.filter["params"]["win"]), int(self.filter["params"]["poly"])
+			# Same as savgol_filter's default "interp" mode, which fits a polynomial to the first and last `win` samples
+			filtered = savgol_filter(velocity, win, poly, mode="constant")
+			if first:
+				filtered[:self.margin] = savgol_filter(velocity[:win], win, poly)[:self.margin]
+			if last:
+				filtered[-self.margin:] = savgol_filter(velocity[-win:], win, poly)[-self.margin:]
+			return filtered
+		return velocity
+
+	def push(self, gaze, velocity, last=False):
+		if self.margin == 0:
+			return gaze, self.apply(velocity)
+
+		if self.gaze is None:
+			self.gaze, self.velocity = gaze, velocity
+		else:
+			self.gaze = np.concatenate([self.gaze, gaze])
+			self.velocity = np.concatenate([self.velocity, velocity])
+
+		end = self.velocity.shape[0] if last else self.velocity.shape[0] - self.margin
+		# Savitzky-Golay filters need at least a full window of samples
+		if end <= self.done or (not last and self.velocity.shape[0] < 2*self.margin+1):
+			return gaze[:0], velocity[:0]
+
+		filtered = self.apply(self.velocity, first=self.first, last=last)
+		self.first = False
+		out = self.gaze[self.done: end], filtered[self.done: end]
+
+		# Keep enough left context to compute the next samples
+		keep = max(0, end - 2*self.margin)
+		self.gaze = self.gaze[keep:]
+		self.velocity = self.velocity[keep:]
+		self.done = end - keep
+
+		return out
+
+class LabelStage():
+	"""
+	I-VT labelling followed by identify.commons.fix_gen, with one sample of look-ahead.
+	"""
+	def __init__(self, threshold):
+		self.threshold = np.deg2rad(threshold)/1000 # Eye threshold rad/ms
+		self.pending = None
+		self.first = True
+
+	def push(self, gaze, velocity, last=False):
+		markers = np.array(velocity <= self.threshold, dtype=bool)
+
+		lm = None
+		if self.pending is not None:
+			pGaze, pVelocity, pMarkers, lm = self.pending
+			gaze = np.concatenate([pGaze, gaze])
+			velocity = np.concatenate([pVelocity, velocity])
+			markers = np.concatenate([pMarkers, markers])
+			self.pending = None
+
+		if not last and markers.shape[0] < (3 if self.first else 2):
+			# Not enough samples to finalise any label yet
+			self.pending = (gaze, velocity, markers, lm)
+			return gaze[:0], velocity[:0], markers[:0]
+
+		if markers.shape[0] == 0 or (self.first and markers.shape[0] < 2):
+			return gaze, velocity, markers
+
+		if self.first:
+			fix_gen(markers, edges=last)
+			# Edge rule of fix_gen
+			markers[0] = markers[1]
+			self.first = False
+		else:
+			# Prepend the last final label to carry fix_gen's state
+			tmp = np.concatenate([[lm], markers])
+			fix_gen(tmp, edges=False)
+			if last:
+				tmp[-1] = tmp[-2]
+			markers = tmp[1:]
+
+		if last:
+			return gaze, velocity, markers
+
+		# Last label is only final once the next sample is known (its original value is kept)
+		self.pending = (gaze[-1:], velocity[-1:], np.array(velocity[-1:] <= self.threshold, dtype=bool), markers[-2])
+		return gaze[:-1], velocity[:-1], markers[:-1]
+
+class FeatureStage(FeatureExtractor):
+	"""
+	Removes fixations shorter than minFixationTime (see identify.I_VT.parse) and computes fixation/saccade features (see extract.FeatureExtractor)
+	"""
+	def __init__(self, minFixationTime=80):
+		super().__init__(minFixationTime)
+
+def iterFixations(raw_data,
+	# Head trajectory parameter
+	tempWindowSize=100,
+	# Gaze or Head tracking
+	tracking="HE",
+	# If gaze tracking, which eye to extract
+	eye=None,
+	# Resampling at a different sample rate?
+	resample=None,
+	# Filtering algo and parameters if any is selected
+	filter=None,
+	# Fixation identifier algo and its parameters
+	parser=None,
+	# Are rotation data expressed as Euler angle (would require converting)
+	Euler2Quat=False,
+	# Only process data in this range
+	data_range=None,
+	# Progress bar callback
+	callback=lambda *a: None,
+	# Remove velocity outlier samples (see identify.commons.getVelocity)
+	remove_outliers=False,
+	# Number of raw data rows processed at once
+	blocksize=2**16,
+	**kwargs):
+	"""
+	Generator yielding blocks of fixations (arrays of shape [n, 29], see extract.getGazeFeatures) as they are identified.
+	Supports head+eye tracking data with the I-VT algorithm, without resampling.
+	"""
+	if data_range is None:
+		data_range = [0, np.inf]
+	if filter is None:
+		filter = {"name": "None"}
+	if parser is None:
+		parser = {"name": "I-VT", "params": {"threshold": 120}}
+
+	if tracking != "HE" or parser["name"] != "I-VT" or (type(resample) in [int, float] and resample > 0):
+		printError("Streaming mode only supports head+eye data (tracking=\"HE\") parsed with I-VT, without resampling.", header="iterFixations")
+		return
+
+	if not isinstance(raw_data, np.ndarray) and iter(raw_data) is raw_data:
+		printError("Streaming mode requires a numpy array or a re-iterable source of row blocks (e.g., utils.readRawFile.RawDataReader), not a one-time iterator.", header="iterFixations")
+		return
+
+	callback(0, "Scanning recording.")
+	scan = scanRecording(raw_data, data_range, Euler2Quat=Euler2Quat, blocksize=blocksize)
+	if scan["t0"] is None:
+		return
+	if scan["rem"] != 0:
+		printWarning("Timestamps were divided by 1e{} to be in milliseconds".format(scan["rem"]), header="preprocess", verbose=0)
+
+	gazeBlocks = lambda: iterGazeBlocks(raw_data, scan, eye=eye, Euler2Quat=Euler2Quat, blocksize=blocksize)
+
+	if remove_outliers:
+		callback(0, "Computing velocity statistics.")
+		outlierSigma = kwargs.get("outlierSigma", 5)
+		meanV, stdV = velocityStats(iterVelocity(gazeBlocks()))
+
+	params = parser.get("params", {})
+	filterStage = FilterStage(filter)
+	labelStage = LabelStage(params.get("threshold", 100))
+	featureStage = FeatureStage(params.get("minFixationTime", 80))
+
+	nRange = scan["data_range"][1] - scan["data_range"][0]
+	removed = 0
+	blocks = iterVelocity(gazeBlocks())
+	block = next(blocks, None)
+	while block is not None:
+		nextBlock = next(blocks, None)
+		last = nextBlock is None
+
+		gaze, velocity = block
+		if remove_outliers:
+			keep = np.abs( (velocity-meanV)/stdV ) < outlierSigma
+			removed += (keep==0).sum()
+			keep &= np.logical_not(np.isnan(velocity) | np.isinf(velocity))
+			gaze, velocity = gaze[keep], velocity[keep]
+
+		gaze, velocity = filterStage.push(gaze, velocity, last=last)
+		gaze, velocity, markers = labelStage.push(gaze, velocity, last=last)
+		fixations = featureStage.push(gaze, velocity, markers, last=last)
+
+		if fixations.shape[0] > 0:
+			yield fixations
+
+		callback(min(1, gaze[-1, 10] / nRange) if gaze.shape[0] > 0 else 0, "Identifying fixations.")
+		block = nextBlock
+
+	if remove_outliers:
+		printNeutral("Removed {} samples more than {} sigmas away from the mean".format(removed, outlierSigma),
+			bold=False, verbose=2)
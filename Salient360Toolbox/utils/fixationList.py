@@ -0,0 +1,152 @@
+#! /usr/bin/env python3
+# ---------------------------------
+# Author: Erwan DAVID
+# Year: 2020
+# Lab: SGL, Goethe University, Frankfurt
+# Comment: Typed columnar container of fixation lists
+# ---------------------------------
+
+import numpy as np
+
+# Field groups: dtype and columns of the fixation list matrix (see processing.extract.getGazeFeatures or generation.scanpath.toFile)
+GROUPS = {
+	# Unit vector and normalised long/lat, in the order expected by generation.saliency
+	"gaze": (np.float64, [2,3,4, 0,1]),
+	"eye": (np.float64, [5,6]),
+	"head": (np.float64, [7,8]),
+	# Fixation index, first and last sample indices
+	"index": (np.int32, [9,10,11]),
+	# Start and end timestamps, duration (msec)
+	"time": (np.float64, [12,13,14]),
+	# Dispersion, peak velocities/accelerations and saccade amplitudes/angles (rad)
+	"angle": (np.float32, list(range(15, 29))),
+}
+
+# Field name: group, column(s) in group
+FIELDS = {
+	"x": ("gaze", 0), "y": ("gaze", 1), "z": ("gaze", 2),
+	"vec": ("gaze", slice(0, 3)),
+	"lon": ("gaze", 3), "lat": ("gaze", 4),
+	"lonlat": ("gaze", slice(3, 5)),
+
+	"eyeLon": ("eye", 0), "eyeLat": ("eye", 1), "eyeLonlat": ("eye", slice(0, 2)),
+	"headLon": ("head", 0), "headLat": ("head", 1), "headLonlat": ("head", slice(0, 2)),
+
+	"idx": ("index", 0), "startIdx": ("index", 1), "endIdx": ("index", 2),
+
+	"start": ("time", 0), "end": ("time", 1), "duration": ("time", 2),
+
+	"dispersion": ("angle", 0),
+	"fixPeakVel": ("angle", 1), "fixPeakAcc": ("angle", 2),
+	"saccPeakVel": ("angle", 3), "saccPeakAcc": ("angle", 4),
+	# Gaze, Eye, Head
+	"saccAmp": ("angle", slice(5, 8)),
+	"saccAngle": ("angle", slice(8, 11)),
+	"saccRelAngle": ("angle", slice(11, 14)),
+}
+
+class FixationList():
+	"""
+	Fixation list stored as contiguous arrays of typed fields (see GROUPS), plus the participant each fixation belongs to.
+	Fields are returned as views (no copy):
+		fixations["lonlat"], fixations["duration"], fixations.sphere # x,y,z,lon,lat
+	Indexing with a slice returns a FixationList of views, other indices (masks, index arrays) a copy.
+	Converts from and to the 29-column matrix of processing.extract.getGazeFeatures (fromArray, toArray). Missing indices (nan) are stored as -1.
+	"""
+	def __init__(self, groups=None, participant=None):
+		if groups is None:
+			groups = {name: np.empty([0, len(columns)], dtype=dtype) for name, (dtype, columns) in GROUPS.items()}
+		self.groups = groups
+
+		n = self.groups["gaze"].shape[0]
+		if participant is None:
+			participant = np.zeros(n, dtype=np.int32)
+		elif np.isscalar(participant):
+			participant = np.full(n, participant, dtype=np.int32)
+		self.participant = participant
+
+	@classmethod
+	def fromArray(cls, fix_list, participant=0):
+		"""
+		Fixation list matrix (N, 29) to FixationList
+		"""
+		fix_list = np.asarray(fix_list)
+		if len(fix_list.shape) == 1: fix_list = fix_list[None, :]
+
+		groups = {}
+		for name, (dtype, columns) in GROUPS.items():
+			values = fix_list[:, columns]
+			if np.issubdtype(dtype, np.integer):
+				values = np.where(np.isnan(values), -1, values)
+			groups[name] = np.ascontiguousarray(values, dtype=dtype)
+
+		return cls(groups, participant)
+
+	def toArray(self):
+		"""
+		FixationList to fixation list matrix (N, 29)
+		"""
+		fix_list = np.empty([len(self), 29])
+		for name, (dtype, columns) in GROUPS.items():
+			fix_list[:, columns] = self.groups[name]
+			if np.issubdtype(dtype, np.integer):
+				fix_list[:, columns] = np.where(self.groups[name] < 0, np.nan, fix_list[:, columns])
+		return fix_list
+
+	@classmethod
+	def concatenate(cls, fixationLists):
+		"""
+		Stack fixation lists (e.g., of several participants)
+		"""
+		groups = {name: np.concatenate([fixations.groups[name] for fixations in fixationLists])
+			for name in GROUPS}
+		participant = np.concatenate([fixations.participant for fixations in fixationLists])
+		return cls(groups, participant)
+
+	def __len__(self):
+		return self.groups["gaze"].shape[0]
+
+	@property
+	def nbytes(self):
+		return sum(values.nbytes for values in self.groups.values()) + self.participant.nbytes
+
+	@property
+	def sphere(self):
+		# x, y, z, longitude, latitude (see generation.saliency.getSaliency)
+		return self.groups["gaze"]
+
+	def __getitem__(self, key):
+		if isinstance(key, str):
+			group, column = FIELDS[key]
+			return self.groups[group][:, column]
+
+		return FixationList({name: values[key] for name, values in self.groups.items()},
+			self.participant[key])
+
+	def getParticipant(self, participant):
+		"""
+		Fixations of one participant (view if they are contiguous)
+		"""
+		idx = np.where(self.participant == participant)[0]
+		if idx.shape[0] > 0 and idx[-1]-idx[0]+1 == idx.shape[0]:
+			return self[idx[0]: idx[-1]+1]
+		return self[idx]
+
+	def between(self, start, end):
+		"""
+		Fixations starting within [start, end) msec (view if start timestamps are sorted)
+		"""
+		ts = self["start"]
+		if np.all(ts[1:] >= ts[:-1]):
+			return self[np.searchsorted(ts, start, side="left"): np.searchsorted(ts, end, side="left")]
+		return self[(ts >= start) & (ts < end)]
+
+	def scanpath(self):
+		"""
+		Scanpath matrix used by comparison.scanpathCompare: fixation index, longitude (rad), latitude (rad), start timestamp
+		"""
+		scanpath = np.empty([len(self), 4])
+		scanpath[:, 0] = self["idx"]
+		scanpath[:, 1:3] = self["lonlat"] * [np.pi*2, np.pi]
+		scanpath[:, 3] = self["start"]
+		return scanpath
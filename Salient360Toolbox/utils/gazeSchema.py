@@ -0,0 +1,148 @@
+#! /usr/bin/env python3
+# ---------------------------------
+# Author: Erwan DAVID
+# Year: 2020
+# Lab: SGL, Goethe University, Frankfurt
+# Comment: Single-pass probe of gaze data file headers
+# ---------------------------------
+
+import os, re
+from functools import lru_cache
+
+# Column name aliases (lower case, letters only) of raw gaze data features
+RAW_ALIASES = {
+	"ts": ["oculots", "oculotimestamp", "ocutimestamp", "etts", "timestamp", "ts"],
+
+	"xRayL": ["leftgazex", "leftgazedirx", "lgazex", "xlgaze", "lefteyedirectionx", "leftgazedirectionx"],
+	"yRayL": ["leftgazey", "leftgazediry", "lgazey", "ylgaze", "lefteyedirectiony", "leftgazedirectiony"],
+	"zRayL": ["leftgazez", "leftgazedirz", "lgazez", "zlgaze", "lefteyedirectionz", "leftgazedirectionz"],
+
+	"xRayR": ["rightgazex", "rightgazedirx", "rgazex", "xrgaze", "righteyedirectionx", "rightgazedirectionx"],
+	"yRayR": ["rightgazey", "rightgazediry", "rgazey", "yrgaze", "righteyedirectiony", "rightgazedirectiony"],
+	"zRayR": ["rightgazez", "rightgazedirz", "rgazez", "zrgaze", "righteyedirectionz", "rightgazedirectionz"],
+
+	"xRayB": ["bingazex", "bingazedirx", "meangazedirx", "lgazex", "xlgaze", "meangazedirectionx", "meangazedirectionx"],
+	"yRayB": ["bingazey", "bingazediry", "meangazediry", "lgazey", "ylgaze", "meangazedirectiony", "meangazedirectiony"],
+	"zRayB": ["bingazez", "bingazedirz", "meangazedirz", "lgazez", "zlgaze", "meangazedirectionz", "meangazedirectionz"],
+
+	"xCam": ["xcam", "camx", "headx", "xhead", "camerarotationx", "cameraquaternionx"],
+	"yCam": ["ycam", "camy", "heady", "yhead", "camerarotationy", "cameraquaterniony"],
+	"zCam": ["zcam", "camz", "headz", "zhead", "camerarotationz", "cameraquaternionz"],
+	"wCam": ["wcam", "camw", "headw", "whead", "camerarotationw", "cameraquaternionw"],
+
+	"piCam": ["pitch", "campitch", "pitchcam", "pitchead", "headpitch"],
+	"yaCam": ["yaw", "camyaw", "yawcam", "yawhead", "headyaw"],
+	"roCam": ["roll", "camroll", "rollcam", "rollhead", "headroll"],
+
+	"valR": ["valr", "rval"],
+	"valL": ["vall", "lval"],
+}
+
+# Column name aliases of fixation list features
+FIXLIST_ALIASES = {
+	"lon": ["lon", "longitude", "longaze", "longgaze"],
+	"lat": ["lat", "latitude", "latgaze"],
+
+	"x": ["x", "xsph", "xgaze"],
+	"y": ["y", "ysph", "ygaze"],
+	"z": ["z", "zsph", "zgaze"],
+
+	"ts": ["time", "starttimestamp", "timestamp", "timestart"],
+	"dur": ["dur", "duration"],
+	"idx": ["idx", "index", "i"],
+}
+
+def _compileAliases():
+	# alias -> list of (table, feature) it identifies
+	table = {}
+	for kind, aliases in [("raw", RAW_ALIASES), ("fixlist", FIXLIST_ALIASES)]:
+		for feature, names in aliases.items():
+			for name in names:
+				targets = table.setdefault(name, [])
+				if (kind, feature) not in targets:
+					targets.append((kind, feature))
+	return table
+
+ALIAS_TABLE = _compileAliases()
+
+def cleanHeader(header, delimiter=","):
+	"""
+	Lower case column names stripped of any character that is not a letter
+	"""
+	header = re.sub("[^a-zA-Z{}]".format(delimiter), "", header.lower())
+	return [name.strip() for name in header.split(delimiter)]
+
+class GazeSchema():
+	"""
+	Column layout of a gaze data file, resolved once from its header.
+	`raw` and `fixlist` map feature names to column indices (None when missing); a feature is assigned to the first column matching one of its aliases.
+	"""
+	def __init__(self, header, path=None, delimiter=","):
+		self.path = path
+		self.delimiter = delimiter
+		self.header = [name.strip() for name in header.strip().split(delimiter)]
+		self.cleanHeader = cleanHeader(header.strip(), delimiter)
+
+		self.raw = {feature: None for feature in RAW_ALIASES}
+		self.fixlist = {feature: None for feature in FIXLIST_ALIASES}
+
+		tables = {"raw": self.raw, "fixlist": self.fixlist}
+		for icol, name in enumerate(self.cleanHeader):
+			for kind, feature in ALIAS_TABLE.get(name, []):
+				if tables[kind][feature] is None:
+					tables[kind][feature] = icol
+
+		self.rawValid = self._rawValidity()
+		self.fixlistValid = self._fixlistValidity()
+
+	def _rawValidity(self):
+		has = lambda *features: all(self.raw[feature] is not None for feature in features)
+
+		# Do we have gaze-dir-relative-to-head data?
+		dirDataR = has("xRayR", "yRayR", "zRayR")
+		dirDataL = has("xRayL", "yRayL", "zRayL")
+		dirDataB = has("xRayB", "yRayB", "zRayB")
+
+		return {"eye": {"L": dirDataL,
+						"R": dirDataR,
+						"B": (dirDataL and dirDataR) or dirDataB,
+						},
+				# Head rotations as quaternions (Q) or as Euler angles (E)
+				"head": {"Q": has("xCam", "yCam", "zCam", "wCam"),
+						 "E": has("piCam", "yaCam", "roCam")
+						}
+				}
+
+	def _fixlistValidity(self):
+		# Do we have long/lat data?
+		valid = not (self.fixlist["lon"] is None and self.fixlist["lat"] is None)
+		# Do we have a 3D direction vector?
+		valid |= not (self.fixlist["x"] is None and self.fixlist["y"] is None and self.fixlist["z"] is None)
+		return valid
+
+	@property
+	def gazeType(self):
+		"""
+		"raw", "fixlist" or None if the file can't be identified
+		"""
+		if any(self.rawValid["eye"].values()) and any(self.rawValid["head"].values()):
+			return "raw"
+		if self.fixlistValid:
+			return "fixlist"
+		return None
+
+@lru_cache(maxsize=4096)
+def _probeSchema(path, size, mtime, delimiter):
+	with open(path, "r") as file:
+		header = file.readline()
+	return GazeSchema(header, path=path, delimiter=delimiter)
+
+def probeSchema(path, delimiter=","):
+	"""
+	Return the GazeSchema of a file. Results are memoized per path and invalidated when the file's size or modification time change.
+	"""
+	if isinstance(path, GazeSchema):
+		return path
+	path = os.path.abspath(path)
+	stat = os.stat(path)
+	return _probeSchema(path, stat.st_size, stat.st_mtime_ns, delimiter)
@@ -56,18 +56,10 @@ def inferGazeType(path):
 	"""
 	Read first line in file (header) and try to infer data type from column names
 	"""
-	import numpy as np
-	from ..helper import FindRawFeaturesByHeader, FindFixlistFeaturesByHeader
-
-	rawTags, rawValids = FindRawFeaturesByHeader(path, returnValid=True)
-	if sum(rawValids["eye"].values()) > 0 and sum(rawValids["head"].values()) > 0:
-		return "raw"
-
-	fixTags, fixvalid = FindFixlistFeaturesByHeader(path, returnValid=True)
-	if fixvalid:
-		return "fixlist"
+	from .gazeSchema import probeSchema
 
-	return None
+	# The header is parsed once and memoized: loaders called afterwards on the same file reuse it
+	return probeSchema(path).gazeType
 
 def getTerminalWidth():
 	"""
@@ -0,0 +1,256 @@
+#! /usr/bin/env python3
+# ---------------------------------
+# Author: Erwan DAVID
+# Year: 2020
+# Lab: SGL, Goethe University, Frankfurt
+# Comment: On-disk binary cache of parsed raw gaze recordings
+# ---------------------------------
+
+"""
+Parsed columns of a raw gaze file are saved as a column-major (Fortran ordered) float64 .npy file in a hidden folder next to the recording:
+	data/raw_gaze/rawDataStatic1.csv
+	data/raw_gaze/.s360cache/rawDataStatic1_<key>.npy
+	data/raw_gaze/.s360cache/index.json
+
+An entry is keyed by the recording's size, mtime and content hash, the list of columns loaded and the eye selection.
+Cache hits are returned as copy-on-write memory maps: no data is read from disk until it is accessed, and in-place operations performed by the processing pipeline never reach the cached file.
+Entries are evicted least recently used first when the folder grows larger than its disk budget.
+The index is read, modified and written under an exclusive lock on index.lock (where fcntl is available), so that concurrent runs sharing a folder do not drop each other's entries.
+Entry files missing from the index (e.g., written by a run without locking) are added back to it when evicting, so they count against the budget.
+"""
+
+import numpy as np
+import os, json, time, hashlib
+from contextlib import contextmanager
+
+from .misc import printNeutral, printWarning
+
+CACHE_DIRNAME = ".s360cache"
+# Bump to invalidate caches written by an older parser
+CACHE_VERSION = 1
+# Max disk space used by a cache folder (bytes)
+DEFAULT_BUDGET = 4 * 2**30
+
+def getCacheDir(path):
+	"""
+	Return the cache folder associated to a recording
+	"""
+	return os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIRNAME)
+
+def hashFile(path, blocksize=2**20):
+	"""
+	Return the blake2b digest of a file's content
+	"""
+	digest = hashlib.blake2b(digest_size=16)
+	with open(path, "rb") as f:
+		block = f.read(blocksize)
+		while block:
+			digest.update(block)
+			block = f.read(blocksize)
+	return digest.hexdigest()
+
+class RawCache():
+	"""
+	Cache of parsed raw gaze recordings located in one folder.
+	"""
+	def __init__(self, cache_dir, budget=DEFAULT_BUDGET):
+		self.cache_dir = cache_dir
+		self.budget = budget
+		self.path_index = os.path.join(cache_dir, "index.json")
+		self.path_lock = os.path.join(cache_dir, "index.lock")
+
+	@contextmanager
+	def _lock(self):
+		"""
+		Exclusive lock on the index across processes, no-op where fcntl is not available
+		"""
+		try:
+			import fcntl
+		except ImportError:
+			yield
+			return
+
+		try:
+			os.makedirs(self.cache_dir, exist_ok=True)
+			f = open(self.path_lock, "a")
+		except OSError as err:
+			printWarning("Could not lock cache index [\"{}\"]: {}".format(self.path_lock, err), header="RawCache", verbose=1)
+			yield
+			return
+
+		with f:
+			fcntl.flock(f, fcntl.LOCK_EX)
+			try:
+				yield
+			finally:
+				fcntl.flock(f, fcntl.LOCK_UN)
+
+	def _readIndex(self):
+		try:
+			with open(self.path_index, "r") as f:
+				index = json.load(f)
+			if index.get("version") == CACHE_VERSION:
+				return index
+		except (OSError, ValueError):
+			pass
+		return {"version": CACHE_VERSION, "files": {}, "entries": {}}
+
+	def _writeIndex(self, index):
+		# Write then rename so that concurrent readers never see a partial index
+		tmp_path = "{}.{}.tmp".format(self.path_index, os.getpid())
+		try:
+			os.makedirs(self.cache_dir, exist_ok=True)
+			with open(tmp_path, "w") as f:
+				json.dump(index, f)
+			os.replace(tmp_path, self.path_index)
+		except OSError as err:
+			printWarning("Could not write cache index [\"{}\"]: {}".format(self.path_index, err), header="RawCache", verbose=1)
+
+	def _signature(self, index, path, verify=False):
+		"""
+		Size, mtime and content hash of a recording. The content hash is only computed again when size or mtime changed (or if `verify` is True).
+		"""
+		stat = os.stat(path)
+		name = os.path.basename(path)
+		known = index["files"].get(name)
+		if not verify and known is not None and\
+			known["size"] == stat.st_size and known["mtime"] == stat.st_mtime_ns:
+			return known
+
+		signature = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": hashFile(path)}
+		index["files"][name] = signature
+		return signature
+
+	def _key(self, path, signature, usecols, eye):
+		key = json.dumps([CACHE_VERSION, os.path.basename(path), signature["size"], signature["mtime"], signature["hash"],
+			[int(icol) for icol in usecols], eye])
+		return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+	def _entryPath(self, path, key):
+		name = os.path.splitext(os.path.basename(path))[0]
+		return os.path.join(self.cache_dir, "{}_{}.npy".format(name, key))
+
+	def load(self, path, usecols, eye, loader, verify=False):
+		"""
+		Return the cached columns of a recording as a copy-on-write memmap.
+		On a cache miss `loader()` is called to parse the file and its output is saved to the cache.
+		"""
+		with self._lock():
+			index = self._readIndex()
+			signature = self._signature(index, path, verify=verify)
+			key = self._key(path, signature, usecols, eye)
+			path_entry = self._entryPath(path, key)
+
+			if key in index["entries"] and os.path.exists(path_entry):
+				try:
+					raw_data = np.load(path_entry, mmap_mode="c")
+				except (OSError, ValueError):
+					raw_data = None
+
+				if raw_data is not None:
+					printNeutral("Loading parsed data from cache [\"{}\"]".format(path_entry), header="RawCache", verbose=2)
+					index["entries"][key]["atime"] = time.time()
+					self._writeIndex(index)
+					return raw_data
+
+		# Parsing and writing the entry do not hold the lock
+		raw_data = loader()
+		self.store(key, path_entry, raw_data, source=os.path.basename(path), signature=signature)
+
+		return raw_data
+
+	def store(self, key, path_entry, raw_data, source=None, signature=None):
+		# The entry is written to a temporary file (not adopted by _adoptOrphans), then moved in place under the lock:
+		# evict() or clear() of another process cannot delete it before it is registered
+		tmp_path = "{}.{}.tmp".format(path_entry, os.getpid())
+		try:
+			os.makedirs(self.cache_dir, exist_ok=True)
+			with open(tmp_path, "wb") as f:
+				# Column-major: each column is contiguous on disk
+				np.save(f, np.asfortranarray(raw_data))
+		except OSError as err:
+			printWarning("Could not write to cache folder [\"{}\"]: {}".format(self.cache_dir, err), header="RawCache", verbose=1)
+			return
+
+		with self._lock():
+			try:
+				os.replace(tmp_path, path_entry)
+				nbytes = os.path.getsize(path_entry)
+			except OSError as err:
+				printWarning("Could not write to cache folder [\"{}\"]: {}".format(self.cache_dir, err), header="RawCache", verbose=1)
+				return
+
+			# Read the index again: other processes may have changed it while parsing
+			index = self._readIndex()
+			if source is not None and signature is not None:
+				index["files"][source] = signature
+
+			# Entries parsed from a previous version of the recording will never be hit again
+			for key_old, entry in list(index["entries"].items()):
+				if key_old != key and source is not None and entry.get("source") == source and entry.get("hash") != signature["hash"]:
+					self._remove(index, key_old)
+
+			index["entries"][key] = {"file": os.path.basename(path_entry),
+									 "source": source,
+									 "hash": None if signature is None else signature["hash"],
+									 "nbytes": nbytes,
+									 "atime": time.time()}
+			self.evict(index)
+			self._writeIndex(index)
+
+	def evict(self, index, budget=None):
+		"""
+		Remove least recently used entries until the cache fits in its budget
+		"""
+		budget = self.budget if budget is None else budget
+		self._adoptOrphans(index)
+		entries = index["entries"]
+
+		total = sum(entry["nbytes"] for entry in entries.values())
+		for key in sorted(entries, key=lambda key: entries[key]["atime"]):
+			if total <= budget:
+				break
+			total -= entries[key]["nbytes"]
+			self._remove(index, key)
+
+	def _adoptOrphans(self, index):
+		# Entry files (<name>_<key>.npy) missing from the index, e.g. written by a run without locking
+		known = set(entry["file"] for entry in index["entries"].values())
+		try:
+			files = os.listdir(self.cache_dir)
+		except OSError:
+			return
+
+		for file in files:
+			if not file.endswith(".npy") or file in known:
+				continue
+			try:
+				stat = os.stat(os.path.join(self.cache_dir, file))
+			except OSError:
+				continue
+			key = os.path.splitext(file)[0].rsplit("_", 1)[-1]
+			index["entries"][key] = {"file": file, "source": None, "hash": None,
+									 "nbytes": stat.st_size, "atime": stat.st_mtime}
+
+	def _remove(self, index, key):
+		try:
+			os.remove(os.path.join(self.cache_dir, index["entries"][key]["file"]))
+		except OSError:
+			pass
+		del index["entries"][key]
+
+	def clear(self):
+		"""
+		Remove all entries
+		"""
+		with self._lock():
+			index = self._readIndex()
+			self.evict(index, budget=0)
+			index["files"] = {}
+			self._writeIndex(index)
+
+def loadCached(path, usecols, eye, loader, budget=DEFAULT_BUDGET, verify=False):
+	"""
+	Return parsed columns of a raw gaze file from its cache folder, parse and cache them with `loader()` on a miss.
+	"""
+	return RawCache(getCacheDir(path), budget=budget).load(path, usecols, eye, loader, verify=verify)
@@ -0,0 +1,310 @@
+#! /usr/bin/env python3
+# ---------------------------------
+# Author: Erwan DAVID
+# Year: 2020
+# Lab: SGL, Goethe University, Frankfurt
+# Comment: Chunked, column-selective reader for raw gaze recordings (csv)
+# ---------------------------------
+
+import numpy as np
+import numba
+
+# Validity columns are reported as text by most recording software
+BOOLEANS = {"true": 1., "false": 0.}
+
+# Words parsed by the compiled path (lower case), other tokens go to the slow path
+_TRUE = np.frombuffer(b"true", dtype=np.uint8)
+_FALSE = np.frombuffer(b"false", dtype=np.uint8)
+_NAN = np.frombuffer(b"nan", dtype=np.uint8)
+_INF = np.frombuffer(b"inf", dtype=np.uint8)
+_INFINITY = np.frombuffer(b"infinity", dtype=np.uint8)
+
+@numba.njit
+def _isWord(buf, start, end, word):
+	# Case-insensitive comparison of the whole token buf[start:end] with word
+	if end - start != word.shape[0]: return False
+	for i in range(word.shape[0]):
+		if (buf[start+i] | 32) != word[i]: return False
+	return True
+
+@numba.njit
+def _parseToken(buf, start, end):
+	"""Parse a decimal number in buf[start:end]
+	Returns (value, success). Only succeeds when the result is guaranteed to be correctly rounded:
+		mantissa of at most 15 digits and a power of ten exactly representable (|exp| <= 22).
+	"""
+	# Trim whitespace (and carriage returns)
+	while start < end and (buf[start] == 32 or buf[start] == 9 or buf[start] == 13):
+		start += 1
+	while end > start and (buf[end-1] == 32 or buf[end-1] == 9 or buf[end-1] == 13):
+		end -= 1
+
+	if start == end:
+		# Empty field
+		return np.nan, True
+
+	c = buf[start]
+	# "True"/"False" validity flags (any case)
+	if c == 84 or c == 116:
+		if _isWord(buf, start, end, _TRUE): return 1., True
+		return np.nan, False
+	if c == 70 or c == 102:
+		if _isWord(buf, start, end, _FALSE): return 0., True
+		return np.nan, False
+
+	neg = False
+	if c == 45 or c == 43: # - or +
+		neg = c == 45
+		start += 1
+		if start == end: return np.nan, False
+		c = buf[start]
+
+	# "nan", "inf", "infinity" (any case)
+	if c == 78 or c == 110:
+		if _isWord(buf, start, end, _NAN): return np.nan, True
+		return np.nan, False
+	if c == 73 or c == 105:
+		if _isWord(buf, start, end, _INF) or _isWord(buf, start, end, _INFINITY):
+			return (-np.inf if neg else np.inf), True
+		return np.nan, False
+
+	mantissa = 0
+	ndigits = 0
+	exp10 = 0
+	seenDigit = False
+	seenDot = False
+	i = start
+	while i < end:
+		c = buf[i]
+		if c >= 48 and c <= 57:
+			seenDigit = True
+			# Leading zeros do not count as significant digits
+			if mantissa != 0 or c != 48:
+				ndigits += 1
+			mantissa = mantissa * 10 + (c - 48)
+			if seenDot: exp10 -= 1
+		elif c == 46 and not seenDot: # .
+			seenDot = True
+		elif (c == 101 or c == 69) and seenDigit: # e/E
+			i += 1
+			expNeg = False
+			if i < end and (buf[i] == 45 or buf[i] == 43):
+				expNeg = buf[i] == 45
+				i += 1
+			if i == end:
+				return np.nan, False
+			e = 0
+			while i < end:
+				c = buf[i]
+				if c < 48 or c > 57 or e > 1000:
+					return np.nan, False
+				e = e * 10 + (c - 48)
+				i += 1
+			exp10 += -e if expNeg else e
+			break
+		else:
+			return np.nan, False
+
+		if ndigits > 15:
+			return np.nan, False
+		i += 1
+
+	if not seenDigit:
+		return np.nan, False
+
+	value = float(mantissa)
+	if exp10 < 0:
+		if exp10 < -22: return np.nan, False
+		value /= 10.**(-exp10)
+	elif exp10 > 0:
+		if exp10 > 22: return np.nan, False
+		value *= 10.**exp10
+
+	return (-value if neg else value), True
+
+@numba.njit
+def _parseLines(buf, colmap, out, delimiter):
+	"""Parse all complete lines contained in buf.
+	colmap[i] is the output column of the i-th file column (-1: column is skipped).
+	Returns the number of lines parsed, a mask of lines that need a slower parse and line offsets in buf.
+	"""
+	ncols = colmap.shape[0]
+	nrows = out.shape[0]
+	slow = np.zeros(nrows, dtype=np.bool_)
+	offsets = np.empty(nrows+1, dtype=np.int64)
+
+	irow = 0
+	pos = 0
+	n = buf.shape[0]
+	while pos < n and irow < nrows:
+		# Skip empty lines
+		if buf[pos] == 10 or buf[pos] == 13:
+			pos += 1
+			continue
+
+		for j in range(out.shape[1]):
+			out[irow, j] = np.nan
+
+		offsets[irow] = pos
+		icol = 0
+		start = pos
+		while True:
+			if pos == n or buf[pos] == delimiter or buf[pos] == 10:
+				if icol < ncols and colmap[icol] >= 0:
+					val, ok = _parseToken(buf, start, pos)
+					out[irow, colmap[icol]] = val
+					if not ok: slow[irow] = True
+				icol += 1
+				if pos == n or buf[pos] == 10:
+					break
+				start = pos + 1
+			pos += 1
+
+		offsets[irow+1] = pos
+		pos += 1
+		irow += 1
+
+	return irow, slow, offsets
+
+def _parseLinesSlow(lines, usecols, delimiter=","):
+	"""Pure Python fallback for lines the compiled parser rejected (long mantissas, large exponents, corrupted fields)
+	"""
+	out = np.empty([len(lines), len(usecols)])
+	for irow, line in enumerate(lines):
+		tokens = line.decode("utf-8", "replace").strip().split(delimiter)
+		for j, icol in enumerate(usecols):
+			tok = tokens[icol].strip() if icol < len(tokens) else ""
+			tok = BOOLEANS.get(tok.lower(), tok)
+			try:
+				out[irow, j] = float(tok) if tok != "" else np.nan
+			except ValueError:
+				out[irow, j] = np.nan
+	return out
+
+class RawDataReader():
+	"""
+	Stream a raw gaze csv file as fixed-size float64 blocks of shape [blocksize, len(usecols)].
+	Only columns listed in `usecols` are converted; "True"/"False" fields are parsed as 1./0.
+	The header is read once when the reader is created and exposed as `header` (original column names).
+
+	Usage:
+		reader = RawDataReader(path, usecols=[0, 12, 9, 10, 11])
+		for block in reader: ...
+		# or
+		raw_data = reader.read()
+	Blocks bound memory only if they are consumed block by block (e.g., helper.getFixationList(..., streaming=True)):
+	the default helper.getFixationList path stacks them in a single array.
+	"""
+	def __init__(self, path, usecols, blocksize=2**16, delimiter=","):
+		self.path = path
+		self.usecols = [int(icol) for icol in usecols]
+		self.blocksize = int(blocksize)
+		self.delimiter = delimiter
+
+		with open(path, "rb") as f:
+			header = f.readline()
+			self.dataOffset = f.tell()
+		self.header = [name.strip() for name in header.decode("utf-8", "replace").strip().split(delimiter)]
+
+		# Columns are converted once even if requested several times
+		self.uniqueCols, self.inverse = np.unique(self.usecols, return_inverse=True)
+		ncols = max(len(self.header), self.uniqueCols.max()+1 if len(self.uniqueCols) > 0 else 0)
+		self.colmap = np.full(ncols, -1, dtype=np.int64)
+		self.colmap[self.uniqueCols] = np.arange(len(self.uniqueCols))
+
+	def __iter__(self):
+		pending = []
+		npending = 0
+		for rows in self._iterParsed():
+			pending.append(rows)
+			npending += rows.shape[0]
+			while npending >= self.blocksize:
+				rows = np.concatenate(pending) if len(pending) > 1 else pending[0]
+				yield rows[:self.blocksize]
+				pending = [rows[self.blocksize:]]
+				npending = pending[0].shape[0]
+		if npending > 0:
+			yield np.concatenate(pending)
+
+	def _iterParsed(self):
+		# Approximate number of bytes covering `blocksize` lines
+		with open(self.path, "rb") as f:
+			f.seek(self.dataOffset)
+			sample = f.read(1<<16)
+		nlines = max(1, sample.count(b"\n"))
+		chunkBytes = max(1<<16, int(len(sample) / nlines * self.blocksize))
+
+		useJIT = not numba.config.DISABLE_JIT
+		delimiter = ord(self.delimiter)
+
+		with open(self.path, "rb") as f:
+			f.seek(self.dataOffset)
+			remainder = b""
+			while True:
+				chunk = f.read(chunkBytes)
+				if not chunk and not remainder:
+					break
+				chunk = remainder + chunk
+				if chunk and len(chunk) > len(remainder) and chunk[-1:] != b"\n":
+					# Keep incomplete last line for next read
+					cut = chunk.rfind(b"\n") + 1
+					if cut == 0:
+						remainder = chunk
+						continue
+					chunk, remainder = chunk[:cut], chunk[cut:]
+				else:
+					remainder = b""
+
+				if useJIT:
+					yield self._parseChunk(chunk, delimiter)
+				else:
+					yield self._parseChunkNoJIT(chunk)
+
+	def _parseChunk(self, chunk, delimiter):
+		buf = np.frombuffer(chunk, dtype=np.uint8)
+		nrows = chunk.count(b"\n") + (chunk[-1:] != b"\n")
+		out = np.empty([nrows, len(self.uniqueCols)])
+		nrows, slow, offsets = _parseLines(buf, self.colmap, out, delimiter)
+		out = out[:nrows]
+
+		islow = np.where(slow[:nrows])[0]
+		if len(islow) > 0:
+			lines = [chunk[offsets[i]: offsets[i+1]] for i in islow]
+			out[islow] = _parseLinesSlow(lines, self.uniqueCols, self.delimiter)
+
+		return out[:, self.inverse]
+
+	def _parseChunkNoJIT(self, chunk):
+		# Numba disabled: rely on numpy's parser
+		from io import BytesIO
+		chunk = chunk.replace(b"True", b"1").replace(b"False", b"0")
+		try:
+			out = np.loadtxt(BytesIO(chunk), delimiter=self.delimiter, usecols=self.uniqueCols, ndmin=2)
+		except ValueError:
+			lines = [line for line in chunk.split(b"\n") if line.strip(b"\r") != b""]
+			out = _parseLinesSlow(lines, self.uniqueCols, self.delimiter)
+		return out[:, self.inverse]
+
+	def read(self):
+		"""Load all blocks in a single array
+		"""
+		return stackBlocks(self)
+
+def stackBlocks(blocks):
+	"""Concatenate an iterable of row blocks in a single array, growing the output geometrically
+	"""
+	out = None
+	nrows = 0
+	for block in blocks:
+		if out is None:
+			out = np.empty([max(block.shape[0], 1024), block.shape[1]], dtype=block.dtype)
+		if nrows + block.shape[0] > out.shape[0]:
+			grown = np.empty([max(2*out.shape[0], nrows + block.shape[0]), out.shape[1]], dtype=out.dtype)
+			grown[:nrows] = out[:nrows]
+			out = grown
+		out[nrows: nrows+block.shape[0]] = block
+		nrows += block.shape[0]
+
+	if out is None:
+		return np.empty([0, 0])
+	return out[:nrows].copy() if nrows < out.shape[0] else out
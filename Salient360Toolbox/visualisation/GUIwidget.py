@@ -114,7 +114,7 @@ class WinContent(QtWidgets.QWidget):
 
 		# Parse fixation parser settings
 		parsers = {k: v for k, v in
-						{"IVT": args.IVT, "IHMM": args.IHMM, "ICT": args.ICT}.items() 
+						{"IVT": args.IVT, "IHMM": args.IHMM, "ICT": args.ICT, "IDT": args.IDT}.items() 
 					if v is not None}
 		if len(parsers) == 1:
 			parserName, params = parsers.popitem()
@@ -284,7 +284,7 @@ class WinContent(QtWidgets.QWidget):
 		options.setSetting("GP.parse", "I-VT",
 			lambda: setRegenBtn("parser"),
 			self.SettingInterface.currParseLab.setText,
-			doc="Fixation parsing algorithm to use. Choices are: \"I-VT\" (velocity), \"I-CT\" (clustering), \"I-HMM\" (Hidden Markov Model), \"I-DT\" (dispersion, not implemented).")
+			doc="Fixation parsing algorithm to use. Choices are: \"I-VT\" (velocity), \"I-CT\" (clustering), \"I-HMM\" (Hidden Markov Model), \"I-DT\" (dispersion).")
 		options.setSetting("GP.IVT.threshold", 120,
 			lambda: setRegenBtn("parser"),
 			doc="Samples below this threshold are identified as parts of fixations.")
@@ -297,6 +297,12 @@ class WinContent(QtWidgets.QWidget):
 		options.setSetting("GP.ICT.minpts", 3,
 			lambda: setRegenBtn("parser"),
 			doc="Minimum points number parameter of DBSCAN.")
+		options.setSetting("GP.IDT.threshold", 2.,
+			lambda: setRegenBtn("parser"),
+			doc="Windows of samples with a dispersion below this threshold (deg) are identified as fixations.")
+		options.setSetting("GP.IDT.minFixationTime", 80,
+			lambda: setRegenBtn("parser"),
+			doc="Minimum duration of fixations (ms) in the dispersion-based parsing algorithm.")
 		# 	Fixation points
 		options.setSetting("FP.size", 5.,
 			lambda: (equi.set_GazePointSize(), equi.update()),
@@ -789,7 +795,7 @@ class SettingInterface(QtWidgets.QWidget):
 			diagLayout.addWidget(closeBtn, 3,0,1,1, QtCore.Qt.AlignRight)
 
 			# 			VT     HMM   CT    DT
-			available = [True, True, True, False]
+			available = [True, True, True, True]
 
 			def updateTabLabels(idx):
 				# Fallback: IVT
@@ -839,7 +845,7 @@ class SettingInterface(QtWidgets.QWidget):
 			layoutT = QtWidgets.QGridLayout()
 
 			try:
-				import pomegranate
+				from ..processing.identify import I_HMM
 				info = QtWidgets.QLabel("<b>HMM identification</b>.<br />A Hidden Markov Model with Gaussian emissions is trained on the gaze velocity signal.")
 				info.setToolTip("<u>HMM</u>-based detection algorithm.\n<b>Note: medium computation times.</b>")
 				IHMM_nstate = QtWidgets.QSpinBox()
@@ -852,7 +858,7 @@ class SettingInterface(QtWidgets.QWidget):
 				layoutT.addWidget(QtWidgets.QLabel("Whatever the chosen number of hidden states (min: 2), fixations are decided\nas belonging to the hidden state showing the lowest mean velocity.\n\nMore than two hidden states can serve to identify more precisely eye movements,\nfor instance as saccades (moderate to high velocity) and blinks (very high velocity),\n in order to improve fixation identification."), 2,0,1,2)
 
 			except:
-				info = QtWidgets.QLabel("<u>HMM</u>-based detection algorithm <b>requires module \"pomegranate\"</b>.<br />Fallback: I-VT.")
+				info = QtWidgets.QLabel("<u>HMM</u>-based detection algorithm <b>could not be loaded</b>.<br />Fallback: I-VT.")
 				available[1] = False
 
 			layoutT.addWidget(info, 0,0,1,2)
@@ -896,14 +902,32 @@ class SettingInterface(QtWidgets.QWidget):
 			tabICT.setLayout(layoutT)
 			tabWidget.addTab(tabICT, "I-CT")
 
-			# I-DT - not implemented
+			# I-DT
 			tabIDT = QtWidgets.QWidget(qDiag)
 
-			info = QtWidgets.QLabel("<b>Dispersion-based identification</b>")
+			info = QtWidgets.QLabel("<b>Dispersion-threshold identification</b>")
+			info.setToolTip("<u>Dispersion</u>-based detection algorithm.\n<b>Note: short computation times.</b>")
+
+			IDT_thresh = QtWidgets.QDoubleSpinBox()
+			IDT_thresh.setRange(.1, 30)
+			IDT_thresh.setSingleStep(.1)
+			IDT_thresh.setValue(parent.sceneOption["GP.IDT.threshold"])
+			IDT_thresh.setSuffix(" deg")
+			IDT_thresh.valueChanged.connect(parent.sceneOption.settings["GP.IDT.threshold"])
+
+			IDT_minDur = QtWidgets.QSpinBox()
+			IDT_minDur.setRange(1, 1000)
+			IDT_minDur.setValue(parent.sceneOption["GP.IDT.minFixationTime"])
+			IDT_minDur.setSuffix(" msec")
+			IDT_minDur.valueChanged.connect(parent.sceneOption.settings["GP.IDT.minFixationTime"])
 
 			layoutT = QtWidgets.QGridLayout()
-			layoutT.addWidget(info)
-			layoutT.addWidget(QtWidgets.QLabel("<b>Not yet implemented</b>.<br />Fallback: I-VT."))
+			layoutT.addWidget(info, 0,0,1,2)
+			layoutT.addWidget(QtWidgets.QLabel("Dispersion threshold"), 1,0,1,1)
+			layoutT.addWidget(IDT_thresh, 1,1,1,1)
+			layoutT.addWidget(QtWidgets.QLabel("Minimum fixation duration"), 2,0,1,1)
+			layoutT.addWidget(IDT_minDur, 2,1,1,1)
+			layoutT.addWidget(QtWidgets.QLabel("Windows of samples lasting at least the minimum duration and spanning less than\nthe dispersion threshold are labelled as fixations, and extended while dispersion stays below threshold."), 3,0,1,2)
 			tabIDT.setLayout(layoutT)
 			tabWidget.addTab(tabIDT, "I-DT")
 
@@ -195,9 +195,12 @@ class GazeData(object):
 		from ..generation import saliency
 
 		data = None
+		getSaliency = saliency.getSaliency
 		if self.parent.sceneOption["SM.fromfix"] == 0 and self.raw_gaze is not None:
 			# Rearrange columns: x,y,z, lon,lat
 			data = self.raw_gaze[:, [2,3,4, 0,1]].copy()
+			# Cost of the histogram engine does not depend on the number of samples, but for those near the poles (drawn exactly)
+			getSaliency = saliency.getSaliencyHistogram
 
 		elif self.fix_list is not None:
 			# Rearrange columns: x,y,z, lon,lat
@@ -221,7 +224,7 @@ class GazeData(object):
 		# SalMap
 		self.sal_map = np.zeros(self.dim(), dtype=precision) # H, W
 		# try:
-		saliency.getSaliency(self.sal_map, data, # x,y,z, lon,lat
+		getSaliency(self.sal_map, data, # x,y,z, lon,lat
 				gauss_sigma=self.parent.sceneOption["SM.Gauss"],
 				callback=callback)
 		# except Exception as e:
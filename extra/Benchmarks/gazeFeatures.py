@@ -0,0 +1,80 @@
+#! /usr/bin/env python3
+# ---------------------------------
+# Author: Erwan DAVID
+# Year: 2020
+# Lab: SGL, Goethe University, Frankfurt
+# Comment: Benchmark of fixation list extraction (processing.extract.getGazeFeatures)
+# Note: compares segmented reductions to a loop over fixations calling getFixationFeatures
+# ---------------------------------
+
+import sys, os, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from Salient360Toolbox.processing.extract import getGazeFeatures, getFixationFeatures, setSaccFeatures
+
+N = 1000000
+
+def getGazeData(N, seed=0):
+	# Random walk of unit vectors, in the layout of processing.preprocess.prepareGaze
+	rng = np.random.RandomState(seed)
+	vecs = np.cumsum(rng.randn(N, 3)*.002, axis=0) + [0, 0, 1]
+	vecs /= np.linalg.norm(vecs, axis=1)[:, None]
+
+	gaze_data = np.zeros([N, 11])
+	gaze_data[:, :3] = vecs
+	gaze_data[:, 3:6] = vecs[:, [1,2,0]]
+	gaze_data[:, 6:9] = vecs
+	gaze_data[:, 9] = np.cumsum(rng.uniform(.8, 1.2, N))
+	gaze_data[:, 10] = np.arange(N)
+
+	velocity = rng.rand(N)
+	# Fixations and saccades of 10 samples
+	labels = np.repeat(rng.rand(N//10) < .6, 10)
+
+	return gaze_data, labels, velocity
+
+def loopFeatures(gaze_point, fixationMarkers, velocity):
+	# Fixation by fixation implementation
+	acceleration = (velocity[1:]-velocity[:-1])/(gaze_point[1:, 9] - gaze_point[:-1, 9])
+
+	trans = np.where(fixationMarkers[:-1] != fixationMarkers[1:])[0]
+	starts = trans.copy()
+	if fixationMarkers[0] == True: starts = np.append([-1], starts)
+	if fixationMarkers[-1] == True: starts = np.append(starts, fixationMarkers.shape[0]-1)
+
+	fixationPts = np.empty([starts.shape[0]//2, 29])
+	fixationPts[:] = np.nan
+	eyeAvgPos = np.empty([fixationPts.shape[0], 3])
+	camAvgPos = np.empty([fixationPts.shape[0], 3])
+
+	for i in range(0, len(starts), 2):
+		startMarker = starts[i]+1
+		endMarker = min(starts[i+1]+1, fixationMarkers.shape[0]-1)
+		eyeAvgPos[i//2], camAvgPos[i//2] = getFixationFeatures(gaze_point, velocity, acceleration,
+			startMarker, endMarker, fixationPts[i//2, :], i//2)
+
+	setSaccFeatures(fixationPts, eyeAvgPos, camAvgPos)
+	for ifix in range(1, fixationPts.shape[0]):
+		fixationPts[ifix, 18] = np.max(velocity[int(fixationPts[ifix-1, 11]): int(fixationPts[ifix, 10])])
+		fixationPts[ifix, 19] = np.max(acceleration[int(fixationPts[ifix-1, 11]): int(fixationPts[ifix, 10])])
+
+	return fixationPts
+
+if __name__ == "__main__":
+	gaze_data, labels, velocity = getGazeData(N)
+
+	# Compilation and first memory allocations
+	getGazeFeatures(gaze_data, labels, velocity)
+
+	t0 = time.time()
+	segmented = getGazeFeatures(gaze_data, labels, velocity)
+	tSegmented = time.time() - t0
+
+	t0 = time.time()
+	loop = loopFeatures(gaze_data, labels, velocity)
+	tLoop = time.time() - t0
+
+	print("{} samples, {} fixations".format(N, segmented.shape[0]))
+	print("getGazeFeatures loop: {:7.3f}s segmented: {:7.3f}s speedup: x{:.0f} identical: {}".format(
+		tLoop, tSegmented, tLoop/tSegmented, np.array_equal(loop, segmented, equal_nan=True)))
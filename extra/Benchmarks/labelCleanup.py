@@ -0,0 +1,52 @@
+#! /usr/bin/env python3
+# ---------------------------------
+# Author: Erwan DAVID
+# Year: 2020
+# Lab: SGL, Goethe University, Frankfurt
+# Comment: Benchmark of label cleanup functions (processing.identify.commons)
+# Note: compares compiled functions to their pure Python implementation
+# ---------------------------------
+
+import sys, os, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from Salient360Toolbox.processing.identify.commons import fix_gen, fix_sacc, fix_fix
+
+N = 1000000
+
+def getLabels(N, seed=0):
+	# Noisy fixation (0)/saccade (1) labels
+	rng = np.random.RandomState(seed)
+	labels = (rng.rand(N) < .2).astype(int)
+	# Some longer saccades
+	starts = rng.randint(0, N-20, N//200)
+	for iStart, length in zip(starts, rng.randint(2, 20, starts.shape[0])):
+		labels[iStart: iStart+length] = 1
+	return labels
+
+def bench(name, func, args, labels):
+	compiled = labels.copy()
+	func(compiled, *args)
+	# Timed after compilation
+	compiled = labels.copy()
+	t0 = time.time()
+	func(compiled, *args)
+	tCompiled = time.time() - t0
+
+	python = labels.copy()
+	t0 = time.time()
+	func.py_func(python, *args)
+	tPython = time.time() - t0
+
+	print("{:14s} python: {:7.3f}s compiled: {:7.4f}s speedup: x{:.0f} identical: {}".format(
+		name, tPython, tCompiled, tPython/tCompiled, np.array_equal(python, compiled)))
+
+if __name__ == "__main__":
+	labels = getLabels(N)
+	print("{} samples".format(N))
+
+	bench("fix_gen", fix_gen, (), labels)
+	bench("fix_gen (bool)", fix_gen, (), labels.astype(bool))
+	bench("fix_sacc", fix_sacc, (10,), labels)
+	bench("fix_fix", fix_fix, (10,), labels)
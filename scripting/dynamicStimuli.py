@@ -46,14 +46,14 @@ FRAME_COUNT = 0
 
 sal_map_ps = []
 fix_lists = []
+dims = []
 files = glob("{}*.csv".format(PATH_DATA))
 
 # Generate
 
 from Salient360Toolbox import helper
 from Salient360Toolbox.generation import saliency as sal_generate
-
-sal_map = None
+from Salient360Toolbox.utils.readOutFile import getBinFilename
 
 for ipath, path in enumerate(files):
 
@@ -122,7 +122,9 @@ for ipath, path in enumerate(files):
 			# Generate data instead of reading from pre-existing file
 			force_generate=False,
 			# Will save saliency to bin file (~1GB) to save RAM
-			caching=True)
+			caching=True,
+			# Write frames to the bin file as they are generated instead of computing the whole video in RAM
+			stream=True)
 
 	# Append timecut data to fixation list
 	start_frame = frame_data[fix_list[:, 5].astype(int)]
@@ -131,18 +133,24 @@ for ipath, path in enumerate(files):
 
 	sal_map_ps.append(sal_map_p)
 	fix_lists.append(fix_list)
-
-	# Read one frame from file
-	sal_map_ = np.fromfile(sal_map_p, count=np.prod(dim), dtype=np.float32)
-	# Reshape flattened data to 3D saliency
-	sal_map_ = sal_map_.reshape(dim)
-
-	if sal_map is None:
-		sal_map = sal_map_
-	else:
-		sal_map += sal_map_
-
-sal_map /= sal_map.max()
+	dims.append(dim)
+
+# Sum participants' saliency videos in a memory-mapped bin file, block of frames by block of frames
+#	Videos are never loaded whole in RAM
+dim = [FRAME_COUNT]+DIM
+BLOCK = 64
+sal_map = np.memmap(getBinFilename(PATH_OUT+"videosal", dim), dtype=np.float32, mode="w+", shape=tuple(dim))
+for sal_map_p, dim_ in zip(sal_map_ps, dims):
+	# Participants may have seen fewer frames
+	sal_map_ = np.memmap(sal_map_p, dtype=np.float32, mode="r", shape=tuple(dim_))
+	for iFrame in range(0, dim_[0], BLOCK):
+		sal_map[iFrame: iFrame+BLOCK] += sal_map_[iFrame: iFrame+BLOCK]
+	del sal_map_
+
+sal_max = max(sal_map[iFrame: iFrame+BLOCK].max() for iFrame in range(0, FRAME_COUNT, BLOCK))
+for iFrame in range(0, FRAME_COUNT, BLOCK):
+	sal_map[iFrame: iFrame+BLOCK] /= sal_max
+sal_map.flush()
 
 # Save cumulated saliency map as a video
 misc.printNorm("Saliency map to video frames.", verbose=0)
@@ -152,9 +160,8 @@ sal_generate.saveImages(sal_map, PATH_OUT+"videosal")
 misc.printNorm("Saliency map to blended video frames.", verbose=0)
 sal_generate.saveImages(sal_map, PATH_OUT+"videosal"+"_blend", blend=PATH_STIM)
 
-# Save saliency maps to a binary file (read with .utils.readOutFile.readBinarySaliencyMap)
-misc.printNorm("Saliency map to binary file.", verbose=0)
-sal_generate.saveBin(sal_map, outpath)
+# Saliency maps are saved in a binary file (read with .utils.readOutFile.readBinarySaliencyMap)
+misc.printNorm("Saliency map saved to binary file: {}".format(sal_map.filename), verbose=0)
 
 misc.printWarning("\nRun the following two commands to generate videos from the images in folders:",
 	verbose=0, header=None)
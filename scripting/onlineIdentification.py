@@ -0,0 +1,58 @@
+#! /usr/bin/env python3
+# ---------------------------------
+# Author: Erwan DAVID
+# Year: 2020
+# Lab: SGL, Goethe University, Frankfurt
+# Comment: Identify fixations in a live stream of samples, replayed from a recording
+# ---------------------------------
+
+import numpy as np
+import os, builtins
+
+# Only print most important messages
+builtins.verbose = 0
+
+try:
+	import Salient360Toolbox
+except:
+	import sys
+	sys.path.append("../")
+
+from Salient360Toolbox.utils import misc
+
+PATH_DATA = "../data/raw_gaze/rawDataDyn1.csv"
+
+# Targeted eye
+eye = "R"
+# Number of samples received at once from the headset
+batchsize = 4
+# Filter settings
+filterSettings = {"name": "savgol", "params": {"win": 9, "poly": 2}}
+
+from Salient360Toolbox import helper
+from Salient360Toolbox.processing import preprocess
+from Salient360Toolbox.processing.identify.online import OnlineIVT, replay
+
+# Stand-in for a headset feed
+raw_data = helper.loadRawData(PATH_DATA, eye=eye, return_fixlist=False)
+# Live timestamps are usually already in milliseconds, this recording's are not
+timestampScale = preprocess.getTimestampScale(np.nanmean(np.diff(raw_data[:100, 0])))
+# Recordings without quaternions store Unity Euler angles (see helper.loadRawData)
+_, valid = helper.FindRawFeaturesByHeader(PATH_DATA, returnValid=True)
+Euler2Quat = not valid["head"]["Q"]
+degrees = preprocess.isEulerInDegrees(raw_data[:, 1:4]) if Euler2Quat else None
+
+ivt = OnlineIVT(threshold=120, minFixationTime=80, filter=filterSettings, timestampScale=timestampScale,
+	Euler2Quat=Euler2Quat, degrees=degrees)
+
+for timestamp, quaternion, eyeDirection in replay(raw_data, batchsize, eye=eye):
+	fixations = ivt.push(timestamp, quaternion, eyeDirection)
+
+	for fixation in fixations:
+		# Normalised longitude/latitude, start timestamp and duration (see extract.getGazeFeatures)
+		misc.printNeutral("Fixation #{:.0f} at ({:.3f}, {:.3f}), t = {:.0f} ms, duration = {:.0f} ms".format(
+			fixation[9], fixation[0], fixation[1], fixation[12], fixation[14]), verbose=0)
+
+for fixation in ivt.flush():
+	misc.printNeutral("Fixation #{:.0f} at ({:.3f}, {:.3f}), t = {:.0f} ms, duration = {:.0f} ms".format(
+		fixation[9], fixation[0], fixation[1], fixation[12], fixation[14]), verbose=0)